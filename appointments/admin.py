@@ -1,5 +1,11 @@
+import uuid
+
 from django.contrib import admin
-from .models import Specialty, Provider, Availability, Appointment, ChatHistory, DoctorNote
+from . import search
+from .models import (
+    Specialty, Provider, Availability, AvailabilityRule, AvailabilityException,
+    Appointment, ChatHistory, DoctorNote,
+)
 
 @admin.register(Specialty)
 class SpecialtyAdmin(admin.ModelAdmin):
@@ -15,6 +21,16 @@ class AvailabilityAdmin(admin.ModelAdmin):
     list_display = ("provider", "start", "end")
     list_filter = ("provider",)
 
+class AvailabilityExceptionInline(admin.TabularInline):
+    model = AvailabilityException
+    extra = 0
+
+@admin.register(AvailabilityRule)
+class AvailabilityRuleAdmin(admin.ModelAdmin):
+    list_display = ("provider", "day_of_week", "start_time", "end_time", "valid_from", "valid_until")
+    list_filter = ("day_of_week", "provider")
+    inlines = (AvailabilityExceptionInline,)
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ("patient", "provider", "start", "end", "status", "created_at")
@@ -22,12 +38,37 @@ class AppointmentAdmin(admin.ModelAdmin):
     search_fields = ("patient__username", "provider__user__username", "patient_name", "provider_name", "service")
     ordering = ("-created_at",)
 
+class FullTextSearchMixin:
+    """
+    Admin search through appointments.search instead of ILIKE '%term%' over
+    search_fields (which now only turns the search box on). Shows the
+    ``search_hits`` best matches in the changelist's own ordering.
+    """
+
+    search_hits = 500
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        kind = search.kind_for(self.model)
+        hits = search.get_backend().search(kind, search_term, self.search_hits)
+        return queryset.filter(pk__in=[hit.id for hit in hits]), False
+
 @admin.register(ChatHistory)
-class ChatHistoryAdmin(admin.ModelAdmin):
+class ChatHistoryAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("session_id", "created_at", "model_name")
-    search_fields = ("session_id", "user_message", "bot_response")
+    search_fields = ("user_message", "bot_response")
+    search_help_text = "Full-text search over messages and responses, or paste a session id."
+
+    def get_search_results(self, request, queryset, search_term):
+        try:
+            return queryset.filter(session_id=uuid.UUID(search_term.strip())), False
+        except ValueError:
+            return super().get_search_results(request, queryset, search_term)
 
 @admin.register(DoctorNote)
-class DoctorNoteAdmin(admin.ModelAdmin):
+class DoctorNoteAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ("appointment", "author_name", "created_at")
-    search_fields = ("author_name", "note_text")
+    search_fields = ("note_text", "author_name")
+    search_help_text = "Full-text search over note text and author."
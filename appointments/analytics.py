@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, DurationField, F, IntegerField, Q, Sum, Value
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import Appointment, Availability
+from .scheduling import rule_windows
+
+BUCKETS = ("day", "week", "month")
+STATUSES = [choice.value for choice in Appointment.Status]
+ZERO = timedelta(0)
+
+
+def bucket_start(dt, kind):
+    """Python twin of Trunc(kind) for windows that never hit the database."""
+    local = timezone.localtime(dt)
+    day = local.date()
+    if kind == "week":
+        day -= timedelta(days=day.weekday())
+    elif kind == "month":
+        day = day.replace(day=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def bucket_end(bucket, kind):
+    """Start of the bucket after ``bucket`` (itself a bucket_start())."""
+    day = timezone.localtime(bucket).date()
+    if kind == "day":
+        day += timedelta(days=1)
+    elif kind == "week":
+        day += timedelta(days=7)
+    else:
+        day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _rate(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def _hours(delta):
+    return round(delta.total_seconds() / 3600, 2)
+
+
+# ======================================
+# PROVIDER ANALYTICS
+# ======================================
+def provider_stats(provider_id, kind="week", range_start=None, range_end=None):
+    """
+    Per-bucket status counts, no-show/cancellation rates and utilisation for
+    one provider, from a single UNION query: appointments and availability
+    are each grouped by Trunc(start) with conditional Count(filter=Q(...))
+    and Sum(end - start). Recurring rule hours come from the scheduling cache.
+    """
+    now = timezone.now()
+    active = ~Q(status=Appointment.Status.CANCELLED)
+    no_show = Q(end__lt=now, status__in=[Appointment.Status.REQUESTED, Appointment.Status.CONFIRMED])
+    duration = DurationField()
+    zero = Value(0, output_field=IntegerField())
+
+    appointments = Appointment.objects.filter(provider_id=provider_id)
+    windows = Availability.objects.filter(provider_id=provider_id)
+    if range_start:
+        appointments = appointments.filter(start__gte=range_start)
+        windows = windows.filter(start__gte=range_start)
+    if range_end:
+        appointments = appointments.filter(start__lt=range_end)
+        windows = windows.filter(start__lt=range_end)
+
+    appointment_rows = (
+        appointments
+        .annotate(bucket=Trunc("start", kind))
+        .values("bucket")
+        .annotate(
+            source=Value("appointments"),
+            total=Count("id"),
+            upcoming=Count("id", filter=Q(start__gte=now)),
+            no_show=Count("id", filter=no_show),
+            **{status: Count("id", filter=Q(status=status)) for status in STATUSES},
+            hours=Sum(F("end") - F("start"), filter=active, output_field=duration),
+        )
+        .values_list("bucket", "source", "total", "upcoming", "no_show", *STATUSES, "hours")
+    )
+    window_rows = (
+        windows
+        .annotate(bucket=Trunc("start", kind))
+        .values("bucket")
+        .annotate(
+            source=Value("availability"),
+            total=zero,
+            upcoming=zero,
+            no_show=zero,
+            **{status: zero for status in STATUSES},
+            hours=Sum(F("end") - F("start"), output_field=duration),
+        )
+        .values_list("bucket", "source", "total", "upcoming", "no_show", *STATUSES, "hours")
+    )
+
+    buckets = defaultdict(lambda: {"booked": ZERO, "available": ZERO, "counts": defaultdict(int)})
+    for bucket, source, total, upcoming, no_shows, *rest in appointment_rows.union(window_rows, all=True):
+        *status_counts, hours = rest
+        entry = buckets[bucket]
+        if source == "availability":
+            entry["available"] += hours or ZERO
+            continue
+        entry["booked"] += hours or ZERO
+        counts = entry["counts"]
+        counts["total"] += total
+        counts["upcoming"] += upcoming
+        counts["no_show"] += no_shows
+        for status, count in zip(STATUSES, status_counts):
+            counts[status] += count
+
+    # Rules have no rows to bound them, so an open end of the range stops at
+    # the first or last bucket with data, the current bucket, or range_start's.
+    anchors = set(buckets) | {bucket_start(now, kind)} | ({bucket_start(range_start, kind)} if range_start else set())
+    span_start = range_start or min(anchors)
+    span_end = range_end or bucket_end(max(anchors), kind)
+    if span_start < span_end:
+        for start, end in rule_windows([provider_id], span_start, span_end)[provider_id]:
+            buckets[bucket_start(start, kind)]["available"] += min(end, span_end) - max(start, span_start)
+
+    return _summarise(buckets, kind)
+
+
+def _summarise(buckets, kind):
+    totals = defaultdict(int)
+    booked = available = ZERO
+    rows = []
+
+    for bucket in sorted(buckets):
+        entry = buckets[bucket]
+        counts = entry["counts"]
+        for key, value in counts.items():
+            totals[key] += value
+        booked += entry["booked"]
+        available += entry["available"]
+        rows.append({
+            "period": bucket.isoformat(),
+            "total": counts["total"],
+            "by_status": {status: counts[status] for status in STATUSES},
+            "booked_hours": _hours(entry["booked"]),
+            "available_hours": _hours(entry["available"]),
+            "utilisation": _rate(entry["booked"].total_seconds(), entry["available"].total_seconds()),
+        })
+
+    past_active = totals["completed"] + totals["no_show"]
+    return {
+        "total_appointments": totals["total"],
+        "upcoming": totals["upcoming"],
+        "by_status": {status: totals[status] for status in STATUSES},
+        "cancellation_rate": _rate(totals["cancelled"], totals["total"]),
+        "no_show_rate": _rate(totals["no_show"], past_active),
+        "booked_hours": _hours(booked),
+        "available_hours": _hours(available),
+        "utilisation": _rate(booked.total_seconds(), available.total_seconds()),
+        "bucket": kind,
+        "buckets": rows,
+    }
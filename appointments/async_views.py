@@ -0,0 +1,147 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from .cache import DIRECTORY, cached_response
+from .feeds import aappointment_feed
+from .hashers import aauthenticate, amake_password
+from .models import Appointment, Provider
+from .rows import PATIENT_FEED_ROW, PROVIDER_FEED_ROW, SCHEDULE_ROW, login_item, provider_detail_item, provider_item
+
+# Async twins of the read-only endpoints in views.py, mounted under
+# /api/async/. Responses are byte-for-byte the same; the difference is that
+# under ASGI a slow query parks a coroutine instead of a worker thread.
+# register/login are here too: their password hashing runs on the
+# appointments.hashers pool rather than Django's single sync thread.
+
+User = get_user_model()
+
+
+# ======================================================
+# AUTH
+# ======================================================
+@csrf_exempt
+async def register(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid JSON")
+
+    username = data.get("username", "").strip()
+    password = data.get("password", "").strip()
+
+    if not username or not password:
+        return HttpResponseBadRequest("Username and password required")
+
+    if await User.objects.filter(username=username).aexists():
+        return JsonResponse({"error": "Username already exists"}, status=400)
+
+    user = await User.objects.acreate(
+        username=username,
+        email=data.get("email", ""),
+        first_name=data.get("first_name", ""),
+        last_name=data.get("last_name", ""),
+        password=await amake_password(password),
+    )
+
+    return JsonResponse({"status": "created", "user": {"id": user.id}}, status=201)
+
+
+@csrf_exempt
+async def login(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid JSON")
+
+    user = await aauthenticate(data.get("username"), data.get("password"))
+    if user is None:
+        return JsonResponse({"error": "Invalid credentials"}, status=401)
+
+    provider_id = await Provider.objects.filter(user=user).values_list("id", flat=True).afirst()
+
+    return JsonResponse({"status": "ok", "user": login_item(user, provider_id)})
+
+
+# ======================================================
+# PROVIDERS
+# ======================================================
+@cached_response(DIRECTORY)
+async def provider_list(request):
+    providers = Provider.objects.select_related("user", "specialty")
+
+    return JsonResponse({
+        "status": "ok",
+        "items": [provider_item(p) async for p in providers.aiterator()],
+    })
+
+
+@cached_response(DIRECTORY)
+async def provider_detail(request, provider_id):
+    try:
+        p = await Provider.objects.select_related("user", "specialty").aget(id=provider_id)
+    except Provider.DoesNotExist:
+        return JsonResponse({"error": "Not found"}, status=404)
+
+    return JsonResponse({"status": "ok", "item": provider_detail_item(p)})
+
+# ======================================================
+# PROVIDER APPOINTMENTS
+# ======================================================
+async def provider_appointments(request, provider_id):
+    qs = Appointment.objects.filter(provider_id=provider_id)
+
+    return await aappointment_feed(request, qs, "appointments", SCHEDULE_ROW)
+
+
+async def provider_today(request, provider_id):
+    start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    qs = Appointment.objects.filter(
+        provider_id=provider_id,
+        start__gte=start,
+        start__lt=start + timedelta(days=1),
+    )
+
+    return await aappointment_feed(request, qs, "appointments", PROVIDER_FEED_ROW, conditional=True)
+
+
+async def provider_upcoming(request, provider_id):
+    qs = Appointment.objects.filter(provider_id=provider_id, start__gte=timezone.now())
+
+    return await aappointment_feed(request, qs, "appointments", PROVIDER_FEED_ROW, conditional=True)
+
+
+async def provider_past(request, provider_id):
+    qs = Appointment.objects.filter(provider_id=provider_id, end__lt=timezone.now())
+
+    return await aappointment_feed(request, qs, "appointments", PROVIDER_FEED_ROW, descending=True)
+
+# ======================================================
+# PATIENT APPOINTMENTS
+# ======================================================
+async def patient_appointments(request, patient_id):
+    qs = Appointment.objects.filter(patient_id=patient_id)
+
+    return await aappointment_feed(request, qs, "items", PATIENT_FEED_ROW)
+
+
+async def patient_upcoming(request, patient_id):
+    qs = Appointment.objects.filter(patient_id=patient_id, start__gte=timezone.now())
+
+    return await aappointment_feed(request, qs, "items", PATIENT_FEED_ROW)
+
+
+async def patient_past(request, patient_id):
+    qs = Appointment.objects.filter(patient_id=patient_id, end__lt=timezone.now())
+
+    return await aappointment_feed(request, qs, "items", PATIENT_FEED_ROW, descending=True)
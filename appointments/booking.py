@@ -0,0 +1,262 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .events import appointment_changed, appointment_event
+from .models import Appointment, Provider
+from .scheduling import availability_windows, merge_intervals
+
+MAX_DURATION = timedelta(hours=8)
+
+
+class BookingError(Exception):
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+# ======================================
+# SLOT CHECKS
+# ======================================
+def within_availability(provider_id, start, end):
+    """True when [start, end) is fully covered by (possibly adjacent) availability windows."""
+    covered = list(merge_intervals(availability_windows(provider_id, start, end)))
+    return covered == [(start, end)]
+
+
+def overlapping(provider_id, start, end):
+    return (
+        Appointment.objects
+        .filter(provider_id=provider_id, start__lt=end, end__gt=start)
+        .exclude(status=Appointment.Status.CANCELLED)
+    )
+
+
+def overlapping_bookings():
+    """
+    (kept_id, overlapping_id) for active appointments that overlap an earlier
+    one of the same provider, walking each provider's bookings in (start, id)
+    order. Normally empty: the constraints prevent new overlaps.
+    """
+    rows = (
+        Appointment.objects
+        .exclude(status=Appointment.Status.CANCELLED)
+        .order_by("provider_id", "start", "id")
+        .values_list("id", "provider_id", "start", "end")
+    )
+    kept_id = kept_provider = kept_end = None
+    for apt_id, provider_id, start, end in rows.iterator():
+        if provider_id == kept_provider and start < kept_end:
+            yield kept_id, apt_id
+            continue
+        kept_id, kept_provider, kept_end = apt_id, provider_id, end
+
+
+def validate_slot(start, end):
+    if end <= start:
+        raise BookingError("end must be after start", status=400)
+    if end - start > MAX_DURATION:
+        raise BookingError("Appointment cannot be longer than 8 hours", status=400)
+
+
+# ======================================
+# BOOK
+# ======================================
+def book_appointment(provider_id, start, end, patient=None, service="", notes=""):
+    """
+    Create an appointment if the slot is inside availability and free.
+
+    Concurrent bookings for one provider are serialized by locking the
+    provider row (Postgres) or by SQLite's IMMEDIATE transactions; the
+    appointment_no_overlap exclusion constraint on Postgres and the
+    unique_active_slot constraint are the last line of defence.
+    """
+    validate_slot(start, end)
+
+    try:
+        with transaction.atomic():
+            try:
+                provider = (
+                    Provider.objects
+                    .select_for_update(of=("self",))
+                    .select_related("user")
+                    .get(id=provider_id)
+                )
+            except Provider.DoesNotExist:
+                raise BookingError("Provider not found", status=404)
+
+            if not within_availability(provider_id, start, end):
+                raise BookingError("Slot is outside the provider's availability", status=400)
+            if overlapping(provider_id, start, end).exists():
+                raise BookingError("Slot is already booked")
+
+            appt = Appointment.objects.create(
+                provider=provider,
+                provider_name=provider.user.get_full_name() or provider.user.username,
+                patient=patient,
+                patient_name=(patient.get_full_name() or patient.username) if patient else "",
+                service=service,
+                notes=notes,
+                start=start,
+                end=end,
+            )
+            appointment_changed("created", appt)
+            return appt
+    except IntegrityError:
+        # Lost a race the database constraints caught.
+        raise BookingError("Slot is already booked")
+
+
+# ======================================
+# RESCHEDULE
+# ======================================
+def reschedule(apt_id, new_start):
+    """
+    Move an appointment to ``new_start`` keeping its duration.
+
+    Locks the appointment and its provider in one SELECT ... FOR UPDATE, then
+    runs the same availability/overlap checks as booking: four statements
+    (lock, availability, overlap, UPDATE) once the provider's recurring rules
+    are cached, one more on a cold week, plus the transaction itself.
+    """
+    try:
+        with transaction.atomic():
+            try:
+                appt = (
+                    Appointment.objects
+                    .select_for_update(of=("self", "provider"))
+                    .select_related("provider")
+                    .get(id=apt_id)
+                )
+            except Appointment.DoesNotExist:
+                raise BookingError("Not found", status=404)
+
+            if appt.status in (Appointment.Status.CANCELLED, Appointment.Status.COMPLETED):
+                raise BookingError(f"Cannot reschedule a {appt.status} appointment")
+
+            new_end = new_start + (appt.end - appt.start)
+            validate_slot(new_start, new_end)
+
+            if not within_availability(appt.provider_id, new_start, new_end):
+                raise BookingError("Slot is outside the provider's availability", status=400)
+            if overlapping(appt.provider_id, new_start, new_end).exclude(id=appt.id).exists():
+                raise BookingError("Slot is already booked")
+
+            appt.start, appt.end = new_start, new_end
+            appt.save(update_fields=["start", "end", "updated_at"])
+            appointment_changed("rescheduled", appt)
+            return appt
+    except IntegrityError:
+        raise BookingError("Slot is already booked")
+
+
+# ======================================
+# BULK STATUS TRANSITIONS
+# ======================================
+MAX_BULK_IDS = 1000
+
+
+def _int_filter(value):
+    if isinstance(value, bool):
+        raise ValueError(value)
+    return int(value)
+
+
+def _datetime_filter(value):
+    dt = parse_datetime(value) if isinstance(value, str) else None
+    if dt is None:
+        raise ValueError(value)
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def _status_filter(value):
+    if value not in Appointment.Status.values:
+        raise ValueError(value)
+    return value
+
+
+BULK_FILTERS = {
+    # filter key: (lookup, parser)
+    "provider_id": ("provider_id", _int_filter),
+    "patient_id": ("patient_id", _int_filter),
+    "status": ("status", _status_filter),
+    "start_after": ("start__gte", _datetime_filter),
+    "start_before": ("start__lt", _datetime_filter),
+}
+
+
+def _bulk_lookups(filters):
+    unknown = set(filters) - set(BULK_FILTERS)
+    if unknown:
+        raise BookingError(f"Unknown filter(s): {', '.join(sorted(unknown))}", status=400)
+    lookups = {}
+    for key, value in filters.items():
+        lookup, parse = BULK_FILTERS[key]
+        try:
+            lookups[lookup] = parse(value)
+        except (TypeError, ValueError):
+            raise BookingError(f"Invalid value for filter '{key}'", status=400)
+    return lookups
+
+
+def bulk_transition(target, ids=None, filters=None):
+    """
+    Move many appointments to ``target`` with a single
+    UPDATE ... WHERE status IN (<allowed sources>).
+
+    Returns (updated_count, results) where results has one
+    {"id", "from", "outcome"} entry per requested/matched appointment.
+    A filter may match at most MAX_BULK_IDS appointments, like an id list.
+    """
+    allowed = Appointment.ALLOWED_FROM.get(target) if isinstance(target, str) else None
+    if allowed is None:
+        raise BookingError(f"Cannot transition appointments to '{target}'", status=400)
+
+    qs = Appointment.objects.all()
+    if ids is not None:
+        if len(ids) > MAX_BULK_IDS:
+            raise BookingError(f"At most {MAX_BULK_IDS} ids per request", status=400)
+        qs = qs.filter(id__in=ids)
+    if filters:
+        qs = qs.filter(**_bulk_lookups(filters))
+    if ids is None and not filters:
+        raise BookingError("Provide ids or a filter", status=400)
+
+    with transaction.atomic():
+        # Lock the matched rows so the outcomes reported match what the UPDATE
+        # did; one row past the cap is enough to reject an over-broad filter.
+        rows = list(
+            qs.select_for_update().order_by("id")
+            .values_list("id", "status", "provider_id", "start", "end")[:MAX_BULK_IDS + 1]
+        )
+        if len(rows) > MAX_BULK_IDS:
+            raise BookingError(
+                f"Filter matches more than {MAX_BULK_IDS} appointments; narrow it down", status=400
+            )
+        current = {}
+        for apt_id, status, provider_id, start, end in rows:
+            current[apt_id] = status
+            if status in allowed:
+                appointment_event(target, apt_id, provider_id, target, start, end)
+        updated = (
+            Appointment.objects.filter(id__in=list(current), status__in=allowed)
+            .update(status=target, updated_at=timezone.now())
+        )
+
+    results = []
+    for apt_id in (ids if ids is not None else current):
+        status = current.get(apt_id)
+        if status is None:
+            outcome = "not_found"
+        elif status in allowed:
+            outcome = "updated"
+        elif status == target:
+            outcome = "unchanged"
+        else:
+            outcome = "invalid_transition"
+        results.append({"id": apt_id, "from": status, "outcome": outcome})
+
+    return updated, results
@@ -0,0 +1,190 @@
+import hashlib
+import time
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Min
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, urlencode
+
+
+# ======================================
+# VERSIONED KEYS
+# ======================================
+# Invalidation bumps a namespace version instead of deleting keys; entries
+# under the old version simply stop being read and age out via their TTL.
+# A missing version (evicted or never set) is seeded from the clock so it
+# can never resurrect entries written under an earlier version.
+
+def _version_key(namespace):
+    return f"v:{namespace}"
+
+
+def get_versions(namespaces):
+    keys = {_version_key(ns): ns for ns in namespaces}
+    found = cache.get_many(keys)
+    versions = {keys[k]: v for k, v in found.items()}
+
+    missing = {k: time.time_ns() for k in keys if k not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update({keys[k]: v for k, v in missing.items()})
+    return versions
+
+
+def get_version(namespace):
+    return get_versions([namespace])[namespace]
+
+
+def bump_version(namespace):
+    cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace, version, *parts):
+    return ":".join([namespace, str(version), *map(str, parts)])
+
+
+# ======================================
+# CONDITIONAL RESPONSES
+# ======================================
+def make_etag(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag, last_modified=None):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = last_modified
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def _validator(request, stats):
+    last = stats["last"]
+    etag = make_etag(
+        request.get_full_path(), last.isoformat() if last else "",
+        stats["count"], stats["low"], stats["high"],
+    )
+    return etag, (http_date(last.timestamp()) if last else None)
+
+
+def _validator_aggregates(field):
+    return {"last": Max(field), "count": Count("pk"), "low": Min("pk"), "high": Max("pk")}
+
+
+def queryset_validator(request, qs, field="updated_at"):
+    """
+    (etag, last_modified) for a feed from one aggregate: Max(field) catches
+    edits, Count catches rows entering or leaving the filtered set, and the
+    pk bounds catch a swap that leaves both unchanged (say, a delete plus an
+    insert, or a date window moving on).
+    """
+    return _validator(request, qs.order_by().aggregate(**_validator_aggregates(field)))
+
+
+async def aqueryset_validator(request, qs, field="updated_at"):
+    return _validator(request, await qs.order_by().aaggregate(**_validator_aggregates(field)))
+
+
+def is_fresh(request, etag, last_modified):
+    """
+    Only If-None-Match can answer 304 for a feed. Last-Modified is sent for
+    information, but a delete, or a row leaving a date window, does not move
+    Max(updated_at), so If-Modified-Since alone would serve a stale list.
+    """
+    return "If-None-Match" in request.headers and etag_matches(request, etag)
+
+
+# ======================================
+# RESPONSE CACHE
+# ======================================
+DIRECTORY = "directory"
+
+
+def invalidate(namespace=DIRECTORY):
+    bump_version(namespace)
+
+
+def _lookup(namespace, request, params):
+    # Only the query parameters the view reads are part of the key, so
+    # arbitrary query strings cannot fill the cache with copies of one page.
+    query = urlencode([(name, request.GET.getlist(name)) for name in params], doseq=True)
+    key = versioned_key(namespace, get_version(namespace), "response", request.path, query)
+    return key, cache.get(key)
+
+
+def _store(key, response, timeout):
+    if response.status_code != 200 or response.streaming:
+        return None
+    entry = (response.content, response["Content-Type"], make_etag(response.content))
+    cache.set(key, entry, settings.RESPONSE_CACHE_TTL if timeout is None else timeout)
+    return entry
+
+
+def _respond(request, entry):
+    body, content_type, etag = entry
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response = HttpResponse(body, content_type=content_type)
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cached_response(namespace=DIRECTORY, timeout=None, params=()):
+    """
+    Cache a GET view's 200 responses under a versioned key and answer
+    If-None-Match with 304. ``invalidate(namespace)`` drops every entry at once.
+    The key is the path plus the query ``params`` the view reads; any other
+    query string shares the same entry.
+    Works on sync and async views; the async wrapper does its cache I/O off
+    the event loop.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+
+                key, entry = await sync_to_async(_lookup, thread_sensitive=False)(namespace, request, params)
+                if entry is None:
+                    response = await view(request, *args, **kwargs)
+                    entry = await sync_to_async(_store, thread_sensitive=False)(key, response, timeout)
+                    if entry is None:
+                        return response
+                return _respond(request, entry)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            key, entry = _lookup(namespace, request, params)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                entry = _store(key, response, timeout)
+                if entry is None:
+                    return response
+            return _respond(request, entry)
+        return wrapper
+    return decorator
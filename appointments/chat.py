@@ -0,0 +1,184 @@
+import base64
+import json
+import uuid
+import zlib
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, DateTimeField, Max, Q, Value, When
+from django.utils.dateparse import parse_datetime
+
+from . import search
+from .models import ChatHistory
+
+MESSAGE_FIELDS = ("id", "user_message", "bot_response", "model_name", "meta", "created_at")
+ARCHIVE_KEY = "archive"
+ARCHIVE_CODEC = "zlib+base64"
+
+
+def message_item(row):
+    """A ChatHistory .values(*MESSAGE_FIELDS) row (or unpacked archive entry) as JSON."""
+    return {
+        "id": str(row["id"]),
+        "user_message": row["user_message"],
+        "bot_response": row["bot_response"],
+        "model_name": row["model_name"],
+        "meta": row["meta"],
+        "created_at": row["created_at"].isoformat(),
+    }
+
+
+def message_cursor(row):
+    return row["created_at"], str(row["id"])
+
+
+# ======================================
+# ARCHIVE FORMAT
+# ======================================
+# Compaction replaces every message of an idle session with one row whose
+# meta["archive"] holds the messages as zlib-compressed JSON. The archive row
+# takes the first message's created_at, so it always sorts first in its
+# session and later appends land after it. Archived text is not searchable:
+# full-text search covers chat within CHAT_RETENTION_DAYS only.
+
+def is_archive(meta):
+    return isinstance(meta, dict) and ARCHIVE_KEY in meta
+
+
+def pack(rows):
+    payload = json.dumps(
+        [[str(r["id"]), r["created_at"].isoformat(), r["user_message"], r["bot_response"], r["model_name"], r["meta"]]
+         for r in rows],
+        separators=(",", ":"),
+    ).encode()
+    return {
+        "codec": ARCHIVE_CODEC,
+        "messages": len(rows),
+        "first_at": rows[0]["created_at"].isoformat(),
+        "last_at": rows[-1]["created_at"].isoformat(),
+        "raw_bytes": len(payload),
+        "data": base64.b64encode(zlib.compress(payload, 9)).decode("ascii"),
+    }
+
+
+def unpack(archive):
+    if archive.get("codec") != ARCHIVE_CODEC:
+        raise ValueError(f"Unknown chat archive codec {archive.get('codec')!r}")
+    rows = json.loads(zlib.decompress(base64.b64decode(archive["data"])))
+    return [
+        dict(zip(MESSAGE_FIELDS, (uuid.UUID(id_), user, bot, model, meta, parse_datetime(at))))
+        for id_, at, user, bot, model, meta in rows
+    ]
+
+
+def expand(rows):
+    """Replace archive rows with the messages they hold, in (created_at, id) order."""
+    messages = []
+    for row in rows:
+        if is_archive(row["meta"]):
+            messages += unpack(row["meta"][ARCHIVE_KEY])
+        else:
+            messages.append(row)
+    messages.sort(key=message_cursor)
+    return messages
+
+
+def transcript_qs(session_id):
+    return ChatHistory.objects.filter(session_id=session_id).values(*MESSAGE_FIELDS)
+
+
+def is_archived(session_id):
+    """True when the session's first row is an archive; one index-ordered row read."""
+    first = (
+        ChatHistory.objects.filter(session_id=session_id)
+        .order_by("created_at", "pk").values_list("meta", flat=True).first()
+    )
+    return is_archive(first)
+
+
+# ======================================
+# RETENTION COMPACTION
+# ======================================
+def idle_sessions(cutoff, after=None, limit=500):
+    """
+    Up to ``limit`` session ids, in order, whose newest message is older than
+    ``cutoff`` and that still have un-archived rows. Seeking past ``after``
+    walks the (session_id, created_at) index instead of regrouping the table.
+    """
+    qs = ChatHistory.objects.all()
+    if after is not None:
+        qs = qs.filter(session_id__gt=after)
+    return list(
+        qs.values("session_id")
+        .annotate(last=Max("created_at"), live=Count("pk", filter=~Q(meta__has_key=ARCHIVE_KEY)))
+        .filter(last__lt=cutoff, live__gt=0)
+        .order_by("session_id")
+        .values_list("session_id", flat=True)[:limit]
+    )
+
+
+def _delete_rows(pks):
+    """One DELETE ... WHERE id IN (...) for ``pks``, bypassing the ORM's collector and signals."""
+    pk = ChatHistory._meta.pk
+    qn = connection.ops.quote_name
+    marks = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(ChatHistory._meta.db_table)} WHERE {qn(pk.column)} IN ({marks})",
+            [pk.get_db_prep_value(value, connection) for value in pks],
+        )
+
+
+def compact_sessions(session_ids, delete_batch_size=1000):
+    """
+    Archive ``session_ids`` in one transaction: one new archive row per
+    session (merging any earlier archive), then delete the originals in
+    batches. Returns (sessions, rows_deleted, raw_bytes, packed_bytes).
+    """
+    with transaction.atomic():
+        rows = list(
+            ChatHistory.objects.filter(session_id__in=session_ids)
+            .order_by("session_id", "created_at", "pk")
+            .values("session_id", *MESSAGE_FIELDS)
+        )
+        by_session = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append(row)
+
+        archives, first_at, raw_bytes, packed_bytes = [], {}, 0, 0
+        for session_id, session_rows in by_session.items():
+            messages = expand(session_rows)
+            archive = pack(messages)
+            raw_bytes += archive["raw_bytes"]
+            packed_bytes += len(archive["data"])
+            archive_row = ChatHistory(
+                session_id=session_id,
+                user_message="",
+                model_name=messages[-1]["model_name"],
+                meta={ARCHIVE_KEY: archive},
+            )
+            first_at[archive_row.pk] = messages[0]["created_at"]
+            archives.append(archive_row)
+
+        # QuerySet.delete() would SELECT every row and send the search index's
+        # post_delete signal once per row, so issue the DELETE in plain SQL
+        # (nothing references ChatHistory) and drop each batch from the index
+        # in the same transaction.
+        backend = search.get_backend()
+        ids = [row["id"] for row in rows]
+        for start in range(0, len(ids), delete_batch_size):
+            batch = ids[start:start + delete_batch_size]
+            _delete_rows(batch)
+            if not backend.maintained_by_database:
+                backend.remove_many("chat", batch)
+
+        ChatHistory.objects.bulk_create(archives)
+        # created_at is auto_now_add, which bulk_create always applies; backdate
+        # the archives with one UPDATE, which leaves the field's options alone.
+        if archives:
+            ChatHistory.objects.filter(pk__in=[a.pk for a in archives]).update(created_at=Case(
+                *[When(pk=a.pk, then=Value(first_at[a.pk])) for a in archives],
+                output_field=DateTimeField(),
+            ))
+
+    return len(archives), len(ids), raw_bytes, packed_bytes
+
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Appointment, PlatformStats, Provider
+
+User = get_user_model()
+
+FIELDS = ("total_providers", "total_patients", "total_appointments")
+
+
+# ======================================
+# PLATFORM COUNTERS
+# ======================================
+def patients_queryset():
+    return User.objects.filter(is_staff=False).exclude(provider_profile__isnull=False)
+
+
+def actual_counts():
+    """The three full COUNT(*) queries admin_stats used to run on every call."""
+    return {
+        "total_providers": Provider.objects.count(),
+        "total_patients": patients_queryset().count(),
+        "total_appointments": Appointment.objects.count(),
+    }
+
+
+def adjust(**deltas):
+    """
+    Apply signed deltas in one UPDATE once the surrounding transaction commits,
+    so concurrent bookings never queue on this shared row while they hold
+    their own locks. A missing row is left for reconcile().
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if deltas:
+        transaction.on_commit(lambda: PlatformStats.objects.filter(id=1).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        ))
+
+
+def reconcile():
+    """Recount from the source tables; returns {field: (stored, actual)} for anything that drifted."""
+    counts = actual_counts()
+    stats, _ = PlatformStats.objects.get_or_create(id=1)
+    drift = {
+        field: (getattr(stats, field), counts[field])
+        for field in FIELDS
+        if getattr(stats, field) != counts[field]
+    }
+    PlatformStats.objects.filter(id=1).update(reconciled_at=timezone.now(), **counts)
+    return drift
+
+
+def read():
+    """Single-row read, rebuilding the row first if it has never been populated."""
+    row = PlatformStats.objects.filter(id=1).values(*FIELDS).first()
+    if row is None:
+        reconcile()
+        row = PlatformStats.objects.filter(id=1).values(*FIELDS).get()
+    return row
@@ -0,0 +1,204 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Sent instead of the backlog when a subscriber falls behind; clients
+# refetch the feed they are showing rather than replaying missed events.
+RESYNC = {"event": "resync"}
+
+
+def provider_channel(provider_id):
+    return f"provider:{provider_id}"
+
+
+# ======================================
+# SUBSCRIPTIONS
+# ======================================
+class Subscription:
+    """
+    A bounded per-subscriber queue owned by one event loop. ``offer`` is
+    always run on that loop, so publishers never block on a slow client:
+    when the queue is full its backlog is replaced by a single RESYNC.
+    """
+
+    def __init__(self, maxsize):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflows = 0
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflows += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self, timeout=None):
+        """Next event, or None if nothing arrives within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+# ======================================
+# BROKERS
+# ======================================
+class Broker:
+    """
+    Pub/sub interface. ``publish`` is called from sync code (request threads,
+    on_commit callbacks); ``subscribe`` is an async context manager yielding
+    a Subscription for one channel.
+    """
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """In-process fan-out; events only reach subscribers in the same worker."""
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or settings.EVENTS_QUEUE_SIZE
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        event = {"id": next(self._ids), **event}
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; its finally block never ran.
+                self._remove(channel, sub)
+
+    def subscriber_count(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+    def _remove(self, channel, sub):
+        with self._lock:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[channel]
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        sub = Subscription(self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            self._remove(channel, sub)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Shares events between workers with LISTEN/NOTIFY. Publishing is a
+    pg_notify on the request's connection; each worker process holds one
+    listening connection and fans notifications out through LocalBroker.
+    """
+
+    NOTIFY_CHANNEL = "appointment_events"
+
+    def __init__(self, queue_size=None):
+        super().__init__(queue_size)
+        self._listener = None
+
+    def publish(self, channel, event):
+        payload = json.dumps({"channel": channel, "event": event})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.NOTIFY_CHANNEL, payload])
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+        async with super().subscribe(channel) as sub:
+            yield sub
+
+    async def _listen(self):
+        import psycopg
+        from psycopg.conninfo import make_conninfo
+
+        db = connection.settings_dict
+        conninfo = make_conninfo(
+            dbname=db["NAME"], user=db["USER"], password=db["PASSWORD"],
+            host=db["HOST"], port=db["PORT"] or None,
+            **{k: v for k, v in db.get("OPTIONS", {}).items() if k == "sslmode"},
+        )
+        delay = 1
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(conninfo, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {self.NOTIFY_CHANNEL}")
+                    delay = 1
+                    async for notify in conn.notifies():
+                        message = json.loads(notify.payload)
+                        self.deliver(message["channel"], message["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Event listener lost its connection; retrying in %ss", delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    name = settings.EVENTS_BROKER
+    return import_string(settings.EVENTS_BROKERS.get(name, name))()
+
+
+# ======================================
+# PUBLISHING
+# ======================================
+def _publish(channel, event):
+    try:
+        get_broker().publish(channel, event)
+    except Exception:
+        # Push is best effort; dashboards still have the polling feeds.
+        logger.exception("Could not publish %s on %s", event.get("event"), channel)
+
+
+def appointment_event(kind, appointment_id, provider_id, status, start, end):
+    """Publish ``appointment.<kind>`` for one provider once the transaction commits."""
+    event = {
+        "event": f"appointment.{kind}",
+        "appointment": {
+            "id": appointment_id,
+            "provider": provider_id,
+            "status": status,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+        },
+    }
+    transaction.on_commit(lambda: _publish(provider_channel(provider_id), event))
+
+
+def appointment_changed(kind, appt):
+    appointment_event(kind, appt.id, appt.provider_id, appt.status, appt.start, appt.end)
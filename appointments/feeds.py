@@ -0,0 +1,108 @@
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+
+from .cache import aqueryset_validator, is_fresh, not_modified, queryset_validator
+from .pagination import InvalidPage, akeyset_page, keyset_page, ordered
+from .rows import aattach_notes, attach_notes, wants_notes
+from .streaming import astream_response, stream_response, wants_stream
+
+
+# ======================================
+# APPOINTMENT FEEDS
+# ======================================
+# appointment_feed() and aappointment_feed() differ only in how they run
+# their queries; the checks and the response body live in the helpers below.
+
+def _rejected(request):
+    if wants_notes(request) and wants_stream(request):
+        return JsonResponse({"error": "include=notes is not available for streamed exports"}, status=400)
+    return None
+
+
+def _validated(request, conditional):
+    # Notes are not covered by the appointments' updated_at validator.
+    return conditional and not wants_notes(request)
+
+
+def _invalid_page(error):
+    return JsonResponse({"error": str(error)}, status=400)
+
+
+def _page_args(request, shape, descending):
+    return {"params": request.GET, "descending": descending, "cursor_key": shape.cursor_key}
+
+
+def _response(key, items, page, validator):
+    body = {"status": "ok", key: items}
+    if page.paginated:
+        body["next_cursor"] = page.next_cursor
+    response = JsonResponse(body)
+
+    if validator:
+        etag, last_modified = validator
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = last_modified
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def appointment_feed(request, qs, key, shape, descending=False, conditional=False):
+    """
+    Serialize an appointment queryset: streamed for ?stream= / NDJSON exports,
+    keyset-paginated on (start, id) when asked, otherwise one JSON body.
+
+    ``conditional`` feeds first compute a Max(updated_at)+Count validator and
+    answer 304 without serializing any rows when the client is up to date.
+    ``include=notes`` adds each appointment's doctor notes (one extra query).
+    """
+    rejected = _rejected(request)
+    if rejected:
+        return rejected
+
+    validator = None
+    if _validated(request, conditional):
+        validator = queryset_validator(request, qs)
+        if is_fresh(request, *validator):
+            return not_modified(*validator)
+
+    rows = shape.values(qs)
+    if wants_stream(request):
+        return stream_response(request, ordered(rows, descending=descending), key, shape)
+
+    try:
+        page = keyset_page(rows, **_page_args(request, shape, descending))
+    except InvalidPage as e:
+        return _invalid_page(e)
+
+    items = [shape(row) for row in page.items]
+    if wants_notes(request):
+        attach_notes(items)
+    return _response(key, items, page, validator)
+
+
+async def aappointment_feed(request, qs, key, shape, descending=False, conditional=False):
+    """appointment_feed() for async views."""
+    rejected = _rejected(request)
+    if rejected:
+        return rejected
+
+    validator = None
+    if _validated(request, conditional):
+        validator = await aqueryset_validator(request, qs)
+        if is_fresh(request, *validator):
+            return not_modified(*validator)
+
+    rows = shape.values(qs)
+    if wants_stream(request):
+        return astream_response(request, ordered(rows, descending=descending), key, shape)
+
+    try:
+        page = await akeyset_page(rows, **_page_args(request, shape, descending))
+    except InvalidPage as e:
+        return _invalid_page(e)
+
+    items = [shape(row) for row in page.items]
+    if wants_notes(request):
+        await aattach_notes(items)
+    return _response(key, items, page, validator)
@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+
+# ======================================
+# TUNED HASHERS
+# ======================================
+# Django's hashers with their cost parameters read from settings (see
+# PASSWORD_HASHER and PASSWORD_* in config/settings.py). They keep Django's
+# algorithm names, so existing hashes still verify; when a stored hash was
+# made with other parameters, must_update() is true and the password is
+# rehashed on the next successful login.
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+# ======================================
+# OFF-LOOP HASHING (ASGI)
+# ======================================
+# Hashing is pure CPU and hashlib/argon2 release the GIL while they run, so a
+# small dedicated pool hashes in parallel without starving the event loop or
+# the single thread Django runs thread-sensitive sync code on.
+
+@lru_cache(maxsize=None)
+def _executor():
+    return ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_THREADS, thread_name_prefix="hashing")
+
+
+def _offload(func):
+    return sync_to_async(func, thread_sensitive=False, executor=_executor())
+
+
+async def amake_password(password):
+    return await _offload(hashers.make_password)(password)
+
+
+async def acheck_password(user, password):
+    """
+    Verify ``password`` off the event loop. A correct password stored with an
+    outdated algorithm or cost is rehashed and saved, as check_password does.
+    """
+    is_correct, must_update = await _offload(hashers.verify_password)(password, user.password)
+    if is_correct and must_update:
+        user.password = await amake_password(password)
+        await user.asave(update_fields=["password"])
+    return is_correct
+
+
+async def aauthenticate(username, password):
+    """ModelBackend.authenticate for async views, with the hashing moved to the pool."""
+    if username is None or password is None:
+        return None
+
+    User = get_user_model()
+    try:
+        user = await User._default_manager.aget_by_natural_key(username)
+    except User.DoesNotExist:
+        # Hash anyway so unknown usernames take as long as wrong passwords.
+        await amake_password(password)
+        return None
+
+    if await acheck_password(user, password) and getattr(user, "is_active", True):
+        return user
+    return None
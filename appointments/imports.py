@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Availability, Provider
+from .scheduling import merge_intervals
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_WINDOWS = 20000
+
+
+class ScheduleImportError(ValueError):
+    pass
+
+
+# ======================================
+# PARSING
+# ======================================
+def _aware(value, where):
+    dt = parse_datetime(str(value or "").strip())
+    if dt is None:
+        raise ScheduleImportError(f"{where}: invalid datetime {value!r}")
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def _window(row, where, default_provider):
+    if not isinstance(row, dict):
+        raise ScheduleImportError(f"{where}: expected an object with start and end")
+    provider_id = row.get("provider_id") or default_provider
+    if not str(provider_id or "").isdigit():
+        raise ScheduleImportError(f"{where}: missing or invalid provider_id")
+    start, end = _aware(row.get("start"), where), _aware(row.get("end"), where)
+    if end <= start:
+        raise ScheduleImportError(f"{where}: end must be after start")
+    return int(provider_id), start, end
+
+
+def parse_schedule(text, fmt, provider_id=None):
+    """
+    Parse CSV (header: start,end[,provider_id]) or JSON (a list of
+    {"start", "end"[, "provider_id"]} or {"windows": [...]}) into
+    (provider_id, start, end) tuples.
+    """
+    if fmt == "json":
+        try:
+            data = json.loads(text)
+        except ValueError:
+            raise ScheduleImportError("Invalid JSON")
+        if isinstance(data, dict):
+            provider_id = data.get("provider_id", provider_id)
+            data = data.get("windows")
+        if not isinstance(data, list):
+            raise ScheduleImportError("Expected a list of windows")
+        rows = data
+    elif fmt == "csv":
+        rows = list(csv.DictReader(io.StringIO(text)))
+    else:
+        raise ScheduleImportError(f"Unsupported format {fmt!r}")
+
+    if len(rows) > MAX_IMPORT_WINDOWS:
+        raise ScheduleImportError(f"At most {MAX_IMPORT_WINDOWS} windows per import")
+    return [_window(row, f"row {i + 1}", provider_id) for i, row in enumerate(rows)]
+
+
+def weekly_windows(weekdays, start_time, end_time, first_day, weeks):
+    """Concrete windows for ``weekdays`` (0=Monday) over ``weeks`` weeks from ``first_day``."""
+    tz = timezone.get_current_timezone()
+    for offset in range(weeks * 7):
+        day = first_day + timedelta(days=offset)
+        if day.weekday() in weekdays:
+            yield (
+                timezone.make_aware(datetime.combine(day, start_time), tz),
+                timezone.make_aware(datetime.combine(day, end_time), tz),
+            )
+
+
+# ======================================
+# IMPORT
+# ======================================
+def _plan(existing, new):
+    """
+    Sweep existing (id, start, end) rows and new (start, end) windows, both
+    sorted. Returns (ids_to_delete, windows_to_create): every merged block
+    that contains a new window replaces the existing rows it absorbed;
+    untouched existing rows are left alone.
+    """
+    tagged = sorted(
+        [(start, end, pk) for pk, start, end in existing]
+        + [(start, end, None) for start, end in new],
+        key=lambda item: (item[0], item[1]),
+    )
+    delete, create = [], []
+
+    block = None
+    for start, end, pk in tagged + [(None, None, None)]:
+        if block is not None and (start is None or start > block["end"]):
+            if block["new"]:
+                delete.extend(block["ids"])
+                create.append((block["start"], block["end"]))
+            block = None
+        if start is None:
+            break
+        if block is None:
+            block = {"start": start, "end": end, "ids": [], "new": False}
+        block["end"] = max(block["end"], end)
+        if pk is None:
+            block["new"] = True
+        else:
+            block["ids"].append(pk)
+    return delete, create
+
+
+def import_windows(windows):
+    """
+    Load (provider_id, start, end) windows in one transaction: overlapping or
+    touching windows are merged with each other and with what is already
+    stored, then written with batched bulk_create.
+    """
+    by_provider = defaultdict(list)
+    for provider_id, start, end in windows:
+        by_provider[provider_id].append((start, end))
+
+    summary = {"providers": 0, "received": len(windows), "created": 0, "replaced": 0}
+    if not by_provider:
+        return summary
+
+    with transaction.atomic():
+        found = set(
+            Provider.objects.select_for_update()
+            .filter(id__in=list(by_provider)).values_list("id", flat=True)
+        )
+        unknown = set(by_provider) - found
+        if unknown:
+            raise ScheduleImportError(f"Unknown provider(s): {', '.join(map(str, sorted(unknown)))}")
+
+        to_create = []
+        for provider_id, provider_windows in by_provider.items():
+            new = list(merge_intervals(sorted(provider_windows)))
+            existing = (
+                Availability.objects
+                .filter(provider_id=provider_id, start__lte=new[-1][1], end__gte=new[0][0])
+                .order_by("start")
+                .values_list("id", "start", "end")
+            )
+            delete, create = _plan(existing, new)
+            if delete:
+                Availability.objects.filter(id__in=delete).delete()
+            to_create.extend(Availability(provider_id=provider_id, start=s, end=e) for s, e in create)
+            summary["replaced"] += len(delete)
+
+        Availability.objects.bulk_create(to_create, batch_size=IMPORT_BATCH_SIZE)
+
+    summary["providers"] = len(by_provider)
+    summary["created"] = len(to_create)
+    return summary
@@ -0,0 +1,433 @@
+import http.client
+import io
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import tempfile
+import uuid
+from collections import Counter, namedtuple
+from datetime import timedelta
+from functools import lru_cache
+from time import perf_counter
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from PIL import Image
+
+from appointments import synthetic, urls
+from appointments.management.stats import percentile
+from appointments.metrics import QueryTimer, count_queries
+from appointments.models import Appointment, Availability, AvailabilityRule, ChatHistory, DoctorNote, Specialty
+from appointments.scheduling import free_slots
+
+Case = namedtuple("Case", ["name", "method", "path", "data", "content_type"])
+
+SERVER_TIMING_QUERIES = "queries"
+
+
+@lru_cache(maxsize=None)
+def sample_photo():
+    """A phone-camera-sized JPEG for the photo upload endpoint, built once per run."""
+    size = (2000, 1500)
+    channels = (Image.linear_gradient("L"), Image.radial_gradient("L"), Image.effect_noise((256, 256), 64))
+    image = Image.merge("RGB", [channel.resize(size) for channel in channels])
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+# ======================================
+# FIXTURES AND CASES
+# ======================================
+def discover_fixtures(create_missing=False):
+    """Pick the rows the request plan addresses from whatever is in the database."""
+    now = timezone.now()
+    upcoming = (
+        Appointment.objects
+        .filter(start__gte=now + timedelta(days=1), status=Appointment.Status.REQUESTED, patient__isnull=False)
+        .order_by("start").first()
+    )
+    if upcoming is None:
+        raise CommandError("No upcoming requested appointment to benchmark against; seed data first.")
+
+    provider_id = upcoming.provider_id
+    slots = list(free_slots(provider_id, now + timedelta(days=1), now + timedelta(days=15)))
+    if not slots:
+        raise CommandError(f"Provider {provider_id} has no free slot in the next two weeks.")
+
+    rule = AvailabilityRule.objects.filter(provider_id=provider_id).first()
+    if rule is None and create_missing:
+        rule = AvailabilityRule.objects.create(
+            provider_id=provider_id, day_of_week=AvailabilityRule.Weekday.SUNDAY,
+            start_time="10:00", end_time="12:00", valid_from=timezone.localdate(),
+        )
+
+    return {
+        "provider": provider_id,
+        "provider_username": upcoming.provider.user.username,
+        "patient": upcoming.patient_id,
+        "appointment": upcoming.id,
+        "slot": slots[0],
+        "window": Availability.objects.filter(provider_id=provider_id).values_list("id", flat=True).first(),
+        "rule": rule.id if rule else None,
+        "specialty": Specialty.objects.values_list("id", flat=True).first(),
+        "note": DoctorNote.objects.values_list("id", flat=True).first(),
+        "chat_session": ChatHistory.objects.values_list("session_id", flat=True).first() or uuid.uuid4(),
+        "password": synthetic.SYNTHETIC_PASSWORD,
+    }
+
+
+def build_cases(fx):
+    """One request per route in appointments/urls.py. Writes are rolled back after each run."""
+    p, pat, apt = fx["provider"], fx["patient"], fx["appointment"]
+    slot_start, slot_end = fx["slot"]
+    tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+    week = urlencode({"end": (timezone.now() + timedelta(days=7)).isoformat()})
+    as_json = "application/json"
+
+    def get(name, path):
+        return Case(name, "GET", f"/api/{path}", None, None)
+
+    def send(name, method, path, data):
+        return Case(name, method, f"/api/{path}", json.dumps(data), as_json)
+
+    cases = [
+        send("register", "POST", "register/", {"username": "bench-register", "password": "bench-pass-123"}),
+        send("login", "POST", "login/", {"username": fx["provider_username"], "password": fx["password"]}),
+
+        get("appointment-list", "appointments/?limit=50"),
+        send("appointment-book", "POST", "appointments/book/",
+             {"provider_id": p, "patient_id": pat, "start": slot_start.isoformat(), "end": slot_end.isoformat()}),
+        send("appointment-bulk-status", "POST", "appointments/bulk-status/", {"ids": [apt], "status": "confirmed"}),
+        get("appointment-detail", f"appointments/{apt}/"),
+        send("appointment-cancel", "POST", f"appointments/{apt}/cancel/", {}),
+        send("appointment-complete", "POST", f"appointments/{apt}/complete/", {}),
+        send("appointment-reschedule", "POST", f"appointments/{apt}/reschedule/", {"start": slot_start.isoformat()}),
+
+        get("provider-list", "providers/"),
+        get("provider-detail", f"providers/{p}/"),
+        send("provider-update", "PUT", f"providers/{p}/update/", {"bio": "Updated by bench_api."}),
+        Case("provider-upload-photo", "POST", f"/api/providers/{p}/upload-photo/", "photo", None),
+        get("provider-appointments", f"providers/{p}/appointments/"),
+        get("provider-upcoming", f"providers/{p}/appointments/upcoming/"),
+        get("provider-past", f"providers/{p}/appointments/past/"),
+        get("provider-today", f"providers/{p}/appointments/today/"),
+        get("provider-analytics", f"providers/{p}/analytics/?bucket=week"),
+
+        get("patient-appointments", f"patients/{pat}/appointments/"),
+        get("patient-upcoming", f"patients/{pat}/appointments/upcoming/"),
+        get("patient-past", f"patients/{pat}/appointments/past/"),
+
+        get("specialty-list", "admin/specialties/"),
+        send("specialty-create", "POST", "admin/specialties/create/", {"name": "Bench Specialty"}),
+        send("specialty-update", "PUT", f"admin/specialties/{fx['specialty']}/update/", {"description": "bench"}),
+        send("specialty-delete", "DELETE", f"admin/specialties/{fx['specialty']}/delete/", {}),
+
+        get("availability-list", "availability/"),
+        get("provider-availability", f"availability/provider/{p}/"),
+        get("provider-slots", f"availability/provider/{p}/slots/?{week}"),
+        get("slot-search", "availability/search/?limit=10"),
+        send("availability-create", "POST", "availability/create/",
+             {"provider_id": p, "start": slot_start.isoformat(), "end": slot_end.isoformat()}),
+        send("availability-import", "POST", "availability/import/",
+             {"provider_id": p, "windows": [{"start": slot_start.isoformat(), "end": slot_end.isoformat()}]}),
+        send("availability-update", "PUT", f"availability/{fx['window']}/update/", {"end": slot_end.isoformat()}),
+        send("availability-delete", "DELETE", f"availability/{fx['window']}/delete/", {}),
+
+        get("admin-provider-list", "admin/providers/"),
+        send("admin-provider-toggle", "POST", f"admin/providers/{p}/toggle/", {}),
+        get("admin-stats", "admin/stats/"),
+        get("metrics", "metrics/"),
+
+        get("search", "search/?q=reschedule+appointment&limit=20"),
+        get("chat-transcript", f"chat/sessions/{fx['chat_session']}/?limit=50"),
+        send("chat-append", "POST", f"chat/sessions/{fx['chat_session']}/messages/",
+             {"user_message": "Is parking available?", "bot_response": "Yes, on level 2.", "model_name": "bench"}),
+
+        send("async-register", "POST", "async/register/", {"username": "bench-register-async", "password": "bench-pass-123"}),
+        send("async-login", "POST", "async/login/", {"username": fx["provider_username"], "password": fx["password"]}),
+        get("async-provider-list", "async/providers/"),
+        get("async-provider-detail", f"async/providers/{p}/"),
+        get("async-provider-appointments", f"async/providers/{p}/appointments/"),
+        get("async-provider-upcoming", f"async/providers/{p}/appointments/upcoming/"),
+        get("async-provider-past", f"async/providers/{p}/appointments/past/"),
+        get("async-provider-today", f"async/providers/{p}/appointments/today/"),
+        get("async-patient-appointments", f"async/patients/{pat}/appointments/"),
+        get("async-patient-upcoming", f"async/patients/{pat}/appointments/upcoming/"),
+        get("async-patient-past", f"async/patients/{pat}/appointments/past/"),
+    ]
+    cases.append(get("appointment-notes", f"appointments/{apt}/notes/"))
+    cases.append(send("note-batch", "POST", "notes/batch/", {
+        "provider_id": p, "notes": [{"appointment_id": apt, "note_text": f"Batch note {i}."} for i in range(20)],
+    }))
+    if fx["note"]:
+        cases += [
+            get("note-detail", f"notes/{fx['note']}/"),
+            send("note-update", "PUT", f"notes/{fx['note']}/update/", {"note_text": "Updated by the benchmark."}),
+            send("note-delete", "DELETE", f"notes/{fx['note']}/delete/", {}),
+        ]
+    if fx["rule"]:
+        cases += [
+            send("availability-rule-update", "PUT", f"availability/rules/{fx['rule']}/update/", {"end_time": "13:00"}),
+            send("availability-rule-delete", "DELETE", f"availability/rules/{fx['rule']}/delete/", {}),
+            send("availability-rule-exception", "POST", f"availability/rules/{fx['rule']}/exceptions/",
+                 {"date": tomorrow}),
+        ]
+    return cases
+
+
+# ======================================
+# TRANSPORTS
+# ======================================
+class ClientTransport:
+    """In-process Django test client; queries are counted with metrics.count_queries."""
+
+    rolls_back_writes = True
+
+    def __init__(self):
+        self.client = Client()
+
+    def __call__(self, case):
+        timer = QueryTimer()
+        started = perf_counter()
+        with count_queries(timer):
+            if case.method == "GET":
+                response = self.client.get(case.path)
+            else:
+                # Keep every iteration working on the same seeded rows.
+                with transaction.atomic():
+                    response = self._write(case)
+                    transaction.set_rollback(True)
+        elapsed = perf_counter() - started
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code, elapsed, timer.count, timer.seconds
+
+    def _write(self, case):
+        if case.data == "photo":
+            # Uploads are content-addressed: trailing bytes after the JPEG's end
+            # marker make every one new. Renditions are rendered after commit, so
+            # under the rollback only the request path (checks, storing the
+            # original) is timed.
+            data = sample_photo() + uuid.uuid4().bytes
+            upload = SimpleUploadedFile("bench.jpg", data, content_type="image/jpeg")
+            return self.client.post(case.path, {"photo": upload})
+        return self.client.generic(case.method, case.path, case.data, content_type=case.content_type)
+
+
+class HttpTransport:
+    """A running server; query counts come from its Server-Timing header when enabled."""
+
+    rolls_back_writes = False
+
+    def __init__(self, url):
+        target = urlsplit(url)
+        if target.scheme not in ("http", "https") or not target.hostname:
+            raise CommandError(f"Invalid --url {url!r}")
+        cls = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+        self.conn = cls(target.hostname, target.port, timeout=60)
+
+    def __call__(self, case):
+        headers = {"Content-Type": case.content_type} if case.content_type else {}
+        started = perf_counter()
+        try:
+            self.conn.request(case.method, case.path, body=case.data, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            return 0, perf_counter() - started, None, None
+        elapsed = perf_counter() - started
+        return response.status, elapsed, *self._server_timing(response.getheader("Server-Timing", ""))
+
+    @staticmethod
+    def _server_timing(header):
+        queries = db_seconds = None
+        for metric in header.split(","):
+            parts = dict(
+                part.strip().split("=", 1) if "=" in part else (part.strip(), "")
+                for part in metric.split(";")
+            )
+            if "db" in parts:
+                db_seconds = float(parts.get("dur", 0)) / 1000
+                desc = parts.get("desc", "").strip('"')
+                if desc.endswith(SERVER_TIMING_QUERIES):
+                    queries = int(desc.split()[0])
+        return queries, db_seconds
+
+
+# ======================================
+# COMMAND
+# ======================================
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset in a throwaway test database and time every endpoint in "
+        "appointments/urls.py through the test client (or a running server with --url): "
+        "throughput, p50/p95/p99 latency and SQL query counts, optionally saved as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--providers", type=int, default=20)
+        parser.add_argument("--patients", type=int, default=200)
+        parser.add_argument("--appointments", type=int, default=200, help="Appointments per provider")
+        parser.add_argument("--days", type=int, default=60, help="Days of availability, centred on today")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the dataset")
+        parser.add_argument("--iterations", type=int, default=20, help="Timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=2, help="Untimed requests per endpoint")
+        parser.add_argument("--only", nargs="+", metavar="URL_NAME", help="Limit the run to these URL names")
+        parser.add_argument("--url", help="Benchmark a running server against its own database instead")
+        parser.add_argument("--writes", action="store_true", help="With --url, also send non-GET requests")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs")
+        parser.add_argument("--json", dest="json_path", help="Write results to this file")
+        parser.add_argument("--baseline", help="Earlier --json output to diff p50 and query counts against")
+
+    def handle(self, *args, **opts):
+        if opts["url"]:
+            fixtures = discover_fixtures()
+            results = self._run(HttpTransport(opts["url"]), fixtures, opts)
+            dataset = None
+        else:
+            results, dataset = self._run_in_test_db(opts)
+
+        report = {
+            "meta": self._meta(opts, dataset),
+            "results": results,
+        }
+        if opts["baseline"]:
+            self._compare(results, opts["baseline"])
+        if opts["json_path"]:
+            with open(opts["json_path"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Wrote {opts['json_path']}")
+
+    def _run_in_test_db(self, opts):
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=opts["keepdb"], serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+                cache.clear()
+                started = perf_counter()
+                dataset = synthetic.seed(
+                    providers=opts["providers"], patients=opts["patients"],
+                    appointments=opts["appointments"], days=opts["days"], random_seed=opts["seed"],
+                    chat_sessions=opts["patients"], notes_per_visit=1.0,
+                    log=lambda message: self.stdout.write(f"  seeded {message}"),
+                )
+                self.stdout.write(f"Seeded in {perf_counter() - started:.1f}s on {connection.vendor}")
+                results = self._run(ClientTransport(), discover_fixtures(create_missing=True), opts)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=opts["keepdb"])
+            teardown_test_environment()
+
+        sizes = {key: opts[key] for key in ("providers", "patients", "appointments", "days", "seed")}
+        sizes["appointment_rows"] = opts["providers"] * opts["appointments"]
+        return results, {**sizes, "first_day": dataset["first_day"]}
+
+    def _run(self, transport, fixtures, opts):
+        cases = build_cases(fixtures)
+        routes = {pattern.name for pattern in urls.urlpatterns if pattern.name}
+        missing = routes - {case.name for case in cases}
+        if missing:
+            self.stderr.write(f"Not benchmarked (no request or no fixture row): {', '.join(sorted(missing))}")
+
+        if opts["only"]:
+            cases = [case for case in cases if case.name in opts["only"]]
+        if not transport.rolls_back_writes and not opts["writes"]:
+            cases = [case for case in cases if case.method == "GET"]
+
+        # Expected 4xx responses would otherwise be logged on every iteration.
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+        self.stdout.write(
+            f"{'endpoint':<30} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}  status"
+        )
+        results = []
+        for case in cases:
+            for _ in range(opts["warmup"]):
+                transport(case)
+            samples = [transport(case) for _ in range(opts["iterations"])]
+            results.append(self._summarise(case, samples))
+            self._print(results[-1])
+        return results
+
+    def _summarise(self, case, samples):
+        latencies = sorted(elapsed for _, elapsed, _, _ in samples)
+        queries = [count for _, _, count, _ in samples if count is not None]
+        db = [seconds for _, _, _, seconds in samples if seconds is not None]
+        total = sum(latencies)
+        return {
+            "name": case.name,
+            "method": case.method,
+            "path": case.path,
+            "iterations": len(samples),
+            "status": dict(Counter(status for status, _, _, _ in samples)),
+            "rps": round(len(samples) / total, 1) if total else None,
+            "mean_ms": _ms(statistics.fmean(latencies)) if latencies else None,
+            "p50_ms": _ms(percentile(latencies, 50)),
+            "p95_ms": _ms(percentile(latencies, 95)),
+            "p99_ms": _ms(percentile(latencies, 99)),
+            "queries": statistics.median(queries) if queries else None,
+            "max_queries": max(queries) if queries else None,
+            "db_ms": _ms(statistics.fmean(db)) if db else None,
+        }
+
+    def _print(self, row):
+        status = ",".join(f"{code}x{n}" for code, n in sorted(row["status"].items()))
+        queries = "-" if row["queries"] is None else f"{row['queries']:g}"
+        self.stdout.write(
+            f"{row['name']:<30} {row['rps'] or 0:>8} {row['p50_ms']:>9} {row['p95_ms']:>9} "
+            f"{row['p99_ms']:>9} {queries:>8}  {status}"
+        )
+
+    def _compare(self, results, path):
+        with open(path) as fh:
+            before = {row["name"]: row for row in json.load(fh)["results"]}
+
+        self.stdout.write(f"\nAgainst {path}:")
+        for row in results:
+            old = before.get(row["name"])
+            if not old:
+                continue
+            changes = []
+            if old.get("queries") is not None and row["queries"] is not None and old["queries"] != row["queries"]:
+                changes.append(f"queries {old['queries']:g} -> {row['queries']:g}")
+            if old.get("p50_ms") and row["p50_ms"]:
+                ratio = row["p50_ms"] / old["p50_ms"]
+                if abs(ratio - 1) >= 0.2:
+                    changes.append(f"p50 {old['p50_ms']}ms -> {row['p50_ms']}ms ({ratio:.2f}x)")
+            if changes:
+                self.stdout.write(f"  {row['name']:<30} " + "; ".join(changes))
+
+    def _meta(self, opts, dataset):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=10,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            "commit": commit,
+            "timestamp": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "transport": "http" if opts["url"] else "test-client",
+            "url": opts["url"],
+            "iterations": opts["iterations"],
+            "dataset": dataset,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        }
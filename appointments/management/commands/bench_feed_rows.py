@@ -0,0 +1,100 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.models import Appointment, Provider, Specialty
+from appointments.rows import APPOINTMENT_ROW
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _instance_row(a):
+    # The per-instance path the feeds used before appointments/rows.py.
+    return {
+        "id": a.id,
+        "patient": a.patient_id,
+        "patient_name": a.patient_name,
+        "provider": a.provider_id,
+        "provider_name": a.provider.user.get_full_name() or a.provider.user.username,
+        "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
+        "service": a.service,
+        "start": a.start.isoformat(),
+        "end": a.end.isoformat(),
+        "status": a.status,
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of instance-based vs values_list() appointment serialization (data is rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--providers", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                self._seed(opts["rows"], opts["providers"])
+                self._run(opts["repeat"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _seed(self, rows, providers):
+        specialty = Specialty.objects.create(name=f"bench-{timezone.now().timestamp()}")
+        users = User.objects.bulk_create(
+            User(username=f"bench-provider-{i}-{specialty.id}", first_name="Bench", last_name=str(i))
+            for i in range(providers)
+        )
+        provider_objs = Provider.objects.bulk_create(
+            Provider(user=u, specialty=specialty, location="Bench", profile_photo=f"provider_photos/{u.id}.jpg")
+            for u in users
+        )
+        start = timezone.now()
+        Appointment.objects.bulk_create(
+            (
+                Appointment(
+                    provider=provider_objs[i % providers],
+                    provider_name=f"Bench {i % providers}",
+                    patient_name=f"Patient {i}",
+                    service="Checkup",
+                    start=start + timedelta(minutes=30 * i),
+                    end=start + timedelta(minutes=30 * i + 30),
+                )
+                for i in range(rows)
+            ),
+            batch_size=1000,
+        )
+
+    def _time(self, label, fn, repeat):
+        best = None
+        for _ in range(repeat):
+            began = time.perf_counter()
+            count = len(fn())
+            elapsed = time.perf_counter() - began
+            best = elapsed if best is None else min(best, elapsed)
+        self.stdout.write(f"{label:<14} {count:>8} rows  {count / best:>12,.0f} rows/sec")
+        return count / best
+
+    def _run(self, repeat):
+        qs = Appointment.objects.order_by("-start", "-pk")
+        instances = self._time(
+            "instances",
+            lambda: [_instance_row(a) for a in qs.select_related("provider__user")],
+            repeat,
+        )
+        values = self._time(
+            "values_list",
+            lambda: [APPOINTMENT_ROW(row) for row in APPOINTMENT_ROW.values(qs)],
+            repeat,
+        )
+        self.stdout.write(self.style.SUCCESS(f"speedup        {values / instances:.1f}x"))
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers_by_algorithm
+from django.core.management.base import BaseCommand, CommandError
+
+PASSWORD = "correct horse battery staple"
+
+
+def _measure(hasher, encoded, threads, seconds):
+    """Verifications/sec of ``encoded`` across ``threads`` threads for about ``seconds``."""
+    done = 0
+    lock = threading.Lock()
+    deadline = perf_counter() + seconds
+
+    def worker():
+        nonlocal done
+        count = 0
+        while perf_counter() < deadline:
+            if not hasher.verify(PASSWORD, encoded):
+                raise AssertionError(f"{hasher.algorithm} failed to verify its own hash")
+            count += 1
+        with lock:
+            done += count
+
+    began = perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(worker) for _ in range(threads)]:
+            future.result()
+    return done / (perf_counter() - began)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password verifications/sec (one login = one verification) for each configured "
+        "hasher at the PASSWORD_* cost settings, on one thread (per core) and on --threads "
+        "threads, to size workers and PASSWORD_HASHING_THREADS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--algorithm", action="append", dest="algorithms",
+                            help="argon2, scrypt or pbkdf2 (repeatable; default: all available)")
+        parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--seconds", type=float, default=3.0, help="Duration of each measurement")
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+
+    def handle(self, *args, **opts):
+        hashers = get_hashers_by_algorithm()
+        names = opts["algorithms"] or ["argon2", "scrypt", "pbkdf2_sha256"]
+        names = ["pbkdf2_sha256" if name == "pbkdf2" else name for name in names]
+        unknown = [name for name in names if name not in hashers]
+        if unknown:
+            raise CommandError(f"Not in PASSWORD_HASHERS: {', '.join(unknown)}")
+
+        self.stdout.write(
+            f"PASSWORD_HASHER={settings.PASSWORD_HASHER}, {os.cpu_count()} CPU(s), {opts['threads']} thread(s)"
+        )
+        results = []
+        for name in names:
+            hasher = hashers[name]
+            if hasher.library:
+                try:
+                    hasher._load_library()
+                except ValueError:
+                    self.stderr.write(f"{name:<14} skipped: its library is not installed")
+                    continue
+
+            began = perf_counter()
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+            hash_ms = (perf_counter() - began) * 1000
+            single = _measure(hasher, encoded, 1, opts["seconds"])
+            parallel = _measure(hasher, encoded, opts["threads"], opts["seconds"])
+
+            params = {k: v for k, v in hasher.safe_summary(encoded).items() if k not in ("algorithm", "salt", "hash")}
+            row = {
+                "algorithm": name,
+                "params": {str(k): v for k, v in params.items()},
+                "hash_ms": round(hash_ms, 1),
+                "logins_per_sec_per_core": round(single, 1),
+                "logins_per_sec": round(parallel, 1),
+                "threads": opts["threads"],
+            }
+            results.append(row)
+            self.stdout.write(
+                f"{name:<14} {row['hash_ms']:>7} ms/hash  {row['logins_per_sec_per_core']:>8} logins/s per core  "
+                f"{row['logins_per_sec']:>8} logins/s on {opts['threads']} threads  "
+                + ", ".join(f"{k}={v}" for k, v in row["params"].items())
+            )
+
+        if opts["json_path"]:
+            with open(opts["json_path"], "w") as fh:
+                json.dump({"cpus": os.cpu_count(), "results": results}, fh, indent=2)
+            self.stdout.write(f"Wrote {opts['json_path']}")
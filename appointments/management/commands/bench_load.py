@@ -0,0 +1,120 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from appointments.management.stats import percentile
+
+# (label, sync path, async path); {provider} / {patient} are filled from options.
+PAIRS = [
+    ("provider list", "/api/providers/", "/api/async/providers/"),
+    ("provider detail", "/api/providers/{provider}/", "/api/async/providers/{provider}/"),
+    ("provider upcoming", "/api/providers/{provider}/appointments/upcoming/",
+     "/api/async/providers/{provider}/appointments/upcoming/"),
+    ("provider past", "/api/providers/{provider}/appointments/past/",
+     "/api/async/providers/{provider}/appointments/past/"),
+    ("patient appointments", "/api/patients/{patient}/appointments/",
+     "/api/async/patients/{patient}/appointments/"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the sync and /api/async/ read endpoints of a running server and compare "
+        "requests/sec and latency percentiles. Run it once against the WSGI Procfile "
+        "command and once against config/gunicorn_asgi.py."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the running server")
+        parser.add_argument("--provider", type=int, default=1)
+        parser.add_argument("--patient", type=int, default=1)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint")
+        parser.add_argument("--only", choices=["sync", "async"], help="Skip the other variant")
+        parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+
+    def handle(self, *args, **opts):
+        target = urlsplit(opts["url"])
+        if target.scheme not in ("http", "https") or not target.hostname:
+            raise CommandError(f"Invalid --url {opts['url']!r}")
+
+        results = []
+        for label, sync_path, async_path in PAIRS:
+            for variant, path in (("sync", sync_path), ("async", async_path)):
+                if opts["only"] and opts["only"] != variant:
+                    continue
+                path = path.format(provider=opts["provider"], patient=opts["patient"])
+                result = self._run(target, path, opts["concurrency"], opts["requests"])
+                results.append({"endpoint": label, "variant": variant, "path": path, **result})
+                self._report(results[-1])
+
+        if opts["json_path"]:
+            with open(opts["json_path"], "w") as fh:
+                json.dump({"url": opts["url"], "concurrency": opts["concurrency"], "results": results}, fh, indent=2)
+            self.stdout.write(f"Wrote {opts['json_path']}")
+
+    def _run(self, target, path, concurrency, total):
+        latencies, errors = [], 0
+        lock = threading.Lock()
+        remaining = iter(range(total))
+        local = threading.local()
+
+        def connection():
+            if getattr(local, "conn", None) is None:
+                cls = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+                local.conn = cls(target.hostname, target.port, timeout=30)
+            return local.conn
+
+        def worker():
+            nonlocal errors
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                began = time.perf_counter()
+                try:
+                    conn = connection()
+                    conn.request("GET", path)
+                    response = conn.getresponse()
+                    response.read()
+                    ok = response.status < 400
+                except (OSError, http.client.HTTPException):
+                    local.conn = None
+                    ok = False
+                elapsed = time.perf_counter() - began
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        errors += 1
+
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(worker)
+        wall = time.perf_counter() - began
+
+        latencies.sort()
+        ms = lambda value: round(value * 1000, 2) if value is not None else None
+        return {
+            "requests": total,
+            "errors": errors,
+            "rps": round(len(latencies) / wall, 1) if wall else None,
+            "mean_ms": ms(statistics.fmean(latencies)) if latencies else None,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+        }
+
+    def _report(self, row):
+        self.stdout.write(
+            f"{row['endpoint']:<22} {row['variant']:<6} "
+            f"{row['rps'] or 0:>8} req/s  p50 {row['p50_ms']}ms  p95 {row['p95_ms']}ms  "
+            f"p99 {row['p99_ms']}ms  errors {row['errors']}"
+        )
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from appointments import chat
+from appointments.models import ChatHistory
+
+
+class Command(BaseCommand):
+    help = (
+        "Compact chat sessions idle for more than --days (default CHAT_RETENTION_DAYS) into one "
+        "archive row per session with the transcript zlib-compressed in meta. Works through "
+        "--batch-size sessions per transaction, so it can run while the API is serving traffic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CHAT_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=500, help="Sessions per transaction")
+        parser.add_argument("--delete-batch-size", type=int, default=1000, help="Rows per DELETE statement")
+        parser.add_argument("--limit", type=int, help="Stop after this many sessions")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be compacted")
+
+    def handle(self, *args, **opts):
+        if opts["days"] < 1 or opts["batch_size"] < 1 or opts["delete_batch_size"] < 1:
+            raise CommandError("--days, --batch-size and --delete-batch-size must be positive")
+
+        cutoff = timezone.now() - timedelta(days=opts["days"])
+        remaining = opts["limit"]
+        sessions = rows = raw_bytes = packed_bytes = 0
+        after = None
+        started = perf_counter()
+
+        while remaining is None or remaining > 0:
+            size = opts["batch_size"] if remaining is None else min(opts["batch_size"], remaining)
+            batch = chat.idle_sessions(cutoff, after=after, limit=size)
+            if not batch:
+                break
+            after = batch[-1]
+
+            if opts["dry_run"]:
+                sessions += len(batch)
+                rows += ChatHistory.objects.filter(session_id__in=batch).count()
+            else:
+                done = chat.compact_sessions(batch, opts["delete_batch_size"])
+                sessions, rows = sessions + done[0], rows + done[1]
+                raw_bytes, packed_bytes = raw_bytes + done[2], packed_bytes + done[3]
+                self.stdout.write(f"  {sessions} sessions, {rows} rows compacted")
+            if remaining is not None:
+                remaining -= len(batch)
+
+        elapsed = perf_counter() - started
+        if opts["dry_run"]:
+            self.stdout.write(f"Would compact {sessions} sessions ({rows} rows) idle since {cutoff:%Y-%m-%d}")
+            return
+
+        ratio = f", transcripts {raw_bytes} -> {packed_bytes} bytes" if raw_bytes else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {sessions} sessions: {rows} rows replaced by {sessions} in {elapsed:.1f}s{ratio}"
+        ))
@@ -0,0 +1,62 @@
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from appointments import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset (users, providers, availability, appointments, "
+        "doctor notes, chat history) in the configured database, e.g. --providers 2000 "
+        "--patients 200000 --appointments 1000 --chat-sessions 500000 for several million rows. "
+        "Users share one pre-hashed password; rows go in with batched bulk_create, or COPY "
+        "on Postgres with --copy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--providers", type=int, default=200)
+        parser.add_argument("--patients", type=int, default=20000)
+        parser.add_argument("--appointments", type=int, default=500, help="Appointments per provider")
+        parser.add_argument("--days", type=int, default=180, help="Days of schedule, centred on today")
+        parser.add_argument("--notes-per-visit", type=float, default=1.2,
+                            help="Mean doctor notes per completed appointment")
+        parser.add_argument("--chat-sessions", type=int, default=10000, help="Chat sessions of 2-12 messages each")
+        parser.add_argument("--batch-size", type=int, default=synthetic.SEED_BATCH_SIZE)
+        parser.add_argument("--copy", action="store_true", help="Use COPY FROM STDIN (Postgres only)")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; same seed, same data")
+        parser.add_argument("--prefix", default="synthetic", help="Username prefix of generated users")
+
+    def handle(self, *args, **opts):
+        if opts["copy"] and connection.vendor != "postgresql":
+            raise CommandError(f"--copy needs PostgreSQL; DATABASE_URL points at {connection.vendor}")
+        if min(opts["providers"], opts["patients"], opts["days"], opts["batch_size"]) < 1:
+            raise CommandError("--providers, --patients, --days and --batch-size must be positive")
+        if get_user_model().objects.filter(username__startswith=f"{opts['prefix']}-").exists():
+            raise CommandError(f"Users prefixed {opts['prefix']!r} already exist; pass another --prefix")
+
+        started = perf_counter()
+        with transaction.atomic():
+            dataset = synthetic.seed(
+                providers=opts["providers"], patients=opts["patients"],
+                appointments=opts["appointments"], days=opts["days"], random_seed=opts["seed"],
+                prefix=opts["prefix"], notes_per_visit=opts["notes_per_visit"],
+                chat_sessions=opts["chat_sessions"], batch_size=opts["batch_size"], use_copy=opts["copy"],
+                log=lambda message: self.stdout.write(f"  {message}"),
+            )
+        elapsed = perf_counter() - started
+
+        self.stdout.write("")
+        for table, rows in dataset["counts"].items():
+            seconds = dataset["seconds"].get(table)
+            if not rows or not seconds:
+                continue
+            self.stdout.write(f"{table:<14} {rows:>10} rows  {seconds:>7.1f}s  {rows / seconds:>10.0f} rows/s")
+
+        total = sum(dataset["counts"].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} rows in {elapsed:.1f}s on {connection.vendor}. "
+            f"Log in as {dataset['provider_usernames'][0]} / {dataset['password']}."
+        ))
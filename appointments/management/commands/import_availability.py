@@ -0,0 +1,72 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_time
+
+from appointments.imports import ScheduleImportError, import_windows, parse_schedule, weekly_windows
+
+WEEKDAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def _weekdays(spec):
+    """'mon-fri', 'mon,wed,fri' or '0-4' -> set of weekday numbers."""
+    def index(token):
+        token = token.strip().lower()[:3]
+        return int(token) if token.isdigit() else WEEKDAY_NAMES.index(token)
+
+    days = set()
+    for part in spec.split(","):
+        if "-" in part:
+            first, last = map(index, part.split("-", 1))
+            days.update(range(first, last + 1))
+        else:
+            days.add(index(part))
+    return days
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load availability windows from a CSV/JSON file, or generate a weekly "
+        "pattern (--weekly mon-fri --hours 09:00-17:00 --start 2026-01-05 --weeks 13). "
+        "Overlapping windows are merged; everything runs in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="CSV (start,end[,provider_id]) or JSON file")
+        parser.add_argument("--provider", type=int, help="Provider for rows without provider_id")
+        parser.add_argument("--format", choices=["csv", "json"], help="Defaults to the file extension")
+        parser.add_argument("--weekly", help="Weekdays to generate, e.g. mon-fri or mon,wed,fri")
+        parser.add_argument("--hours", default="09:00-17:00", help="Daily window for --weekly")
+        parser.add_argument("--start", help="First date for --weekly (YYYY-MM-DD)")
+        parser.add_argument("--weeks", type=int, default=13, help="Weeks to generate for --weekly (13 = a quarter)")
+
+    def handle(self, *args, **opts):
+        try:
+            if opts["weekly"]:
+                windows = self._generate(opts)
+            elif opts["path"]:
+                path = Path(opts["path"])
+                fmt = opts["format"] or ("json" if path.suffix.lower() == ".json" else "csv")
+                windows = parse_schedule(path.read_text(encoding="utf-8-sig"), fmt, opts["provider"])
+            else:
+                raise CommandError("Give a file path or --weekly")
+            summary = import_windows(windows)
+        except (ScheduleImportError, ValueError, OSError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            "Imported {received} windows for {providers} provider(s): "
+            "{created} created, {replaced} existing merged".format(**summary)
+        ))
+
+    def _generate(self, opts):
+        if not opts["provider"] or not opts["start"]:
+            raise CommandError("--weekly needs --provider and --start")
+        first_day = parse_date(opts["start"])
+        start_time, end_time = (parse_time(t) for t in opts["hours"].split("-", 1))
+        if first_day is None or start_time is None or end_time is None or end_time <= start_time:
+            raise CommandError("Invalid --start or --hours")
+        return [
+            (opts["provider"], start, end)
+            for start, end in weekly_windows(_weekdays(opts["weekly"]), start_time, end_time, first_day, opts["weeks"])
+        ]
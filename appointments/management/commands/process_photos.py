@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from appointments import photos
+from appointments.models import Provider
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the PHOTO_RENDITIONS sizes for providers whose photo has none: uploads still "
+        "pending after a restart, or photos that predate renditions (every photo after a "
+        "PHOTO_RENDITIONS/PHOTO_FORMAT change, with --all). profile_photo then points at the largest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-render every provider photo")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many photos would be processed")
+
+    def handle(self, *args, **opts):
+        qs = Provider.objects.exclude(profile_photo="").exclude(profile_photo__isnull=True)
+        if not opts["all"]:
+            qs = qs.filter(photo_renditions={})
+        if opts["dry_run"]:
+            self.stdout.write(f"{qs.count()} provider photo(s) to process")
+            return
+
+        done = failed = 0
+        for provider in qs.only("id", "profile_photo", "photo_renditions").iterator(chunk_size=100):
+            try:
+                with provider.profile_photo.open("rb") as fh:
+                    renditions = photos.render(fh.read())
+            except (OSError, photos.PhotoError) as e:
+                self.stderr.write(f"Provider {provider.id}: {e}")
+                failed += 1
+                continue
+            photos.apply(provider, renditions)
+            done += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} photo(s), {failed} failed"))
@@ -0,0 +1,30 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from appointments import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text search index for chat history and doctor notes. Needed on SQLite "
+        "after bulk loads that skip signals; on Postgres the index is a generated column and this "
+        "does nothing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--type", dest="kinds", action="append", choices=list(search.SPECS),
+                            help="Only rebuild this type (repeatable)")
+
+    def handle(self, *args, **opts):
+        backend = search.get_backend()
+        if backend.maintained_by_database:
+            self.stdout.write(f"{type(backend).__name__} is maintained by {connection.vendor}; nothing to do.")
+            return
+
+        for kind in opts["kinds"] or search.SPECS:
+            started = perf_counter()
+            with transaction.atomic():
+                backend.rebuild(kind)
+            self.stdout.write(f"{kind}: rebuilt in {perf_counter() - started:.1f}s")
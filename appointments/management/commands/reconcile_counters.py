@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from appointments import counters
+
+
+class Command(BaseCommand):
+    help = "Recount providers, patients and appointments and fix any drift in the PlatformStats row."
+
+    def handle(self, *args, **opts):
+        drift = counters.reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters already match"))
+            return
+        for field, (stored, actual) in drift.items():
+            self.stdout.write(f"{field}: {stored} -> {actual}")
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(drift)} counter(s)"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from appointments.booking import overlapping_bookings
+from appointments.models import Appointment
+
+
+class Command(BaseCommand):
+    help = (
+        "List active appointments that overlap an earlier booking for the same provider, which "
+        "block migration 0007's constraints. --cancel cancels them, keeping the earliest of each group."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cancel", action="store_true", help="Cancel the listed appointments")
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            pairs = list(overlapping_bookings())
+            if not pairs:
+                self.stdout.write(self.style.SUCCESS("No overlapping appointments"))
+                return
+            for kept_id, apt_id in pairs:
+                self.stdout.write(f"  {apt_id} overlaps {kept_id}")
+
+            if not opts["cancel"]:
+                self.stdout.write(f"{len(pairs)} overlapping appointment(s); run with --cancel to cancel them")
+                return
+            ids = [apt_id for _, apt_id in pairs]
+            for batch in range(0, len(ids), 500):
+                Appointment.objects.filter(id__in=ids[batch:batch + 500]).update(
+                    status=Appointment.Status.CANCELLED, updated_at=timezone.now(),
+                )
+        self.stdout.write(self.style.SUCCESS(f"Cancelled {len(ids)} appointment(s): {', '.join(map(str, ids))}"))
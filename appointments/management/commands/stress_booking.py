@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.utils import timezone
+
+from appointments.booking import BookingError, book_appointment
+from appointments.models import Appointment, Availability, Provider, Specialty
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel bookings at one synthetic provider and assert no two active "
+        "appointments overlap. Creates its own provider and removes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--attempts", type=int, default=50, help="Bookings tried per thread")
+        parser.add_argument("--slots", type=int, default=40, help="Distinct 30-minute slots contended for")
+
+    def handle(self, *args, **opts):
+        if connection.vendor == "sqlite" and connection.settings_dict["NAME"] == ":memory:":
+            raise CommandError("Needs a file-backed or server database; threads cannot share :memory:.")
+
+        stamp = int(time.time() * 1000)
+        specialty = Specialty.objects.create(name=f"stress-{stamp}")
+        user = User.objects.create(username=f"stress-provider-{stamp}")
+        provider = Provider.objects.create(user=user, specialty=specialty, location="Stress")
+        try:
+            self._run(provider, opts)
+        finally:
+            provider.delete()
+            user.delete()
+            specialty.delete()
+
+    def _run(self, provider, opts):
+        slot = timedelta(minutes=30)
+        day = (timezone.now() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        Availability.objects.create(provider=provider, start=day, end=day + slot * opts["slots"])
+
+        # Half-slot offsets make neighbouring attempts overlap without matching bounds,
+        # which the old unique_together could not catch.
+        candidates = [day + slot * i / 2 for i in range(opts["slots"] * 2 - 1)]
+        outcomes = {"booked": 0, "conflict": 0, "locked": 0}
+        lock = threading.Lock()
+
+        def worker(offset):
+            try:
+                for n in range(opts["attempts"]):
+                    start = candidates[(offset * 7 + n * 13) % len(candidates)]
+                    try:
+                        book_appointment(provider.id, start, start + slot, service="stress")
+                        key = "booked"
+                    except BookingError:
+                        key = "conflict"
+                    except OperationalError:
+                        key = "locked"
+                    with lock:
+                        outcomes[key] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(opts["threads"])]
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - began
+
+        rows = list(
+            Appointment.objects
+            .filter(provider=provider)
+            .exclude(status=Appointment.Status.CANCELLED)
+            .order_by("start")
+            .values_list("start", "end")
+        )
+        overlaps = sum(1 for (_, prev_end), (start, _) in zip(rows, rows[1:]) if start < prev_end)
+
+        total = sum(outcomes.values())
+        self.stdout.write(
+            f"{total} attempts in {elapsed:.2f}s ({total / elapsed:,.0f} bookings/sec): "
+            f"{outcomes['booked']} booked, {outcomes['conflict']} rejected, {outcomes['locked']} lock timeouts"
+        )
+        if overlaps or outcomes["booked"] != len(rows):
+            raise CommandError(f"Double-booking detected: {overlaps} overlapping appointments")
+        self.stdout.write(self.style.SUCCESS("No double-booking"))
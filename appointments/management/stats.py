@@ -0,0 +1,11 @@
+# ======================================
+# BENCHMARK STATISTICS
+# ======================================
+# Shared by bench_api and bench_load so both report the same percentiles.
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list; None when it is empty."""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,125 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from . import photos
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+# ======================================
+# MEDIA FILES
+# ======================================
+# Uploaded files are served by this view in every environment. Full
+# responses hand the open file to the server's wsgi.file_wrapper, which
+# gunicorn sends with sendfile(); MEDIA_ACCEL_REDIRECT hands the whole
+# transfer to nginx instead. Photo renditions are content-addressed, so they
+# are cacheable forever; anything else is revalidated with its ETag.
+
+class _Slice:
+    """Reads at most ``length`` bytes of ``fh`` from ``start``, for 206 responses."""
+
+    def __init__(self, fh, start, length):
+        fh.seek(start)
+        self.fh, self.remaining, self.name = fh, length, fh.name
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fh.close()
+
+
+def _etag(stat):
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _byte_range(request, size, etag, last_modified):
+    """
+    (start, end) of a single satisfiable ``Range``, None to send the whole
+    file, or False when it cannot be satisfied. Multi-range requests,
+    malformed ranges (RFC 9110 says to ignore them) and stale ``If-Range``
+    validators get the whole file.
+    """
+    header = request.headers.get("Range")
+    match = RANGE.fullmatch(header.strip()) if header else None
+    if match is None or match.groups() == ("", ""):
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    first, last = match.groups()
+    if first and last and int(first) > int(last):
+        return None
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size:
+        return False
+    return start, end
+
+
+def _headers(response, name, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = (
+        IMMUTABLE if photos.is_rendition(name) else f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+    )
+    return response
+
+
+def serve(request, path):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("File not found")
+    # Judge the normalized name, so "x/../photo_uploads/..." is refused too.
+    name = os.path.relpath(fullpath, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, "/")
+    if not os.path.isfile(fullpath) or photos.is_upload(name):
+        raise Http404("File not found")
+
+    etag, last_modified = _etag(stat), int(stat.st_mtime)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _headers(not_modified, name, etag, last_modified)
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx serves the file (ranges included) from its internal location.
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT + name
+        return _headers(response, name, etag, last_modified)
+
+    byte_range = _byte_range(request, stat.st_size, etag, last_modified)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return _headers(response, name, etag, last_modified)
+
+    fh = open(fullpath, "rb")
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(_Slice(fh, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return _headers(response, name, etag, last_modified)
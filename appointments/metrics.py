@@ -0,0 +1,276 @@
+import os
+import random
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from inspect import iscoroutinefunction
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils.decorators import sync_and_async_middleware
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED = "<unmatched>"
+# request.method is whatever the client sent; anything else is labelled
+# OTHER so made-up methods cannot add label series without bound.
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+OTHER_METHOD = "OTHER"
+
+
+# ======================================
+# PER-THREAD AGGREGATION
+# ======================================
+# Each thread only ever writes its own dict, so recording a request takes no
+# lock; the registry lock is taken once per thread, on its first request.
+# The exporter sums every thread's dict at scrape time. Counters are per
+# worker process; the exposition carries a pid label so scrapes of
+# different gunicorn workers do not overwrite each other.
+
+class RouteStats:
+    __slots__ = (
+        "requests", "seconds", "buckets",
+        "sampled", "queries", "db_seconds", "non_db_seconds", "response_bytes",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.sampled = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.non_db_seconds = 0.0
+        self.response_bytes = 0
+
+
+_local = threading.local()
+_stores = []
+_stores_lock = threading.Lock()
+
+
+def _thread_store():
+    store = getattr(_local, "routes", None)
+    if store is None:
+        store = _local.routes = {}
+        with _stores_lock:
+            _stores.append(store)
+    return store
+
+
+def record(route, method, status, seconds, timer=None, size=None):
+    store = _thread_store()
+    key = (route, method, status)
+    stats = store.get(key)
+    if stats is None:
+        stats = store[key] = RouteStats()
+
+    stats.requests += 1
+    stats.seconds += seconds
+    stats.buckets[bisect_left(DURATION_BUCKETS, seconds)] += 1
+    if timer is not None:
+        stats.sampled += 1
+        stats.queries += timer.count
+        stats.db_seconds += timer.seconds
+        stats.non_db_seconds += max(seconds - timer.seconds, 0.0)
+        stats.response_bytes += size or 0
+
+
+def snapshot():
+    """{(route, method, status): RouteStats} summed over every thread."""
+    with _stores_lock:
+        stores = list(_stores)
+
+    totals = {}
+    for store in stores:
+        for key, stats in list(store.items()):
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = RouteStats()
+            for field in RouteStats.__slots__:
+                if field == "buckets":
+                    total.buckets = [a + b for a, b in zip(total.buckets, stats.buckets)]
+                else:
+                    setattr(total, field, getattr(total, field) + getattr(stats, field))
+    return totals
+
+
+def reset():
+    with _stores_lock:
+        for store in _stores:
+            store.clear()
+
+
+# ======================================
+# PROMETHEUS EXPOSITION
+# ======================================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+def render():
+    pid = os.getpid()
+    totals = snapshot()
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    family("http_requests_total", "counter", "Requests handled, by URL name, method and status.")
+    for (route, method, status), stats in sorted(totals.items()):
+        lines.append(f"http_requests_total{_labels(pid=pid, route=route, method=method, status=status)} {stats.requests}")
+
+    by_route = {}
+    for (route, _method, _status), stats in totals.items():
+        by_route.setdefault(route, []).append(stats)
+
+    family("http_request_duration_seconds", "histogram", "Wall time spent in the Django stack.")
+    for route, group in sorted(by_route.items()):
+        cumulative = 0
+        for i, bound in enumerate(DURATION_BUCKETS + (float("inf"),)):
+            cumulative += sum(stats.buckets[i] for stats in group)
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"http_request_duration_seconds_bucket{_labels(pid=pid, route=route, le=le)} {cumulative}")
+        lines.append(f"http_request_duration_seconds_sum{_labels(pid=pid, route=route)} {_number(sum(s.seconds for s in group))}")
+        lines.append(f"http_request_duration_seconds_count{_labels(pid=pid, route=route)} {sum(s.requests for s in group)}")
+
+    sampled = [
+        ("http_sampled_requests_total", "counter", "Requests that were instrumented (see METRICS_SAMPLE_RATE).", "sampled"),
+        ("http_db_queries_total", "counter", "SQL queries issued by sampled requests.", "queries"),
+        ("http_db_seconds_total", "counter", "Time sampled requests spent executing SQL.", "db_seconds"),
+        ("http_non_db_seconds_total", "counter",
+         "Wall time of sampled requests minus their SQL time (middleware, view code and serialization together).",
+         "non_db_seconds"),
+        ("http_response_bytes_total", "counter", "Body bytes of sampled, non-streaming responses.", "response_bytes"),
+    ]
+    for name, kind, help_text, field in sampled:
+        family(name, kind, help_text)
+        for route, group in sorted(by_route.items()):
+            value = sum(getattr(stats, field) for stats in group)
+            lines.append(f"{name}{_labels(pid=pid, route=route)} {_number(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+# ======================================
+# MIDDLEWARE
+# ======================================
+class QueryTimer:
+    """Counts and times every statement run under count_queries()."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.seconds += seconds
+
+
+# Async views run their ORM calls in sync_to_async threads, each with its own
+# connection, so a wrapper installed on the request thread's connection would
+# miss them. Instead every connection carries _execute from the moment it is
+# opened, and it reports to the QueryTimers active in the calling context;
+# sync_to_async copies contextvars into its threads.
+_active_timers = ContextVar("metrics_query_timers", default=())
+
+
+def _execute(execute, sql, params, many, context):
+    timers = _active_timers.get()
+    if not timers:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - started
+        for timer in timers:
+            timer.add(elapsed)
+
+
+def instrument(conn):
+    if _execute not in conn.execute_wrappers:
+        conn.execute_wrappers.append(_execute)
+
+
+@receiver(connection_created)
+def _instrument_new_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+def instrument_all():
+    """For connections opened before this module was imported (AppConfig.ready)."""
+    for conn in connections.all(initialized_only=True):
+        instrument(conn)
+
+
+@contextmanager
+def count_queries(timer):
+    """
+    Report every query run in this context, on any thread's connection, to
+    ``timer`` (as well as to any enclosing count_queries() timers).
+    """
+    token = _active_timers.set(_active_timers.get() + (timer,))
+    try:
+        yield timer
+    finally:
+        _active_timers.reset(token)
+
+
+def _sampled():
+    rate = settings.METRICS_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def _finish(request, response, started, timer):
+    seconds = perf_counter() - started
+    match = getattr(request, "resolver_match", None)
+    route = (match.url_name or match.view_name) if match else UNMATCHED
+    size = None if response.streaming else len(response.content)
+    method = request.method if request.method in METHODS else OTHER_METHOD
+    record(route, method, response.status_code, seconds, timer, size)
+
+    if timer is not None and settings.METRICS_SERVER_TIMING:
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={timer.seconds * 1000:.2f};desc="{timer.count} queries"',
+            f"non-db;dur={max(seconds - timer.seconds, 0) * 1000:.2f}",
+            f"total;dur={seconds * 1000:.2f}",
+        ])
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Count every request per URL name; on a METRICS_SAMPLE_RATE share of them
+    also count queries (see count_queries) and split DB from non-DB time.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started = perf_counter()
+            if not _sampled():
+                return _finish(request, await get_response(request), started, None)
+            with count_queries(QueryTimer()) as timer:
+                response = await get_response(request)
+            return _finish(request, response, started, timer)
+    else:
+        def middleware(request):
+            started = perf_counter()
+            if not _sampled():
+                return _finish(request, get_response(request), started, None)
+            with count_queries(QueryTimer()) as timer:
+                response = get_response(request)
+            return _finish(request, response, started, timer)
+    return middleware
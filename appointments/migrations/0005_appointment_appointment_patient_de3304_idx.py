@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_provider_bio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'start'], name='appointment_patient_de3304_idx'),
+        ),
+    ]
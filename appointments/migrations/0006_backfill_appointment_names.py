@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_names(apps, schema_editor):
+    Appointment = apps.get_model("appointments", "Appointment")
+    Provider = apps.get_model("appointments", "Provider")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    def display(first, last, username):
+        return f"{first} {last}".strip() or username
+
+    provider_ids = Appointment.objects.filter(provider_name="").values("provider_id")
+    for pid, first, last, username in Provider.objects.filter(id__in=provider_ids).values_list(
+        "id", "user__first_name", "user__last_name", "user__username"
+    ):
+        Appointment.objects.filter(provider_id=pid, provider_name="").update(
+            provider_name=display(first, last, username)
+        )
+
+    patient_ids = Appointment.objects.filter(patient_name="", patient__isnull=False).values("patient_id")
+    for uid, first, last, username in User.objects.filter(id__in=patient_ids).values_list(
+        "id", "first_name", "last_name", "username"
+    ):
+        Appointment.objects.filter(patient_id=uid, patient_name="").update(
+            patient_name=display(first, last, username)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_appointment_appointment_patient_de3304_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_names, migrations.RunPython.noop),
+    ]
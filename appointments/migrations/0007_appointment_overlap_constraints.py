@@ -0,0 +1,73 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def check_overlapping(apps, schema_editor):
+    """
+    Both constraints below fail if active appointments already overlap.
+    Stop with the ids instead of a bare IntegrityError, and leave deciding
+    which booking to keep to `manage.py resolve_overlaps`.
+    """
+    Appointment = apps.get_model("appointments", "Appointment")
+    rows = (
+        Appointment.objects.using(schema_editor.connection.alias)
+        .exclude(status="cancelled")
+        .order_by("provider_id", "start", "id")
+        .values_list("id", "provider_id", "start", "end")
+    )
+    overlapping = []
+    kept_provider = kept_end = None
+    for apt_id, provider_id, start, end in rows.iterator():
+        if provider_id == kept_provider and start < kept_end:
+            overlapping.append(apt_id)
+            continue
+        kept_provider, kept_end = provider_id, end
+
+    if overlapping:
+        raise RuntimeError(
+            f"{len(overlapping)} active appointment(s) overlap an earlier booking for the same provider: "
+            f"{', '.join(map(str, overlapping))}. Review them with `manage.py resolve_overlaps` "
+            f"(add --cancel to cancel them) and run migrate again."
+        )
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE appointments_appointment ADD CONSTRAINT appointment_no_overlap "
+        "EXCLUDE USING gist (provider_id WITH =, tstzrange(start, \"end\", '[)') WITH &&) "
+        "WHERE (status <> 'cancelled')"
+    )
+
+
+def drop_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "ALTER TABLE appointments_appointment DROP CONSTRAINT IF EXISTS appointment_no_overlap"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_backfill_appointment_names'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_overlapping, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='appointment',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('provider', 'start', 'end'), name='unique_active_slot'),
+        ),
+        migrations.RunPython(add_exclusion_constraint, drop_exclusion_constraint),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    PlatformStats = apps.get_model("appointments", "PlatformStats")
+    Provider = apps.get_model("appointments", "Provider")
+    Appointment = apps.get_model("appointments", "Appointment")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    PlatformStats.objects.create(
+        id=1,
+        total_providers=Provider.objects.count(),
+        total_patients=User.objects.filter(is_staff=False).exclude(provider_profile__isnull=False).count(),
+        total_appointments=Appointment.objects.count(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0008_availability_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformStats',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, editable=False, primary_key=True, serialize=False)),
+                ('total_providers', models.BigIntegerField(default=0)),
+                ('total_patients', models.BigIntegerField(default=0)),
+                ('total_appointments', models.BigIntegerField(default=0)),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'platform stats',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0009_platform_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specialty',
+            name='description',
+            field=models.TextField(blank=True),
+        ),
+    ]
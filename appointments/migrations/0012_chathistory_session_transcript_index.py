@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:39
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_appointment_feed_validator_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(fields=['session_id', 'created_at'], name='appointment_session_58bb05_idx'),
+        ),
+        migrations.AlterField(
+            model_name='chathistory',
+            name='session_id',
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# Full-text index storage for appointments.search. The tables are not Django
+# models: on Postgres each table gains a generated tsvector column with a GIN
+# index; on SQLite an FTS5 table plus a rowid -> UUID map. Other databases
+# get nothing and have no search backend.
+SEARCHABLE = {
+    "appointments_chathistory": ("user_message", "bot_response"),
+    "appointments_doctornote": ("note_text", "author_name"),
+}
+WEIGHTS = "ABCD"
+
+
+def _postgres(table, fields):
+    vector = " || ".join(
+        f"setweight(to_tsvector('english'::regconfig, coalesce({field}, '')), '{weight}')"
+        for field, weight in zip(fields, WEIGHTS)
+    )
+    return [
+        f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX {table}_search_idx ON {table} USING GIN (search_vector)",
+    ], [
+        f"DROP INDEX IF EXISTS {table}_search_idx",
+        f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+
+def _sqlite(table, fields):
+    columns = ", ".join(fields)
+    values = ", ".join(f"coalesce(t.{field}, '')" for field in fields)
+    return [
+        f"CREATE VIRTUAL TABLE {table}_fts USING fts5({columns}, tokenize='porter unicode61')",
+        f"CREATE TABLE {table}_fts_ids (rowid INTEGER PRIMARY KEY, object_id char(32) NOT NULL UNIQUE)",
+        f"INSERT INTO {table}_fts_ids (object_id) SELECT id FROM {table}",
+        f"INSERT INTO {table}_fts (rowid, {columns}) "
+        f"SELECT m.rowid, {values} FROM {table}_fts_ids m JOIN {table} t ON t.id = m.object_id",
+    ], [
+        f"DROP TABLE IF EXISTS {table}_fts",
+        f"DROP TABLE IF EXISTS {table}_fts_ids",
+    ]
+
+
+DDL = {"postgresql": _postgres, "sqlite": _sqlite}
+
+
+def _run(schema_editor, reverse):
+    ddl = DDL.get(schema_editor.connection.vendor)
+    if ddl is None:
+        return
+    for table, fields in SEARCHABLE.items():
+        forward, backward = ddl(table, fields)
+        for statement in backward if reverse else forward:
+            schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, reverse=False)
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, reverse=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0012_chathistory_session_transcript_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='provider',
+            name='photo_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
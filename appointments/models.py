@@ -10,6 +10,7 @@ User = get_user_model()
 # ======================================
 class Specialty(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True)
 
     def __str__(self):
         return self.name
@@ -35,6 +36,9 @@ class Provider(models.Model):
         blank=True,
         null=True
     )
+    # {label: storage name} of the downscaled copies made by appointments.photos;
+    # profile_photo points at the largest one.
+    photo_renditions = models.JSONField(default=dict, blank=True)
 
     # NEW — approval system for admin dashboard
     is_approved = models.BooleanField(default=False)
@@ -63,6 +67,56 @@ class Availability(models.Model):
         return f"{self.provider} | {self.start:%Y-%m-%d %H:%M} - {self.end:%H:%M}"
 
 
+# ======================================
+# RECURRING AVAILABILITY
+# ======================================
+class AvailabilityRule(models.Model):
+    """Weekly window, expanded into concrete slots only for the range being queried."""
+
+    class Weekday(models.IntegerChoices):
+        MONDAY = 0, "Monday"
+        TUESDAY = 1, "Tuesday"
+        WEDNESDAY = 2, "Wednesday"
+        THURSDAY = 3, "Thursday"
+        FRIDAY = 4, "Friday"
+        SATURDAY = 5, "Saturday"
+        SUNDAY = 6, "Sunday"
+
+    provider = models.ForeignKey(
+        Provider,
+        on_delete=models.CASCADE,
+        related_name="availability_rules"
+    )
+    day_of_week = models.PositiveSmallIntegerField(choices=Weekday.choices)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    valid_from = models.DateField()
+    valid_until = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["provider", "day_of_week"])]
+
+    def __str__(self):
+        return f"{self.provider} | {self.get_day_of_week_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class AvailabilityException(models.Model):
+    """A date on which a recurring rule does not apply (holiday, leave)."""
+    rule = models.ForeignKey(
+        AvailabilityRule,
+        on_delete=models.CASCADE,
+        related_name="exceptions"
+    )
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ("rule", "date")
+
+    def __str__(self):
+        return f"{self.rule} | skip {self.date}"
+
+
 # ======================================
 # APPOINTMENT
 # ======================================
@@ -74,6 +128,13 @@ class Appointment(models.Model):
         CANCELLED = "cancelled", "Cancelled"
         COMPLETED = "completed", "Completed"
 
+    # target status -> statuses it may be reached from
+    ALLOWED_FROM = {
+        Status.CONFIRMED: (Status.REQUESTED,),
+        Status.CANCELLED: (Status.REQUESTED, Status.CONFIRMED),
+        Status.COMPLETED: (Status.REQUESTED, Status.CONFIRMED),
+    }
+
     patient = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     provider = models.ForeignKey(
         Provider,
@@ -100,8 +161,31 @@ class Appointment(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        unique_together = ("provider", "start", "end")
-        indexes = [models.Index(fields=["provider", "start", "end"])]
+        # Cancelled rows free their slot. On Postgres migration 0007 also adds
+        # an exclusion constraint (appointment_no_overlap) so overlapping
+        # active bookings with different bounds are rejected too.
+        constraints = [
+            models.UniqueConstraint(
+                fields=["provider", "start", "end"],
+                condition=~models.Q(status="cancelled"),
+                name="unique_active_slot",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["provider", "start", "end"]),
+            models.Index(fields=["patient", "start"]),
+            # Covers the Max(updated_at)/Count validator of the dashboard feeds.
+            models.Index(fields=["provider", "start", "updated_at"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Feeds read these columns directly instead of joining to auth_user.
+        if not self.provider_name and self.provider_id:
+            user = self.provider.user
+            self.provider_name = user.get_full_name() or user.username
+        if not self.patient_name and self.patient_id:
+            self.patient_name = self.patient.get_full_name() or self.patient.username
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.patient} → {self.provider} ({self.start:%Y-%m-%d %H:%M})"
@@ -112,13 +196,19 @@ class Appointment(models.Model):
 # ======================================
 class ChatHistory(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    session_id = models.UUIDField(default=uuid.uuid4, db_index=True)
+    session_id = models.UUIDField(default=uuid.uuid4)
     user_message = models.TextField()
     bot_response = models.TextField(blank=True)
     model_name = models.CharField(max_length=80, blank=True)
     meta = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Transcripts are read in (created_at, id) order within a session; the
+        # composite index also serves plain session_id lookups, so it replaces
+        # the old single-column one.
+        indexes = [models.Index(fields=["session_id", "created_at"])]
+
     def __str__(self):
         return f"Chat #{self.session_id} @ {self.created_at:%Y-%m-%d %H:%M}"
 
@@ -139,3 +229,25 @@ class DoctorNote(models.Model):
 
     def __str__(self):
         return f"Note by {self.author_name} on {self.appointment_id}"
+
+
+# ======================================
+# PLATFORM COUNTERS
+# ======================================
+class PlatformStats(models.Model):
+    """
+    Single-row table of platform totals, kept current by signals in
+    appointments/signals.py so admin_stats never has to COUNT(*).
+    `manage.py reconcile_counters` rebuilds it from the source tables.
+    """
+    id = models.PositiveSmallIntegerField(primary_key=True, default=1, editable=False)
+    total_providers = models.BigIntegerField(default=0)
+    total_patients = models.BigIntegerField(default=0)
+    total_appointments = models.BigIntegerField(default=0)
+    reconciled_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "platform stats"
+
+    def __str__(self):
+        return f"{self.total_providers} providers, {self.total_patients} patients, {self.total_appointments} appointments"
@@ -0,0 +1,164 @@
+import base64
+import json
+from collections import namedtuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+Page = namedtuple("Page", ["items", "next_cursor", "paginated"])
+
+
+class InvalidPage(ValueError):
+    """Bad paging parameters; the message is meant for the client."""
+
+
+class InvalidCursor(InvalidPage):
+    def __init__(self, token):
+        super().__init__("Invalid cursor")
+        self.token = token
+
+
+# ======================================
+# CURSOR ENCODING
+# ======================================
+# A cursor is the (timestamp, pk) of the last row on the previous page,
+# packed as url-safe base64 so clients treat it as an opaque token.
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), str(pk)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _int_pk(value):
+    pk = int(value)
+    if not -2**63 <= pk < 2**63:
+        raise ValueError("pk out of range")
+    return pk
+
+
+def decode_cursor(token, pk_type=_int_pk):
+    """
+    (timestamp, pk) from a cursor. ``pk_type`` parses the pk string
+    (a 64-bit int by default, or e.g. ``uuid.UUID``) so a forged pk is rejected here instead of
+    failing inside the query.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(value, str) or not isinstance(pk, str):
+            raise TypeError("cursor parts must be strings")
+        value, pk = parse_datetime(value), pk_type(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if value is None:
+        raise InvalidCursor(token)
+    return value, pk
+
+
+def encode_offset(offset):
+    return base64.urlsafe_b64encode(json.dumps([offset]).encode()).decode().rstrip("=")
+
+
+def decode_offset(token):
+    """Offset cursors are for relevance-ranked results, which have no stable keyset."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        (offset,) = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise InvalidCursor(token)
+    return offset
+
+
+def page_size(params):
+    try:
+        size = int(params.get("limit", DEFAULT_PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = 0
+    if size < 1:
+        raise InvalidPage(f"limit must be an integer between 1 and {MAX_PAGE_SIZE}")
+    return min(size, MAX_PAGE_SIZE)
+
+
+# ======================================
+# KEYSET PAGINATION
+# ======================================
+def ordered(qs, field="start", descending=False):
+    if descending:
+        return qs.order_by(f"-{field}", "-pk")
+    return qs.order_by(field, "pk")
+
+
+def _instance_key(field):
+    return lambda obj: (getattr(obj, field), obj.pk)
+
+
+def _seek(qs, params, field, descending, pk_type):
+    """(ordered queryset limited to size + 1 rows, size), or (full queryset, None) when not paging."""
+    qs = ordered(qs, field, descending)
+
+    if "cursor" not in params and "limit" not in params:
+        return qs, None
+
+    size = page_size(params)
+    token = params.get("cursor")
+    if token:
+        value, pk = decode_cursor(token, pk_type)
+        op = "lt" if descending else "gt"
+        qs = qs.filter(
+            Q(**{f"{field}__{op}": value}) | Q(**{field: value, f"pk__{op}": pk})
+        )
+    return qs[:size + 1], size
+
+
+def _page(items, size, field, cursor_key):
+    if size is None:
+        return Page(items, None, False)
+
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        value, pk = (cursor_key or _instance_key(field))(items[-1])
+        next_cursor = encode_cursor(value, pk)
+    return Page(items, next_cursor, True)
+
+
+def keyset_page(qs, params, field="start", descending=False, cursor_key=None, pk_type=_int_pk):
+    """
+    Page ``qs`` on (field, pk). Only kicks in when the client sends
+    ``limit`` or ``cursor`` so existing full-list callers keep working.
+    ``cursor_key`` reads (field, pk) back from a row; it defaults to
+    attribute access for model instances. ``pk_type`` parses the cursor's pk.
+
+    Seeking past the last-seen (field, pk) instead of using OFFSET keeps
+    every page as cheap as the first one.
+    """
+    qs, size = _seek(qs, params, field, descending, pk_type)
+    return _page(list(qs), size, field, cursor_key)
+
+
+async def akeyset_page(qs, params, field="start", descending=False, cursor_key=None, pk_type=_int_pk):
+    """keyset_page() for async views."""
+    qs, size = _seek(qs, params, field, descending, pk_type)
+    return _page([item async for item in qs], size, field, cursor_key)
+
+
+def keyset_page_list(items, params, field="start", cursor_key=None, pk_type=_int_pk):
+    """
+    keyset_page() for rows already in memory and sorted on (field, pk), with
+    the same cursors. ``cursor_key`` must return the pk as a string.
+    """
+    if "cursor" not in params and "limit" not in params:
+        return Page(items, None, False)
+
+    key = cursor_key or _instance_key(field)
+    size = page_size(params)
+    token = params.get("cursor")
+    if token:
+        value, pk = decode_cursor(token, pk_type)
+        items = [item for item in items if key(item) > (value, str(pk))]
+    return _page(items[:size + 1], size, field, key)
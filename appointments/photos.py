@@ -0,0 +1,210 @@
+import hashlib
+import io
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from PIL import Image, ImageOps
+
+from .models import Provider
+
+logger = logging.getLogger(__name__)
+
+PHOTO_DIR = "provider_photos"
+# Originals wait here until their renditions exist; appointments.media never serves them.
+UPLOAD_DIR = "photo_uploads"
+# MPO is the multi-picture JPEG many phone cameras write.
+UPLOAD_EXTENSIONS = {"JPEG": "jpg", "MPO": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+ACCEPTED_FORMATS = set(UPLOAD_EXTENSIONS)
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg", "PNG": "png"}
+RENDITION_NAME = re.compile(rf"{PHOTO_DIR}/[0-9a-f]{{32}}-\d+\.(?:{'|'.join(EXTENSIONS.values())})")
+
+storage = Provider._meta.get_field("profile_photo").storage
+
+
+class PhotoError(ValueError):
+    pass
+
+
+# ======================================
+# VALIDATION
+# ======================================
+def _header(data):
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.format, image.size
+    except (Image.DecompressionBombError, OSError, SyntaxError):
+        raise PhotoError("Unreadable or unsupported image")
+
+
+def read_upload(upload):
+    """
+    Size, format and dimension checks from the upload's header, before any
+    pixels are decoded. Returns the raw bytes.
+    """
+    if upload.size > settings.PHOTO_MAX_UPLOAD_BYTES:
+        raise PhotoError(f"Photo is larger than {settings.PHOTO_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+
+    data = upload.read()
+    fmt, (width, height) = _header(data)
+
+    if fmt not in ACCEPTED_FORMATS:
+        raise PhotoError(f"Unsupported image format {fmt}; use JPEG, PNG, WebP or GIF")
+    if width * height > settings.PHOTO_MAX_PIXELS:
+        raise PhotoError(f"Photo is larger than {settings.PHOTO_MAX_PIXELS // 1_000_000} megapixels")
+    return data
+
+
+# ======================================
+# RENDITIONS
+# ======================================
+# Every rendition is named after the SHA-256 of the uploaded bytes plus its
+# size and format, so the same photo uploaded twice (or by two providers)
+# is stored once, and a name's content never changes: it can be served with
+# a far-future, immutable Cache-Control. Renditions are re-encoded, which
+# also drops EXIF metadata such as GPS positions.
+
+def _name(digest, edge):
+    fmt = settings.PHOTO_FORMAT
+    return f"{PHOTO_DIR}/{digest}-{edge}.{EXTENSIONS[fmt]}"
+
+
+def _flatten(image):
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _save(name, content):
+    # Two identical uploads racing here write identical bytes; keep whichever lands first.
+    saved = storage.save(name, ContentFile(content))
+    if saved != name:
+        storage.delete(saved)
+
+
+def _store(image, name):
+    buffer = io.BytesIO()
+    image.save(buffer, settings.PHOTO_FORMAT, quality=settings.PHOTO_QUALITY, optimize=True)
+    _save(name, buffer.getvalue())
+
+
+def render(data):
+    """Render every PHOTO_RENDITIONS size of ``data`` and return {label: storage name}."""
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    edges = sorted(settings.PHOTO_RENDITIONS.items(), key=lambda item: -item[1])
+    renditions = {label: _name(digest, edge) for label, edge in edges}
+    if all(storage.exists(name) for name in renditions.values()):
+        return renditions
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEGs decode straight at 1/2, 1/4 or 1/8 scale when that still covers the largest edge.
+            image.draft("RGB", (edges[0][1], edges[0][1]))
+            image = _flatten(ImageOps.exif_transpose(image))
+    except (Image.DecompressionBombError, OSError, SyntaxError):
+        raise PhotoError("Unreadable or unsupported image")
+
+    # Largest first, each rendition downscaled from the previous one; never upscaled.
+    for label, edge in edges:
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        if not storage.exists(renditions[label]):
+            _store(image, renditions[label])
+    return renditions
+
+
+def is_rendition(name):
+    """True for names written by _store(), whose content never changes."""
+    return RENDITION_NAME.fullmatch(name) is not None
+
+
+def largest(renditions):
+    return renditions[max(renditions, key=lambda label: settings.PHOTO_RENDITIONS.get(label, 0))]
+
+
+def rendition_urls(renditions):
+    return {label: storage.url(name) for label, name in (renditions or {}).items()}
+
+
+def is_upload(name):
+    return bool(name) and name.startswith(f"{UPLOAD_DIR}/")
+
+
+# ======================================
+# BACKGROUND JOBS
+# ======================================
+# An upload is stored under UPLOAD_DIR and becomes the provider's
+# profile_photo with empty photo_renditions ("pending"); the request returns
+# 202 straight away and the renditions are rendered on the photo pool, which
+# bounds how many full-size bitmaps a process decodes at once (Pillow
+# releases the GIL while it resizes and encodes). Uploads still pending
+# after a restart are finished by the process_photos command.
+
+_backlog = 0
+_backlog_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _executor():
+    return ThreadPoolExecutor(max_workers=settings.PHOTO_WORKERS, thread_name_prefix="photos")
+
+
+def backlog_full():
+    return _backlog >= settings.PHOTO_QUEUE_LIMIT
+
+
+def save_upload(data):
+    fmt, _size = _header(data)
+    name = f"{UPLOAD_DIR}/{hashlib.sha256(data).hexdigest()[:32]}.{UPLOAD_EXTENSIONS[fmt]}"
+    if not storage.exists(name):
+        _save(name, data)
+    return name
+
+
+def apply(provider, renditions):
+    """Point ``provider`` at its renditions and drop the original if nothing else waits on it."""
+    upload = provider.profile_photo.name
+    provider.profile_photo.name = largest(renditions)
+    provider.photo_renditions = renditions
+    provider.save(update_fields=["profile_photo", "photo_renditions"])
+    if is_upload(upload) and not Provider.objects.filter(profile_photo=upload).exists():
+        storage.delete(upload)
+
+
+def _finish(provider_id, upload, data):
+    try:
+        renditions = render(data)
+        # Skip providers that uploaded another photo in the meantime.
+        provider = Provider.objects.filter(id=provider_id, profile_photo=upload).first()
+        if provider is not None:
+            apply(provider, renditions)
+    except Exception:
+        logger.exception("Rendering %s for provider %s failed; process_photos will retry", upload, provider_id)
+
+
+def _job(provider_id, upload, data):
+    global _backlog
+    try:
+        _finish(provider_id, upload, data)
+    finally:
+        with _backlog_lock:
+            _backlog -= 1
+        connections.close_all()
+
+
+def schedule(provider_id, upload, data):
+    """Render ``upload`` for ``provider_id`` on the photo pool (inline when PHOTO_WORKERS is 0)."""
+    global _backlog
+    if settings.PHOTO_WORKERS == 0:
+        _finish(provider_id, upload, data)
+        return
+    with _backlog_lock:
+        _backlog += 1
+    _executor().submit(_job, provider_id, upload, data)
@@ -0,0 +1,181 @@
+from .models import DoctorNote, Provider
+from .photos import is_upload
+
+_photo_storage = Provider._meta.get_field("profile_photo").storage
+
+
+def _iso(value):
+    return value.isoformat()
+
+
+def _photo_url(name):
+    # Uploads awaiting their renditions are not public yet.
+    return _photo_storage.url(name) if name and not is_upload(name) else None
+
+
+# ======================================
+# ROW SHAPES
+# ======================================
+# Appointment feeds are read with .values_list() so no model instances are
+# built; each shape names the columns it needs and how to render them.
+# Display names come from the denormalized patient_name/provider_name columns.
+
+COLUMNS = {
+    # output key: (column, transform)
+    "id": ("id", None),
+    "patient": ("patient_id", None),
+    "patient_name": ("patient_name", None),
+    "provider": ("provider_id", None),
+    "provider_name": ("provider_name", None),
+    "provider_photo": ("provider__profile_photo", _photo_url),
+    "service": ("service", None),
+    "start": ("start", _iso),
+    "end": ("end", _iso),
+    "status": ("status", None),
+}
+
+
+class RowShape:
+    def __init__(self, *keys):
+        self.keys = keys
+        self.columns = [COLUMNS[key][0] for key in keys]
+        self._transforms = [COLUMNS[key][1] for key in keys]
+        self._start = keys.index("start")
+        self._id = keys.index("id")
+
+    def values(self, qs):
+        return qs.values_list(*self.columns)
+
+    def instance(self, obj):
+        """Render a model instance; only valid for shapes without related-field columns."""
+        return self(tuple(getattr(obj, column) for column in self.columns))
+
+    def cursor_key(self, row):
+        return row[self._start], row[self._id]
+
+    def __call__(self, row):
+        return {
+            key: transform(value) if transform and value is not None else value
+            for key, value, transform in zip(self.keys, row, self._transforms)
+        }
+
+
+SCHEDULE_ROW = RowShape("id", "patient", "patient_name", "service", "start", "end", "status")
+
+PROVIDER_FEED_ROW = RowShape(
+    "id", "provider", "provider_name", "patient", "patient_name", "service", "start", "end", "status",
+)
+
+PATIENT_FEED_ROW = RowShape(
+    "id", "provider", "provider_name", "provider_photo", "service", "start", "end", "status",
+)
+
+APPOINTMENT_ROW = RowShape(
+    "id", "patient", "patient_name", "provider", "provider_name", "provider_photo",
+    "service", "start", "end", "status",
+)
+
+APPOINTMENT_DETAIL_ROW = RowShape(
+    "id", "patient", "patient_name", "provider", "provider_name", "service", "start", "end", "status",
+)
+
+
+# ======================================
+# DOCTOR NOTES
+# ======================================
+# Feeds are read with values_list(), so there are no instances for
+# prefetch_related() to fill; attach_notes() does what a Prefetch would,
+# with one appointment_id IN (...) query for the whole page.
+
+NOTE_COLUMNS = ("id", "appointment_id", "author_name", "note_text", "created_at")
+
+
+def wants_notes(request):
+    return "notes" in request.GET.get("include", "").split(",")
+
+
+def note_item(row):
+    note_id, appointment_id, author_name, note_text, created_at = row
+    return {
+        "id": str(note_id),
+        "appointment": appointment_id,
+        "author_name": author_name,
+        "note_text": note_text,
+        "created_at": created_at.isoformat(),
+    }
+
+
+def _notes_query(items):
+    return (
+        DoctorNote.objects.filter(appointment_id__in=[item["id"] for item in items])
+        .order_by("created_at", "id").values_list(*NOTE_COLUMNS)
+    )
+
+
+def _attach(items, rows):
+    by_appointment = {}
+    for row in rows:
+        by_appointment.setdefault(row[1], []).append(note_item(row))
+    for item in items:
+        item["notes"] = by_appointment.get(item["id"], [])
+    return items
+
+
+def attach_notes(items):
+    """Add a "notes" list to each rendered appointment item."""
+    return _attach(items, _notes_query(items) if items else [])
+
+
+async def aattach_notes(items):
+    return _attach(items, [row async for row in _notes_query(items)] if items else [])
+
+
+# ======================================
+# PROVIDERS
+# ======================================
+# Expect Provider instances loaded with select_related("user", "specialty").
+
+def provider_detail_item(p):
+    return {
+        "id": p.id,
+        "first_name": p.user.first_name,
+        "last_name": p.user.last_name,
+        "email": p.user.email,
+        "user_name": p.user.get_full_name() or p.user.username,
+        "specialty_name": p.specialty.name if p.specialty else None,
+        "specialty_id": p.specialty_id,
+        "location": p.location,
+        "bio": p.bio,
+        "profile_photo": _photo_url(p.profile_photo.name),
+        "photos": {label: _photo_url(name) for label, name in p.photo_renditions.items()},
+    }
+
+
+def provider_item(p):
+    # Directory listings link the "small" rendition rather than the full-size photo.
+    item = provider_detail_item(p)
+    photos = item.pop("photos")
+    item["profile_photo"] = photos.get("small", item["profile_photo"])
+    return {"id": item.pop("id"), "user_id": p.user_id, **item}
+
+# ======================================
+# ACCOUNTS
+# ======================================
+def login_item(user, provider_id):
+    """``provider_id`` is the id of the user's Provider profile, or None."""
+    if provider_id is not None:
+        role = "provider"
+    elif user.is_staff:
+        role = "admin"
+    else:
+        role = "patient"
+
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "role": role,
+        "provider_id": provider_id,
+    }
@@ -0,0 +1,264 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import groupby, islice
+import heapq
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache import get_versions, versioned_key
+from .models import Appointment, Availability, AvailabilityException, AvailabilityRule
+
+
+# ======================================
+# INTERVAL HELPERS
+# ======================================
+# Every helper works on (start, end) tuples that are already sorted by start,
+# so a whole date range is resolved in a single linear pass.
+
+def merge_intervals(intervals):
+    """Collapse overlapping or touching (start, end) pairs."""
+    current = None
+    for start, end in intervals:
+        if current is None:
+            current = [start, end]
+        elif start <= current[1]:
+            current[1] = max(current[1], end)
+        else:
+            yield tuple(current)
+            current = [start, end]
+    if current is not None:
+        yield tuple(current)
+
+
+def subtract_intervals(windows, busy):
+    """Yield the parts of ``windows`` not covered by ``busy``."""
+    busy = iter(merge_intervals(busy))
+    blocker = next(busy, None)
+
+    for start, end in merge_intervals(windows):
+        cursor = start
+        # Skip blockers that finished before this window opens.
+        while blocker is not None and blocker[1] <= cursor:
+            blocker = next(busy, None)
+
+        while blocker is not None and blocker[0] < end:
+            if blocker[0] > cursor:
+                yield (cursor, blocker[0])
+            cursor = max(cursor, blocker[1])
+            if blocker[1] > end:
+                break
+            blocker = next(busy, None)
+
+        if cursor < end:
+            yield (cursor, end)
+
+
+def split_slots(free, duration):
+    """Cut free intervals into back-to-back slots of ``duration``."""
+    for start, end in free:
+        slot_start = start
+        while slot_start + duration <= end:
+            yield (slot_start, slot_start + duration)
+            slot_start += duration
+
+
+def clip_intervals(intervals, range_start, range_end):
+    for start, end in intervals:
+        start, end = max(start, range_start), min(end, range_end)
+        if start < end:
+            yield (start, end)
+
+
+# ======================================
+# RECURRING RULES
+# ======================================
+# Rules are expanded one local week at a time. Each (provider, week) expansion
+# is cached under the provider's rule version, which signals bump whenever a
+# rule or exception changes, so reads only touch the DB on a cold week.
+
+RULE_CACHE_TTL = 24 * 60 * 60
+
+
+def rules_namespace(provider_id):
+    return f"availability-rules:{provider_id}"
+
+
+def _week_starts(range_start, range_end):
+    first = timezone.localtime(range_start).date()
+    last = timezone.localtime(range_end).date()
+    monday = first - timedelta(days=first.weekday())
+    while monday <= last:
+        yield monday
+        monday += timedelta(days=7)
+
+
+def expand_week(rules, week_start, skipped=()):
+    """
+    Concrete windows for one week. ``rules`` are (rule_id, day_of_week,
+    start_time, end_time, valid_from, valid_until) rows, ``skipped`` a set
+    of (rule_id, date) exceptions.
+    """
+    tz = timezone.get_current_timezone()
+    windows = []
+    for rule_id, day_of_week, start_time, end_time, valid_from, valid_until in rules:
+        day = week_start + timedelta(days=day_of_week)
+        if day < valid_from or (valid_until and day > valid_until) or (rule_id, day) in skipped:
+            continue
+        windows.append((
+            timezone.make_aware(datetime.combine(day, start_time), tz),
+            timezone.make_aware(datetime.combine(day, end_time), tz),
+        ))
+    windows.sort()
+    return windows
+
+
+def _expand_missing(missing):
+    """{(provider_id, week_start)} -> {(provider_id, week_start): windows} with two queries."""
+    provider_ids = {pid for pid, _ in missing}
+    first_week = min(week for _, week in missing)
+    last_day = max(week for _, week in missing) + timedelta(days=6)
+
+    rules = defaultdict(list)
+    for pid, *rule in (
+        AvailabilityRule.objects
+        .filter(provider_id__in=provider_ids, valid_from__lte=last_day)
+        .values_list("provider_id", "id", "day_of_week", "start_time", "end_time", "valid_from", "valid_until")
+    ):
+        rules[pid].append(rule)
+
+    skipped = set()
+    if rules:
+        skipped = set(
+            AvailabilityException.objects
+            .filter(rule__provider_id__in=list(rules), date__gte=first_week, date__lte=last_day)
+            .values_list("rule_id", "date")
+        )
+
+    return {
+        (pid, week): expand_week(rules.get(pid, ()), week, skipped)
+        for pid, week in missing
+    }
+
+
+def rule_windows(provider_ids, range_start, range_end):
+    """{provider_id: sorted windows from recurring rules overlapping the range}"""
+    weeks = list(_week_starts(range_start, range_end))
+    versions = get_versions([rules_namespace(pid) for pid in provider_ids])
+
+    keys = {
+        versioned_key(rules_namespace(pid), versions[rules_namespace(pid)], week.isoformat()): (pid, week)
+        for pid in provider_ids
+        for week in weeks
+    }
+    expanded = cache.get_many(keys)
+
+    missing = {key: keys[key] for key in keys if key not in expanded}
+    if missing:
+        fresh = _expand_missing(set(missing.values()))
+        fresh_by_key = {key: fresh[target] for key, target in missing.items()}
+        cache.set_many(fresh_by_key, RULE_CACHE_TTL)
+        expanded.update(fresh_by_key)
+
+    result = {pid: [] for pid in provider_ids}
+    for key, (pid, _) in keys.items():
+        result[pid].extend(
+            (start, end) for start, end in expanded[key] if start < range_end and end > range_start
+        )
+    return result
+
+
+# ======================================
+# PROVIDER SCHEDULE
+# ======================================
+def availability_windows(provider_id, range_start, range_end):
+    """Concrete Availability rows plus expanded recurring rules, sorted by start."""
+    windows = (
+        Availability.objects
+        .filter(provider_id=provider_id, start__lt=range_end, end__gt=range_start)
+        .order_by("start")
+        .values_list("start", "end")
+    )
+    recurring = rule_windows([provider_id], range_start, range_end)[provider_id]
+    return clip_intervals(heapq.merge(windows, recurring), range_start, range_end)
+
+
+def booked_intervals(provider_id, range_start, range_end):
+    return (
+        Appointment.objects
+        .filter(provider_id=provider_id, start__lt=range_end, end__gt=range_start)
+        .exclude(status=Appointment.Status.CANCELLED)
+        .order_by("start")
+        .values_list("start", "end")
+    )
+
+
+def free_slots(provider_id, range_start, range_end, duration=timedelta(minutes=30)):
+    """
+    Bookable slots for one provider: availability minus non-cancelled
+    appointments. Two indexed range queries, then one sweep in Python.
+    """
+    free = subtract_intervals(
+        availability_windows(provider_id, range_start, range_end),
+        booked_intervals(provider_id, range_start, range_end),
+    )
+    return split_slots(free, duration)
+
+
+# ======================================
+# MULTI-PROVIDER SEARCH
+# ======================================
+def _grouped(rows):
+    """(provider_id, start, end) rows ordered by provider -> {provider_id: [(start, end), ...]}"""
+    return {
+        provider_id: [(start, end) for _, start, end in group]
+        for provider_id, group in groupby(rows, key=lambda row: row[0])
+    }
+
+
+def _provider_stream(provider_id, windows, busy, range_start, range_end, duration):
+    free = subtract_intervals(clip_intervals(windows, range_start, range_end), busy)
+    for start, end in split_slots(free, duration):
+        yield (start, end, provider_id)
+
+
+def earliest_slots(provider_ids, range_start, range_end, duration=timedelta(minutes=30), limit=10):
+    """
+    Earliest ``limit`` open slots across many providers.
+
+    Windows and bookings for every provider are fetched with one query each
+    (recurring rules come from the per-week cache);
+    the per-provider free-slot generators are then k-way merged, so only as
+    many slots as requested are ever produced.
+    """
+    provider_ids = list(provider_ids)
+    if not provider_ids:
+        return []
+
+    windows = _grouped(
+        Availability.objects
+        .filter(provider_id__in=provider_ids, start__lt=range_end, end__gt=range_start)
+        .order_by("provider_id", "start")
+        .values_list("provider_id", "start", "end")
+    )
+    busy = _grouped(
+        Appointment.objects
+        .filter(provider_id__in=provider_ids, start__lt=range_end, end__gt=range_start)
+        .exclude(status=Appointment.Status.CANCELLED)
+        .order_by("provider_id", "start")
+        .values_list("provider_id", "start", "end")
+    )
+
+    recurring = rule_windows(provider_ids, range_start, range_end)
+
+    streams = [
+        _provider_stream(
+            pid,
+            heapq.merge(windows.get(pid, ()), recurring[pid]),
+            busy.get(pid, ()),
+            range_start, range_end, duration,
+        )
+        for pid in provider_ids
+        if pid in windows or recurring[pid]
+    ]
+    return list(islice(heapq.merge(*streams), limit))
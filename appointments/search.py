@@ -0,0 +1,247 @@
+import re
+import uuid
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import ChatHistory, DoctorNote
+
+# ======================================
+# SEARCHABLE MODELS
+# ======================================
+# ``fields`` are listed most important first: Postgres weights them A, B, ...
+# and SQLite passes the same order to bm25(). Migration 0013 creates the
+# matching tsvector column (Postgres) or FTS5 table (SQLite), so changing a
+# spec here needs a migration too.
+
+SearchSpec = namedtuple("SearchSpec", ["model", "fields"])
+Hit = namedtuple("Hit", ["id", "rank", "snippet"])
+
+SPECS = {
+    "chat": SearchSpec(ChatHistory, ("user_message", "bot_response")),
+    "notes": SearchSpec(DoctorNote, ("note_text", "author_name")),
+}
+PG_CONFIG = "english"  # Must match the generated columns in migration 0013.
+SNIPPET_START, SNIPPET_STOP = "[", "]"
+
+
+def kind_for(model):
+    for kind, spec in SPECS.items():
+        if spec.model is model:
+            return kind
+    return None
+
+
+# ======================================
+# BACKENDS
+# ======================================
+class SearchBackend:
+    """
+    Full-text index interface. ``search`` returns up to ``limit`` Hits, best
+    first, skipping ``offset``. Backends whose index the database maintains
+    itself set ``maintained_by_database`` and need no save/delete hooks.
+    """
+
+    maintained_by_database = False
+
+    def search(self, kind, query, limit, offset=0):
+        raise NotImplementedError
+
+    def index(self, kind, obj):
+        pass
+
+    def index_many(self, kind, objs):
+        for obj in objs:
+            self.index(kind, obj)
+
+    def remove(self, kind, pk):
+        pass
+
+    def remove_many(self, kind, pks):
+        for pk in pks:
+            self.remove(kind, pk)
+
+    def rebuild(self, kind):
+        pass
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Each table carries a STORED generated ``search_vector`` tsvector with a
+    GIN index, so every INSERT/UPDATE (including bulk_create and COPY) keeps
+    the index current in the same statement. Ranked with ts_rank_cd.
+    """
+
+    maintained_by_database = True
+
+    def search(self, kind, query, limit, offset=0):
+        spec = SPECS[kind]
+        qn = connection.ops.quote_name
+        table = qn(spec.model._meta.db_table)
+        document = "concat_ws(' ', {})".format(", ".join(f"t.{qn(f)}" for f in spec.fields))
+        options = f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxFragments=2, MaxWords=18, MinWords=6"
+
+        # Rank and page first, then build headlines for the page only.
+        sql = f"""
+            SELECT hit.id, hit.rank, ts_headline(%s::regconfig, hit.document, hit.query, %s)
+            FROM (
+                SELECT t.id, {document} AS document, query, ts_rank_cd(t.search_vector, query) AS rank
+                FROM {table} t, websearch_to_tsquery(%s::regconfig, %s) query
+                WHERE t.search_vector @@ query
+                ORDER BY rank DESC, t.id
+                LIMIT %s OFFSET %s
+            ) hit
+            ORDER BY hit.rank DESC, hit.id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [PG_CONFIG, options, PG_CONFIG, query, limit, offset])
+            return [Hit(pk, rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """
+    An FTS5 table per model, ``<table>_fts``, whose integer rowids map to the
+    UUID primary keys through ``<table>_fts_ids``. Rows are (re)indexed from
+    post_save/post_delete; bulk loads call rebuild(). Ranked with bm25().
+    """
+
+    def _tables(self, kind):
+        table = SPECS[kind].model._meta.db_table
+        qn = connection.ops.quote_name
+        return qn(table), qn(f"{table}_fts"), qn(f"{table}_fts_ids")
+
+    @staticmethod
+    def _match(query):
+        # Quote every word so user input can never be read as FTS5 syntax.
+        return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+    def search(self, kind, query, limit, offset=0):
+        match = self._match(query)
+        if not match:
+            return []
+        _table, fts, ids = self._tables(kind)
+        weights = ", ".join(str(float(w)) for w in range(len(SPECS[kind].fields), 0, -1))
+
+        sql = f"""
+            SELECT m.object_id, -bm25({fts}, {weights}) AS rank,
+                   snippet({fts}, -1, %s, %s, '…', 16)
+            FROM {fts} JOIN {ids} m ON m.rowid = {fts}.rowid
+            WHERE {fts} MATCH %s
+            ORDER BY rank DESC, m.object_id
+            LIMIT %s OFFSET %s
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [SNIPPET_START, SNIPPET_STOP, match, limit, offset])
+            return [Hit(uuid.UUID(pk), rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+    def index(self, kind, obj):
+        _table, fts, ids = self._tables(kind)
+        fields = SPECS[kind].fields
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT OR IGNORE INTO {ids} (object_id) VALUES (%s)", [obj.pk.hex])
+            cursor.execute(f"SELECT rowid FROM {ids} WHERE object_id = %s", [obj.pk.hex])
+            (rowid,) = cursor.fetchone()
+            cursor.execute(f"DELETE FROM {fts} WHERE rowid = %s", [rowid])
+            cursor.execute(
+                f"INSERT INTO {fts} (rowid, {', '.join(fields)}) VALUES (%s{', %s' * len(fields)})",
+                [rowid] + [getattr(obj, f) or "" for f in fields],
+            )
+
+    def index_many(self, kind, objs):
+        objs = list(objs)
+        if not objs:
+            return
+        _table, fts, ids = self._tables(kind)
+        fields = SPECS[kind].fields
+        keys = [obj.pk.hex for obj in objs]
+        marks = ", ".join(["%s"] * len(keys))
+        with connection.cursor() as cursor:
+            cursor.executemany(f"INSERT OR IGNORE INTO {ids} (object_id) VALUES (%s)", [[key] for key in keys])
+            cursor.execute(f"SELECT object_id, rowid FROM {ids} WHERE object_id IN ({marks})", keys)
+            rowids = dict(cursor.fetchall())
+            cursor.execute(f"DELETE FROM {fts} WHERE rowid IN ({marks})", [rowids[key] for key in keys])
+            cursor.executemany(
+                f"INSERT INTO {fts} (rowid, {', '.join(fields)}) VALUES (%s{', %s' * len(fields)})",
+                [[rowids[key]] + [getattr(obj, f) or "" for f in fields] for key, obj in zip(keys, objs)],
+            )
+
+    def remove(self, kind, pk):
+        _table, fts, ids = self._tables(kind)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {fts} WHERE rowid IN (SELECT rowid FROM {ids} WHERE object_id = %s)", [pk.hex])
+            cursor.execute(f"DELETE FROM {ids} WHERE object_id = %s", [pk.hex])
+
+    def remove_many(self, kind, pks):
+        keys = [pk.hex for pk in pks]
+        if not keys:
+            return
+        _table, fts, ids = self._tables(kind)
+        marks = ", ".join(["%s"] * len(keys))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {fts} WHERE rowid IN (SELECT rowid FROM {ids} WHERE object_id IN ({marks}))", keys)
+            cursor.execute(f"DELETE FROM {ids} WHERE object_id IN ({marks})", keys)
+
+    def rebuild(self, kind):
+        table, fts, ids = self._tables(kind)
+        fields = SPECS[kind].fields
+        values = ", ".join(f"coalesce(t.{f}, '')" for f in fields)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {fts}")
+            cursor.execute(f"DELETE FROM {ids}")
+            cursor.execute(f"INSERT INTO {ids} (object_id) SELECT id FROM {table}")
+            cursor.execute(
+                f"INSERT INTO {fts} (rowid, {', '.join(fields)}) "
+                f"SELECT m.rowid, {values} FROM {ids} m JOIN {table} t ON t.id = m.object_id"
+            )
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    name = settings.SEARCH_BACKEND or connection.vendor
+    return import_string(settings.SEARCH_BACKENDS.get(name, name))()
+
+
+def rebuild(kinds=None):
+    """Re-index everything; for the SQLite backend after bulk loads, a no-op on Postgres."""
+    backend = get_backend()
+    for kind in kinds or SPECS:
+        backend.rebuild(kind)
+
+
+# ======================================
+# RESULTS
+# ======================================
+def _chat_item(row):
+    return {"session_id": str(row["session_id"]), "created_at": row["created_at"].isoformat()}
+
+
+def _note_item(row):
+    return {
+        "appointment_id": row["appointment_id"],
+        "author_name": row["author_name"],
+        "created_at": row["created_at"].isoformat(),
+    }
+
+
+RESULT_ROWS = {
+    "chat": (("id", "session_id", "created_at"), _chat_item),
+    "notes": (("id", "appointment_id", "author_name", "created_at"), _note_item),
+}
+
+
+def results(kind, hits):
+    """Hits as JSON items with their row's context, in rank order; one query per page."""
+    columns, item = RESULT_ROWS[kind]
+    rows = {
+        row["id"]: row
+        for row in SPECS[kind].model.objects.filter(pk__in=[h.id for h in hits]).values(*columns)
+    }
+    # Rows deleted since they were indexed (SQLite, after a bulk delete) are skipped.
+    return [
+        {"id": str(h.id), "rank": round(h.rank, 6), "snippet": h.snippet, **item(rows[h.id])}
+        for h in hits if h.id in rows
+    ]
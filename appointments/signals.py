@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, search
+from .cache import DIRECTORY, bump_version, invalidate
+from .models import (
+    Appointment, AvailabilityException, AvailabilityRule, ChatHistory, DoctorNote, Provider, Specialty,
+)
+from .scheduling import rules_namespace
+
+
+# ======================================
+# RECURRING AVAILABILITY CACHE
+# ======================================
+@receiver([post_save, post_delete], sender=AvailabilityRule)
+def invalidate_rule_windows(sender, instance, **kwargs):
+    bump_version(rules_namespace(instance.provider_id))
+
+
+@receiver([post_save, post_delete], sender=AvailabilityException)
+def invalidate_exception_windows(sender, instance, **kwargs):
+    provider_id = (
+        AvailabilityRule.objects.filter(id=instance.rule_id).values_list("provider_id", flat=True).first()
+    )
+    if provider_id is not None:
+        bump_version(rules_namespace(provider_id))
+
+
+# ======================================
+# PLATFORM COUNTERS
+# ======================================
+# Queryset.update()/bulk_create() and is_staff flips bypass these; run
+# `manage.py reconcile_counters` after bulk loads to correct any drift.
+
+@receiver(post_save, sender=Appointment)
+def count_appointment_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.adjust(total_appointments=1)
+
+
+@receiver(post_delete, sender=Appointment)
+def count_appointment_deleted(sender, instance, **kwargs):
+    counters.adjust(total_appointments=-1)
+
+
+@receiver(post_save, sender=Provider)
+def count_provider_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        # The user stops counting as a patient once they have a provider profile.
+        is_patient = not get_user_model().objects.filter(id=instance.user_id, is_staff=True).exists()
+        counters.adjust(total_providers=1, total_patients=-1 if is_patient else 0)
+
+
+@receiver(post_delete, sender=Provider)
+def count_provider_deleted(sender, instance, **kwargs):
+    # If the user is being deleted too, count_user_deleted takes the patient back off.
+    is_patient = get_user_model().objects.filter(id=instance.user_id, is_staff=False).exists()
+    counters.adjust(total_providers=-1, total_patients=1 if is_patient else 0)
+
+
+@receiver(post_save, sender=get_user_model())
+def count_user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not instance.is_staff:
+        counters.adjust(total_patients=1)
+
+
+@receiver(post_delete, sender=get_user_model())
+def count_user_deleted(sender, instance, **kwargs):
+    if not instance.is_staff and not Provider.objects.filter(user_id=instance.id).exists():
+        counters.adjust(total_patients=-1)
+
+
+# ======================================
+# PROVIDER DIRECTORY CACHE
+# ======================================
+# Covers provider_update, provider_upload_photo, specialty CRUD and admin
+# edits; admin_toggle_provider only saves the user and invalidates itself.
+
+@receiver([post_save, post_delete], sender=Provider)
+@receiver([post_save, post_delete], sender=Specialty)
+def invalidate_directory(sender, **kwargs):
+    invalidate(DIRECTORY)
+
+
+# ======================================
+# FULL-TEXT SEARCH INDEX
+# ======================================
+# Only backends that keep a separate index need these; the Postgres backend's
+# generated column is updated by the INSERT/UPDATE itself. Leaving them
+# unconnected there also keeps QuerySet.delete() on the fast path.
+
+def index_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.get_backend().index(search.kind_for(sender), instance)
+
+
+def remove_search_document(sender, instance, **kwargs):
+    search.get_backend().remove(search.kind_for(sender), instance.pk)
+
+
+if not search.get_backend().maintained_by_database:
+    for model in (ChatHistory, DoctorNote):
+        post_save.connect(index_search_document, sender=model, dispatch_uid=f"search-index-{model.__name__}")
+        post_delete.connect(remove_search_document, sender=model, dispatch_uid=f"search-remove-{model.__name__}")
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import re
+
+from django.conf import settings
+
+from .events import get_broker, provider_channel
+
+# Served straight from config/asgi.py: a dashboard keeps this connection
+# open for hours, so it skips the Django middleware stack and never holds
+# a database connection or a request thread.
+EVENTS_PATH = re.compile(r"^/api/events/providers/(?P<provider_id>\d+)/?$")
+
+
+def _allowed_origin(origin):
+    if not origin:
+        return None
+    if origin in settings.CORS_ALLOWED_ORIGINS:
+        return origin
+    if any(re.match(pattern, origin) for pattern in settings.CORS_ALLOWED_ORIGIN_REGEXES):
+        return origin
+    return None
+
+
+def _format(event):
+    kind = event.get("event", "message")
+    lines = [f"id: {event['id']}"] if "id" in event else []
+    lines += [f"event: {kind}", f"data: {json.dumps(event)}"]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+async def _send_error(send, status, message):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": json.dumps({"error": message}).encode()})
+
+
+async def provider_events(scope, receive, send, provider_id):
+    """
+    text/event-stream of appointment.created / .cancelled / .completed /
+    .rescheduled (and bulk status changes) for one provider. Comment pings
+    every EVENTS_KEEPALIVE seconds keep proxies from closing idle streams.
+    """
+    if scope["method"] != "GET":
+        await _send_error(send, 405, "Method not allowed")
+        return
+
+    headers = [
+        (b"content-type", b"text/event-stream"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+    ]
+    request_headers = dict(scope.get("headers", []))
+    origin = _allowed_origin(request_headers.get(b"origin", b"").decode("latin-1"))
+    if origin:
+        headers += [
+            (b"access-control-allow-origin", origin.encode("latin-1")),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+
+    async with get_broker().subscribe(provider_channel(provider_id)) as sub:
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": _format({"event": "ready"}), "more_body": True})
+
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            while True:
+                next_event = asyncio.ensure_future(sub.get(timeout=settings.EVENTS_KEEPALIVE))
+                await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    next_event.cancel()
+                    break
+                event = next_event.result()
+                body = b": ping\n\n" if event is None else _format(event)
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+        except OSError:
+            pass
+        finally:
+            disconnected.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+def events_router(django_app):
+    """Wrap the Django ASGI app, diverting event-stream paths to provider_events."""
+    async def application(scope, receive, send):
+        if scope["type"] == "http":
+            match = EVENTS_PATH.match(scope["path"])
+            if match:
+                await provider_events(scope, receive, send, int(match["provider_id"]))
+                return
+        await django_app(scope, receive, send)
+    return application
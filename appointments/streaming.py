@@ -0,0 +1,117 @@
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+
+STREAM_CHUNK_SIZE = 2000
+NDJSON = "application/x-ndjson"
+
+
+# ======================================
+# STREAMING EXPORTS
+# ======================================
+# Large exports are written row by row from QuerySet.iterator() so a worker
+# never holds the whole result set (or one giant JSON string) in memory.
+
+def wants_stream(request):
+    if request.GET.get("stream") in ("1", "true", "ndjson"):
+        return True
+    return NDJSON in request.headers.get("Accept", "")
+
+
+def _rows(qs, row, chunk_size):
+    for obj in qs.iterator(chunk_size=chunk_size):
+        yield json.dumps(row(obj), separators=(",", ":"))
+
+
+def _json_chunks(qs, key, row, chunk_size):
+    # Same envelope as the buffered JsonResponse: {"status": "ok", "<key>": [...]}
+    yield '{"status":"ok",%s:[' % json.dumps(key)
+    batch = []
+    first = True
+    for encoded in _rows(qs, row, chunk_size):
+        batch.append(encoded)
+        if len(batch) >= chunk_size:
+            yield ("" if first else ",") + ",".join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ("" if first else ",") + ",".join(batch)
+    yield "]}"
+
+
+def _ndjson_chunks(qs, row, chunk_size):
+    batch = []
+    for encoded in _rows(qs, row, chunk_size):
+        batch.append(encoded)
+        if len(batch) >= chunk_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def _wants_ndjson(request):
+    return request.GET.get("stream") == "ndjson" or NDJSON in request.headers.get("Accept", "")
+
+
+def stream_response(request, qs, key, row, chunk_size=STREAM_CHUNK_SIZE):
+    """JSON envelope by default, newline-delimited rows for ?stream=ndjson or Accept: application/x-ndjson."""
+    if _wants_ndjson(request):
+        return StreamingHttpResponse(_ndjson_chunks(qs, row, chunk_size), content_type=NDJSON)
+    return StreamingHttpResponse(_json_chunks(qs, key, row, chunk_size), content_type="application/json")
+
+
+# ======================================
+# ASYNC STREAMING
+# ======================================
+# Same bodies, fetched chunk by chunk off the event loop; under ASGI the response is
+# consumed on the event loop, so a long export does not pin a thread.
+
+async def _arows(qs, row, chunk_size):
+    # Not qs.aiterator(): for values_list() querysets it runs the query on the
+    # event loop (ValuesListIterable.__iter__ is not a generator) and raises
+    # SynchronousOnlyOperation. The iterator() generator does nothing until
+    # the first chunk is pulled, which happens off the loop.
+    rows = qs.iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while True:
+        chunk = await next_chunk()
+        for obj in chunk:
+            yield json.dumps(row(obj), separators=(",", ":"))
+        if len(chunk) < chunk_size:
+            break
+
+
+async def _ajson_chunks(qs, key, row, chunk_size):
+    yield '{"status":"ok",%s:[' % json.dumps(key)
+    batch = []
+    first = True
+    async for encoded in _arows(qs, row, chunk_size):
+        batch.append(encoded)
+        if len(batch) >= chunk_size:
+            yield ("" if first else ",") + ",".join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ("" if first else ",") + ",".join(batch)
+    yield "]}"
+
+
+async def _andjson_chunks(qs, row, chunk_size):
+    batch = []
+    async for encoded in _arows(qs, row, chunk_size):
+        batch.append(encoded)
+        if len(batch) >= chunk_size:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
+def astream_response(request, qs, key, row, chunk_size=STREAM_CHUNK_SIZE):
+    """stream_response() for async views."""
+    if _wants_ndjson(request):
+        return StreamingHttpResponse(_andjson_chunks(qs, row, chunk_size), content_type=NDJSON)
+    return StreamingHttpResponse(_ajson_chunks(qs, key, row, chunk_size), content_type="application/json")
@@ -0,0 +1,359 @@
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from itertools import islice
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import AutoField, BigAutoField, SmallAutoField
+from django.utils import timezone
+
+from . import counters, search
+from .cache import DIRECTORY, bump_version, invalidate
+from .models import (
+    Appointment, Availability, AvailabilityRule, ChatHistory, DoctorNote, Provider, Specialty,
+)
+from .scheduling import rules_namespace
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 2000
+# Every synthetic user shares this password; it is hashed once per run.
+SYNTHETIC_PASSWORD = "synthetic-password"
+
+SPECIALTIES = [
+    "Family Medicine", "Internal Medicine", "Pediatrics", "Cardiology",
+    "Dermatology", "Psychiatry", "Obstetrics & Gynecology", "Orthopedics",
+]
+LOCATIONS = ["Downtown Clinic", "Northside Health Center", "Riverside Campus", "Telehealth"]
+SERVICES = ["Checkup", "Follow-up", "Consultation", "Vaccination", "Lab review", "Screening"]
+FIRST_NAMES = ["Ava", "Noah", "Mia", "Liam", "Zoe", "Ethan", "Ivy", "Lucas", "Nora", "Omar", "Ruth", "Sam"]
+LAST_NAMES = ["Adams", "Baker", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ito", "Khan"]
+
+# Past appointments mostly completed; requested/confirmed ones in the past are no-shows.
+PAST_STATUSES = (["completed"] * 70 + ["cancelled"] * 15 + ["confirmed"] * 10 + ["requested"] * 5)
+FUTURE_STATUSES = (["confirmed"] * 50 + ["requested"] * 40 + ["cancelled"] * 10)
+
+SLOT = timedelta(minutes=30)
+DAY_START, DAY_END = time(9), time(17)
+
+
+NOTE_TEMPLATES = [
+    "Patient seen for {service}. Vitals within normal limits.",
+    "Reviewed history and current medications; no changes. Follow up in {weeks} weeks.",
+    "{service} completed. Discussed lifestyle changes and ordered labs.",
+    "Symptoms improving since last visit. Continue current plan, recheck in {weeks} weeks.",
+]
+CHAT_QUESTIONS = [
+    "How do I reschedule my appointment?", "What are your opening hours?",
+    "Which providers accept new patients?", "Can I get a copy of my lab results?",
+    "Do I need to fast before a blood test?", "Is telehealth available for follow-ups?",
+]
+CHAT_MODELS = ["assistant-small", "assistant-large"]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _uuid(rng):
+    # Seeded, so repeated runs with the same --seed produce the same keys.
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+@contextmanager
+def explicit_timestamps(model):
+    """Let rows carry their own auto_now/auto_now_add values (backdated created_at) while inserting."""
+    fields = [f for f in model._meta.concrete_fields if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def bulk_insert(model, rows, batch_size=SEED_BATCH_SIZE):
+    """bulk_create an iterable of unsaved instances without materialising it; returns the count."""
+    total = 0
+    for batch in batched(rows, batch_size):
+        model.objects.bulk_create(batch, batch_size=batch_size)
+        total += len(batch)
+    return total
+
+
+def copy_insert(model, rows, batch_size=SEED_BATCH_SIZE):
+    """
+    Postgres only: stream unsaved instances through COPY ... FROM STDIN, one
+    COPY per batch. Several times faster than multi-row INSERTs at millions
+    of rows; serial primary keys are left to the database.
+    """
+    fields = [
+        f for f in model._meta.concrete_fields
+        if not isinstance(f, (AutoField, BigAutoField, SmallAutoField))
+    ]
+    qn = connection.ops.quote_name
+    sql = f"COPY {qn(model._meta.db_table)} ({', '.join(qn(f.column) for f in fields)}) FROM STDIN"
+
+    total = 0
+    with connection.cursor() as cursor:
+        for batch in batched(rows, batch_size):
+            with cursor.copy(sql) as copy:
+                for obj in batch:
+                    copy.write_row([f.get_db_prep_save(f.pre_save(obj, True), connection) for f in fields])
+            total += len(batch)
+    return total
+
+
+def insert(model, rows, batch_size=SEED_BATCH_SIZE, use_copy=False):
+    if use_copy:
+        return copy_insert(model, rows, batch_size)
+    return bulk_insert(model, rows, batch_size)
+
+
+# ======================================
+# USERS AND PROVIDERS
+# ======================================
+def create_users(prefix, count, rng, password_hash, batch_size=SEED_BATCH_SIZE):
+    """Bulk-create ``count`` users sharing one pre-computed password hash; returns them with pks."""
+    users = []
+    for batch in batched(range(count), batch_size):
+        users += User.objects.bulk_create([
+            User(
+                username=f"{prefix}-{i}",
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f"{prefix}-{i}@example.test",
+                password=password_hash,
+            )
+            for i in batch
+        ])
+    return users
+
+
+def create_providers(users, rng, batch_size=SEED_BATCH_SIZE):
+    specialties = [Specialty.objects.get_or_create(name=name)[0] for name in SPECIALTIES]
+    return Provider.objects.bulk_create([
+        Provider(
+            user=user,
+            specialty=rng.choice(specialties),
+            location=rng.choice(LOCATIONS),
+            bio="Synthetic provider.",
+            is_approved=True,
+        )
+        for user in users
+    ], batch_size=batch_size)
+
+
+# ======================================
+# SCHEDULES
+# ======================================
+def _days(first_day, days):
+    return [first_day + timedelta(days=offset) for offset in range(days)]
+
+
+def availability_rows(providers, days, tz):
+    """Weekday 09:00-17:00 windows for every provider over ``days``."""
+    for provider in providers:
+        for day in days:
+            if day.weekday() < 5:
+                yield Availability(
+                    provider_id=provider.id,
+                    start=timezone.make_aware(datetime.combine(day, DAY_START), tz),
+                    end=timezone.make_aware(datetime.combine(day, DAY_END), tz),
+                )
+
+
+def rule_rows(providers, valid_from, rng):
+    """A Saturday-morning rule for roughly a third of providers, to exercise rule expansion."""
+    for provider in providers:
+        if rng.random() < 0.33:
+            yield AvailabilityRule(
+                provider_id=provider.id,
+                day_of_week=AvailabilityRule.Weekday.SATURDAY,
+                start_time=time(9),
+                end_time=time(12),
+                valid_from=valid_from,
+            )
+
+
+def appointment_rows(providers, patients, days, per_provider, now, tz, rng):
+    """
+    ``per_provider`` non-overlapping 30-minute appointments per provider inside
+    its weekday windows, spread over ``days`` with past/future status mixes.
+    Each is created (and last touched) one to thirty days before it starts.
+    """
+    slots_per_day = int(timedelta(hours=DAY_END.hour - DAY_START.hour) / SLOT)
+    workdays = [day for day in days if day.weekday() < 5]
+    capacity = len(workdays) * slots_per_day
+
+    for provider in providers:
+        provider_name = provider.user.get_full_name() or provider.user.username
+        for index in sorted(rng.sample(range(capacity), min(per_provider, capacity))):
+            day, slot = divmod(index, slots_per_day)
+            start = timezone.make_aware(datetime.combine(workdays[day], DAY_START), tz) + slot * SLOT
+            created = min(now, start - timedelta(days=rng.randint(1, 30), minutes=rng.randint(0, 1439)))
+            patient = rng.choice(patients)
+            yield Appointment(
+                provider_id=provider.id,
+                provider_name=provider_name,
+                patient_id=patient.id,
+                patient_name=patient.get_full_name() or patient.username,
+                service=rng.choice(SERVICES),
+                start=start,
+                end=start + SLOT,
+                status=rng.choice(PAST_STATUSES if start < now else FUTURE_STATUSES),
+                created_at=created,
+                updated_at=created,
+            )
+
+
+# ======================================
+# NOTES AND CHAT
+# ======================================
+def note_rows(visits, per_visit, rng):
+    """Notes for (appointment_id, provider_name, service, end) rows; ``per_visit`` is the mean count."""
+    whole, fraction = int(per_visit), per_visit - int(per_visit)
+    for appointment_id, provider_name, service, end in visits:
+        for n in range(whole + (rng.random() < fraction)):
+            yield DoctorNote(
+                id=_uuid(rng),
+                appointment_id=appointment_id,
+                author_name=provider_name,
+                note_text=rng.choice(NOTE_TEMPLATES).format(service=service or "visit", weeks=rng.choice([2, 4, 6])),
+                created_at=end + timedelta(minutes=5 + 15 * n + rng.randint(0, 120)),
+            )
+
+
+def chat_rows(sessions, first_day, days, tz, rng):
+    """``sessions`` conversations of 2-12 turns, a minute or three apart, spread over ``days``."""
+    origin = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+    for _ in range(sessions):
+        session_id = _uuid(rng)
+        at = origin + timedelta(seconds=rng.randint(0, days * 86400 - 1))
+        model_name = rng.choice(CHAT_MODELS)
+        for turn in range(rng.randint(2, 12)):
+            question = rng.choice(CHAT_QUESTIONS)
+            yield ChatHistory(
+                id=_uuid(rng),
+                session_id=session_id,
+                user_message=question,
+                bot_response=f"Here is what I found about that: {question.lower().rstrip('?')}.",
+                model_name=model_name,
+                meta={"turn": turn, "tokens": rng.randint(40, 900), "latency_ms": rng.randint(150, 4000)},
+                created_at=at,
+            )
+            at += timedelta(seconds=rng.randint(30, 180))
+
+
+def completed_visits(after_id, batch_size):
+    """(id, provider_name, service, end) of completed appointments with id > ``after_id``, in keyset chunks."""
+    last = after_id
+    while True:
+        chunk = list(
+            Appointment.objects
+            .filter(id__gt=last, status=Appointment.Status.COMPLETED)
+            .order_by("id")
+            .values_list("id", "provider_name", "service", "end")[:batch_size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1][0]
+
+
+# ======================================
+# DATASET
+# ======================================
+def seed(
+    providers=20, patients=200, appointments=200, days=60, random_seed=0, prefix="synthetic",
+    notes_per_visit=0.0, chat_sessions=0, batch_size=SEED_BATCH_SIZE, use_copy=False, log=None,
+):
+    """
+    Create a reproducible dataset: ``providers`` providers with weekday
+    availability over ``days`` days centred on today, ``patients`` patients and
+    ``appointments`` appointments per provider, plus optional doctor notes on
+    completed visits and chat sessions. Returns the ids a benchmark needs to
+    address it. Bulk inserts skip signals, so the platform counters, search
+    index and caches are reconciled at the end.
+    """
+    rng = random.Random(random_seed)
+    tz = timezone.get_current_timezone()
+    now = timezone.now()
+    first_day = timezone.localdate() - timedelta(days=days // 2)
+    day_list = _days(first_day, days)
+    log = log or (lambda message: None)
+    counts, seconds = {}, {}
+    clock = perf_counter()
+
+    def lap(name):
+        nonlocal clock
+        seconds[name] = perf_counter() - clock
+        clock = perf_counter()
+
+    password_hash = make_password(SYNTHETIC_PASSWORD)
+    provider_users = create_users(f"{prefix}-provider", providers, rng, password_hash, batch_size)
+    patient_users = create_users(f"{prefix}-patient", patients, rng, password_hash, batch_size)
+    provider_objs = create_providers(provider_users, rng, batch_size)
+    for provider, user in zip(provider_objs, provider_users):
+        provider.user = user
+    counts["users"] = len(provider_users) + len(patient_users)
+    lap("users")
+    log(f"users: {counts['users']}")
+
+    counts["availability"] = insert(Availability, availability_rows(provider_objs, day_list, tz), batch_size, use_copy)
+    lap("availability")
+    counts["rules"] = bulk_insert(AvailabilityRule, rule_rows(provider_objs, first_day, rng), batch_size)
+    lap("rules")
+    log(f"availability windows: {counts['availability']}, rules: {counts['rules']}")
+
+    last_id = Appointment.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    with explicit_timestamps(Appointment):
+        counts["appointments"] = insert(
+            Appointment, appointment_rows(provider_objs, patient_users, day_list, appointments, now, tz, rng),
+            batch_size, use_copy,
+        )
+    lap("appointments")
+    log(f"appointments: {counts['appointments']}")
+
+    counts["notes"] = 0
+    if notes_per_visit > 0:
+        with explicit_timestamps(DoctorNote):
+            for visits in completed_visits(last_id, batch_size):
+                counts["notes"] += insert(DoctorNote, note_rows(visits, notes_per_visit, rng), batch_size, use_copy)
+        lap("notes")
+        log(f"doctor notes: {counts['notes']}")
+
+    counts["chat_messages"] = 0
+    if chat_sessions > 0:
+        with explicit_timestamps(ChatHistory):
+            counts["chat_messages"] = insert(
+                ChatHistory, chat_rows(chat_sessions, first_day, days, tz, rng), batch_size, use_copy,
+            )
+        lap("chat_messages")
+        log(f"chat messages: {counts['chat_messages']} in {chat_sessions} sessions")
+
+    counters.reconcile()
+    search.rebuild()
+    invalidate(DIRECTORY)
+    for provider in provider_objs:
+        bump_version(rules_namespace(provider.id))
+
+    return {
+        "providers": [p.id for p in provider_objs],
+        "patients": [u.id for u in patient_users],
+        "provider_usernames": [u.username for u in provider_users],
+        "patient_usernames": [u.username for u in patient_users],
+        "password": SYNTHETIC_PASSWORD,
+        "days": days,
+        "first_day": first_day.isoformat(),
+        "counts": counts,
+        "seconds": seconds,
+    }
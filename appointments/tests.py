@@ -1,3 +1,1431 @@
-from django.test import TestCase
+import asyncio
+import base64
+import json
+import os
+import re
+import runpy
+import tempfile
+import threading
+import uuid
+from datetime import datetime, time, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import JsonResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from . import analytics, booking, chat, counters, events, imports, photos, scheduling, search, sse
+from .cache import cached_response
+from .hashers import aauthenticate
+from .metrics import QueryTimer, count_queries, render, reset as reset_metrics, snapshot
+from .models import (
+    Appointment, Availability, AvailabilityException, AvailabilityRule, ChatHistory, DoctorNote, Provider, Specialty,
+)
+from .pagination import InvalidCursor, decode_offset
+
+
+def make_provider(username="provider", specialty="Cardiology", **fields):
+    user = User.objects.create(username=username, first_name=username.title(), last_name="Doe")
+    specialty, _ = Specialty.objects.get_or_create(name=specialty)
+    return Provider.objects.create(user=user, specialty=specialty, **fields)
+
+
+def make_appointments(provider, count, start=None, minutes=30, **fields):
+    start = start or (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    return [
+        Appointment.objects.create(
+            provider=provider,
+            start=start + i * timedelta(minutes=minutes),
+            end=start + (i + 1) * timedelta(minutes=minutes),
+            **fields,
+        )
+        for i in range(count)
+    ]
+
+
+def forge_cursor(parts):
+    return base64.urlsafe_b64encode(json.dumps(parts).encode()).decode()
+
+
+def post_json(client, path, data):
+    return client.post(path, json.dumps(data), content_type="application/json")
+
+
+# ======================================
+# METRICS
+# ======================================
+@override_settings(METRICS_SAMPLE_RATE=1, METRICS_SERVER_TIMING=True)
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+
+    def queries(self, response):
+        return int(re.search(r'desc="(\d+) queries"', response["Server-Timing"]).group(1))
+
+    def test_sync_route_counts_queries(self):
+        response = self.client.get(f"/api/providers/{self.provider.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.queries(response), 0)
+
+    async def test_async_route_counts_queries_from_orm_threads(self):
+        response = await self.async_client.get(f"/api/async/providers/{self.provider.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.queries(response), 0)
+
+    async def test_count_queries_follows_worker_threads(self):
+        # thread_sensitive=False runs on a pool thread with its own connection
+        # (ChatHistory: a table setUp's open transaction has not written to).
+        with count_queries(QueryTimer()) as timer:
+            await sync_to_async(ChatHistory.objects.count, thread_sensitive=False)()
+            await Provider.objects.acount()
+        self.assertEqual(timer.count, 2)
+
+    def test_server_timing_splits_db_and_non_db_time(self):
+        response = self.client.get(f"/api/providers/{self.provider.id}/")
+        self.assertEqual(
+            [part.split(";")[0] for part in response["Server-Timing"].split(", ")], ["db", "non-db", "total"]
+        )
+        self.assertIn("http_non_db_seconds_total{", render())
+
+    def test_unknown_methods_share_one_label(self):
+        reset_metrics()
+        for method in ("BREW", "PROPFIND", "X-" + "A" * 50):
+            self.client.generic(method, f"/api/providers/{self.provider.id}/")
+        self.client.get(f"/api/providers/{self.provider.id}/")
+
+        methods = {method for (route, method, _status) in snapshot() if route == "provider-detail"}
+        self.assertEqual(methods, {"GET", "OTHER"})
+
+
+# ======================================
+# BULK STATUS TRANSITIONS
+# ======================================
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        self.appts = make_appointments(self.provider, 4)
+
+    def bulk(self, data):
+        return post_json(self.client, "/api/appointments/bulk-status/", data)
+
+    def test_ids_report_an_outcome_each(self):
+        first, second, *_ = self.appts
+        Appointment.objects.filter(id=second.id).update(status=Appointment.Status.COMPLETED)
+
+        response = self.bulk({"status": "cancelled", "ids": [first.id, second.id, 999999]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["updated"], 1)
+        self.assertEqual(
+            [r["outcome"] for r in body["results"]], ["updated", "invalid_transition", "not_found"]
+        )
+        self.assertEqual(Appointment.objects.get(id=first.id).status, "cancelled")
+
+    def test_filter_updates_matching_rows(self):
+        cutoff = self.appts[2].start.isoformat()
+        response = self.bulk({"status": "confirmed", "filter": {"provider_id": self.provider.id, "start_before": cutoff}})
+        self.assertEqual(response.json()["updated"], 2)
+        response = self.bulk({"status": "confirmed", "filter": {"provider_id": self.provider.id}})
+        self.assertEqual(response.json()["updated"], 2)
+        response = self.bulk({"status": "confirmed", "filter": {"status": "confirmed"}})
+        self.assertEqual(response.json()["updated"], 0)
+        self.assertEqual(len(response.json()["results"]), 4)
+        self.assertEqual({r["outcome"] for r in response.json()["results"]}, {"unchanged"})
+
+    def test_invalid_filter_values_are_rejected(self):
+        for filters in (
+            {"provider_id": "abc"},
+            {"patient_id": True},
+            {"start_after": "garbage"},
+            {"start_before": 12},
+            {"status": "archived"},
+            {"colour": "red"},
+        ):
+            with self.subTest(filters=filters):
+                self.assertEqual(self.bulk({"status": "cancelled", "filter": filters}).status_code, 400)
+        self.assertEqual(self.bulk({"status": ["cancelled"], "ids": [1]}).status_code, 400)
+        self.assertEqual(self.bulk({"status": "cancelled", "ids": [True]}).status_code, 400)
+        self.assertFalse(Appointment.objects.filter(status="cancelled").exists())
+
+    def test_filter_matching_too_many_rows_is_rejected(self):
+        with mock.patch("appointments.booking.MAX_BULK_IDS", 3):
+            response = self.bulk({"status": "cancelled", "filter": {"status": "requested"}})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.filter(status="cancelled").exists())
+
+
+# ======================================
+# BOOKING
+# ======================================
+class ConcurrentBookingTests(TransactionTestCase):
+    """Real threads and transactions: every thread races for the same slot."""
+
+    THREADS = 8
+
+    def test_exactly_one_of_many_parallel_bookings_wins(self):
+        provider = make_provider()
+        start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        Availability.objects.create(provider=provider, start=start, end=start + timedelta(hours=2))
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def attempt(offset):
+            try:
+                barrier.wait()
+                # Half the threads ask for a slot shifted by 15 minutes: overlapping, not identical.
+                slot = start + timedelta(minutes=15 * (offset % 2))
+                response = post_json(Client(), "/api/appointments/book/", {
+                    "provider_id": provider.id, "start": slot.isoformat(), "duration": 30,
+                })
+                statuses.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=attempt, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [409] * (self.THREADS - 1))
+        self.assertEqual(Appointment.objects.filter(provider=provider).count(), 1)
+
+
+class BookTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        self.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        Availability.objects.create(provider=self.provider, start=self.start, end=self.start + timedelta(hours=2))
+
+    def book(self, **data):
+        return post_json(self.client, "/api/appointments/book/", {
+            "provider_id": self.provider.id, "start": self.start.isoformat(), **data,
+        })
+
+    def test_books_inside_availability_and_rejects_overlaps(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book(start=(self.start + timedelta(minutes=15)).isoformat()).status_code, 409)
+        self.assertEqual(self.book(start=(self.start + timedelta(minutes=30)).isoformat()).status_code, 201)
+        self.assertEqual(self.book(start=(self.start + timedelta(hours=2)).isoformat()).status_code, 400)
+
+    def test_cancelled_slot_can_be_rebooked(self):
+        item = self.book().json()["item"]
+        self.client.post(f"/api/appointments/{item['id']}/cancel/")
+        self.assertEqual(self.book().status_code, 201)
+
+    def test_malformed_input_is_a_400(self):
+        for data in (
+            {"provider_id": "abc"},
+            {"provider_id": None},
+            {"provider_id": True},
+            {"patient_id": "x"},
+            {"patient_id": [1]},
+            {"start": "2026-02-30T10:00:00"},
+            {"start": 12},
+            {"end": "soon"},
+            {"duration": "long"},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.book(**data).status_code, 400)
+        self.assertEqual(self.book(provider_id=999999).status_code, 404)
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_migration_refuses_to_run_over_overlapping_bookings(self):
+        migration = import_module("appointments.migrations.0007_appointment_overlap_constraints")
+        first, second = make_appointments(self.provider, 2)
+        # Simulate rows that predate the constraints by shifting one under the other.
+        Appointment.objects.filter(id=second.id).update(start=first.start + timedelta(minutes=10))
+        with self.assertRaisesMessage(RuntimeError, f"for the same provider: {second.id}."):
+            migration.check_overlapping(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(Appointment.objects.filter(status="cancelled").count(), 0)
+
+        out = StringIO()
+        call_command("resolve_overlaps", stdout=out)
+        self.assertIn(f"{second.id} overlaps {first.id}", out.getvalue())
+        self.assertEqual(Appointment.objects.filter(status="cancelled").count(), 0)
+
+        call_command("resolve_overlaps", "--cancel", stdout=StringIO())
+        self.assertEqual(Appointment.objects.get(id=first.id).status, "requested")
+        self.assertEqual(Appointment.objects.get(id=second.id).status, "cancelled")
+        migration.check_overlapping(apps, SimpleNamespace(connection=connection))
+
+
+class RescheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = make_provider()
+        self.start = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        Availability.objects.create(provider=self.provider, start=self.start, end=self.start + timedelta(hours=3))
+        self.appt, self.other = make_appointments(self.provider, 2, start=self.start, minutes=45)
+
+    def move(self, apt_id, start):
+        return post_json(self.client, f"/api/appointments/{apt_id}/reschedule/", {"start": start.isoformat()})
+
+    def test_move_keeps_the_duration(self):
+        response = self.move(self.appt.id, self.start + timedelta(hours=2))
+        self.assertEqual(response.status_code, 200)
+        self.appt.refresh_from_db()
+        self.assertEqual(self.appt.start, self.start + timedelta(hours=2))
+        self.assertEqual(self.appt.end - self.appt.start, timedelta(minutes=45))
+
+    def test_overlapping_another_booking_is_a_409(self):
+        response = self.move(self.appt.id, self.start + timedelta(minutes=60))
+        self.assertEqual(response.status_code, 409)
+        self.appt.refresh_from_db()
+        self.assertEqual(self.appt.start, self.start)
+
+    def test_own_old_slot_does_not_conflict(self):
+        # 1:00-1:45 overlaps only its own current slot, 0:45-1:30.
+        response = self.move(self.other.id, self.start + timedelta(minutes=60))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["item"]["start"], (self.start + timedelta(minutes=60)).isoformat())
+
+    def test_outside_availability_is_a_400(self):
+        self.assertEqual(self.move(self.appt.id, self.start + timedelta(hours=2, minutes=30)).status_code, 400)
+        self.assertEqual(self.move(self.appt.id, self.start - timedelta(hours=1)).status_code, 400)
+
+    def test_cancelled_completed_and_unknown_appointments(self):
+        for status in (Appointment.Status.CANCELLED, Appointment.Status.COMPLETED):
+            with self.subTest(status=status):
+                Appointment.objects.filter(id=self.appt.id).update(status=status)
+                self.assertEqual(self.move(self.appt.id, self.start + timedelta(hours=2)).status_code, 409)
+        self.assertEqual(self.move(999999, self.start + timedelta(hours=2)).status_code, 404)
+
+    def test_four_statements_with_warm_rules(self):
+        booking.reschedule(self.appt.id, self.start + timedelta(hours=2))
+        with CaptureQueriesContext(connection) as queries:
+            booking.reschedule(self.appt.id, self.start + timedelta(hours=1, minutes=30))
+        statements = [q["sql"] for q in queries.captured_queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(len(statements), 4)
+
+
+# ======================================
+# PROVIDER PHOTOS
+# ======================================
+def image_bytes(fmt="JPEG", size=(1600, 1200), frames=1):
+    buffer = BytesIO()
+    image = Image.new("RGB", size, (200, 40, 40))
+    extra = {"save_all": True, "append_images": [image] * (frames - 1)} if frames > 1 else {}
+    image.save(buffer, fmt, **extra)
+    return buffer.getvalue()
+
+
+@override_settings(PHOTO_WORKERS=0)
+class PhotoTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.provider = make_provider()
+
+    def upload(self, data, name="photo.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f"/api/providers/{self.provider.id}/upload-photo/", {"photo": SimpleUploadedFile(name, data)}
+            )
+
+    def test_upload_renders_renditions_after_commit(self):
+        response = self.upload(image_bytes())
+        self.assertEqual(response.status_code, 202)
+
+        item = self.client.get(f"/api/providers/{self.provider.id}/").json()["item"]
+        self.assertEqual(set(item["photos"]), {"thumb", "small", "large"})
+        self.assertTrue(item["profile_photo"].endswith("-1280.webp"))
+        self.provider.refresh_from_db()
+        with photos.storage.open(self.provider.photo_renditions["thumb"]) as fh:
+            self.assertEqual(Image.open(fh).size, (96, 72))
+        self.assertEqual(photos.storage.listdir(photos.UPLOAD_DIR), ([], []))
+
+        listed = self.client.get("/api/providers/").json()["items"][0]
+        self.assertTrue(listed["profile_photo"].endswith("-320.webp"))
+
+    def test_pending_upload_is_not_public(self):
+        with mock.patch("appointments.photos.schedule"):
+            self.upload(image_bytes())
+        self.provider.refresh_from_db()
+        self.assertTrue(photos.is_upload(self.provider.profile_photo.name))
+        self.assertIsNone(self.client.get(f"/api/providers/{self.provider.id}/").json()["item"]["profile_photo"])
+        self.assertEqual(self.client.get(f"/media/{self.provider.profile_photo.name}").status_code, 404)
+
+        call_command("process_photos", stdout=StringIO())
+        self.provider.refresh_from_db()
+        self.assertTrue(photos.is_rendition(self.provider.profile_photo.name))
+
+    def test_phone_camera_mpo_is_accepted(self):
+        self.assertEqual(self.upload(image_bytes("MPO", frames=2)).status_code, 202)
+        self.provider.refresh_from_db()
+        self.assertEqual(len(self.provider.photo_renditions), 3)
+
+    def test_rejected_uploads(self):
+        self.assertEqual(self.upload(b"not an image").status_code, 400)
+        self.assertEqual(self.upload(image_bytes("BMP", (10, 10)), "photo.bmp").status_code, 400)
+        with override_settings(PHOTO_MAX_PIXELS=100):
+            self.assertEqual(self.upload(image_bytes()).status_code, 400)
+        with override_settings(PHOTO_QUEUE_LIMIT=0):
+            response = self.upload(image_bytes())
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+
+# ======================================
+# CHAT HISTORY
+# ======================================
+def make_session(count, start, session_id=None, text="message {}"):
+    session_id = session_id or uuid.uuid4()
+    for i in range(count):
+        message = ChatHistory.objects.create(
+            session_id=session_id, user_message=text.format(i), bot_response=f"reply {i}", model_name="m1",
+        )
+        ChatHistory.objects.filter(pk=message.pk).update(created_at=start + timedelta(minutes=i))
+    return session_id
+
+
+class ChatCompactionTests(TestCase):
+    def setUp(self):
+        self.long_ago = timezone.now() - timedelta(days=200)
+
+    def transcript(self, session_id, **params):
+        return self.client.get(f"/api/chat/sessions/{session_id}/", params).json()
+
+    def test_compaction_keeps_the_transcript(self):
+        idle = make_session(5, self.long_ago)
+        active = make_session(2, timezone.now() - timedelta(hours=1))
+        before = self.transcript(idle)["messages"]
+
+        self.assertEqual(chat.idle_sessions(timezone.now() - timedelta(days=90)), [idle])
+        sessions, deleted, _raw, _packed = chat.compact_sessions([idle])
+        self.assertEqual((sessions, deleted), (1, 5))
+
+        archive = ChatHistory.objects.get(session_id=idle)
+        self.assertTrue(chat.is_archive(archive.meta))
+        self.assertEqual(archive.created_at, self.long_ago)
+        self.assertEqual(self.transcript(idle)["messages"], before)
+        self.assertEqual(ChatHistory.objects.filter(session_id=active).count(), 2)
+        self.assertEqual(chat.idle_sessions(timezone.now() - timedelta(days=90)), [])
+
+    def test_compaction_leaves_auto_now_add_alone(self):
+        chat.compact_sessions([make_session(2, self.long_ago)])
+        self.assertTrue(ChatHistory._meta.get_field("created_at").auto_now_add)
+        fresh = ChatHistory.objects.create(user_message="hi")
+        self.assertLess(timezone.now() - fresh.created_at, timedelta(minutes=1))
+
+    def test_archived_sessions_page_and_accept_appends(self):
+        session_id = make_session(5, self.long_ago)
+        chat.compact_sessions([session_id])
+        response = post_json(self.client, f"/api/chat/sessions/{session_id}/messages/", {"user_message": "back again"})
+        self.assertEqual(response.status_code, 201)
+
+        seen, cursor = [], None
+        while True:
+            page = self.transcript(session_id, limit=2, **({"cursor": cursor} if cursor else {}))
+            seen += [m["user_message"] for m in page["messages"]]
+            cursor = page.get("next_cursor")
+            if not cursor:
+                break
+        self.assertEqual(seen, [f"message {i}" for i in range(5)] + ["back again"])
+
+    def test_forged_transcript_cursors_are_a_400(self):
+        live = make_session(2, timezone.now())
+        archived = make_session(2, self.long_ago)
+        chat.compact_sessions([archived])
+        when = timezone.now().isoformat()
+        for parts in ([when, "zz"], [when, "12"], [when, [1]], [when, True]):
+            for session_id in (live, archived):
+                with self.subTest(parts=parts, archived=session_id == archived):
+                    response = self.client.get(f"/api/chat/sessions/{session_id}/", {"cursor": forge_cursor(parts)})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+    def test_compaction_deletes_in_bulk_and_leaves_the_index(self):
+        session_id = make_session(6, self.long_ago, text="wheezing {}")
+        other = make_session(1, self.long_ago, text="wheezing again")
+        backend = search.get_backend()
+        self.assertEqual(len(backend.search("chat", "wheezing", limit=20)), 7)
+
+        with CaptureQueriesContext(connection) as queries:
+            chat.compact_sessions([session_id], delete_batch_size=4)
+        # One SELECT, then per delete batch one DELETE (+ index cleanup): no per-row statements.
+        deletes = [q for q in queries.captured_queries if q["sql"].startswith("DELETE")]
+        self.assertLessEqual(len(deletes), 2 * (1 if backend.maintained_by_database else 3))
+
+        hits = backend.search("chat", "wheezing", limit=20)
+        self.assertEqual([h.id for h in hits], list(ChatHistory.objects.filter(session_id=other).values_list("id", flat=True)))
+
+
+# ======================================
+# DOCTOR NOTES
+# ======================================
+class DoctorNoteTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        self.appts = make_appointments(self.provider, 3)
+
+    def batch(self, notes, **data):
+        return post_json(self.client, "/api/notes/batch/", {"notes": notes, **data})
+
+    def put(self, path, data):
+        return self.client.put(path, json.dumps(data), content_type="application/json")
+
+    def test_batch_inserts_and_indexes(self):
+        notes = [{"appointment_id": a.id, "note_text": f"persistent cough {a.id}"} for a in self.appts]
+        response = self.batch(notes, provider_id=self.provider.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(DoctorNote.objects.count(), 3)
+        self.assertEqual(len(search.get_backend().search("notes", "cough", limit=10)), 3)
+
+    def test_batch_is_all_or_nothing_with_its_index(self):
+        notes = [{"appointment_id": self.appts[0].id, "note_text": "fever"}]
+        with mock.patch("appointments.views._index_notes", side_effect=RuntimeError("index down")):
+            with self.assertRaises(RuntimeError):
+                self.batch(notes)
+        self.assertFalse(DoctorNote.objects.exists())
+
+    def test_batch_rejects_malformed_entries(self):
+        apt_id = self.appts[0].id
+        for notes, data in (
+            ([{"appointment_id": True, "note_text": "x"}], {}),
+            ([{"appointment_id": "1", "note_text": "x"}], {}),
+            ([{"appointment_id": apt_id, "note_text": 5}], {}),
+            ([{"appointment_id": apt_id, "note_text": "x", "author_name": ["Dr"]}], {}),
+            ([{"appointment_id": apt_id, "note_text": "x"}], {"provider_id": "abc"}),
+        ):
+            with self.subTest(notes=notes, data=data):
+                self.assertEqual(self.batch(notes, **data).status_code, 400)
+        other = make_provider("other")
+        self.assertEqual(self.batch([{"appointment_id": apt_id, "note_text": "x"}], provider_id=other.id).status_code, 404)
+        self.assertFalse(DoctorNote.objects.exists())
+
+    def test_create_and_update_validate_types(self):
+        path = f"/api/appointments/{self.appts[0].id}/notes/"
+        self.assertEqual(post_json(self.client, path, {"note_text": 12}).status_code, 400)
+        self.assertEqual(post_json(self.client, path, {"note_text": "ok", "author_name": 7}).status_code, 400)
+        self.assertEqual(post_json(self.client, path, ["note"]).status_code, 400)
+        response = post_json(self.client, path, {"note_text": "  ok  "})
+        self.assertEqual(response.status_code, 201)
+        item = response.json()["item"]
+        self.assertEqual((item["note_text"], item["author_name"]), ("ok", "Provider Doe"))
+
+        update = f"/api/notes/{item['id']}/update/"
+        self.assertEqual(self.put(update, {"note_text": ["x"]}).status_code, 400)
+        self.assertEqual(self.put(update, {"author_name": 3}).status_code, 400)
+        self.assertEqual(self.put(update, {"note_text": ""}).status_code, 400)
+        self.assertEqual(self.put(update, {"author_name": "Dr Who"}).json()["item"]["note_text"], "ok")
+
+
+# ======================================
+# CURSOR PAGINATION
+# ======================================
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        # Two rows share each start, so pages must break ties on id.
+        self.appts = make_appointments(self.provider, 3)
+        self.appts += [
+            Appointment.objects.create(provider=self.provider, start=a.start, end=a.end - timedelta(minutes=15))
+            for a in self.appts
+        ]
+        self.path = f"/api/providers/{self.provider.id}/appointments/"
+
+    def test_cursor_walks_every_row_once_in_order(self):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            body = self.client.get(self.path, params).json()
+            self.assertLessEqual(len(body["appointments"]), 2)
+            seen += [row["id"] for row in body["appointments"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        expected = sorted(self.appts, key=lambda a: (a.start, a.id))
+        self.assertEqual(seen, [a.id for a in expected])
+
+    def test_unpaged_requests_get_the_full_list(self):
+        body = self.client.get(self.path).json()
+        self.assertEqual(len(body["appointments"]), 6)
+        self.assertNotIn("next_cursor", body)
+
+    def test_bad_limit_and_cursor_explain_themselves(self):
+        for limit in ("abc", "0", "-3"):
+            response = self.client.get(self.path, {"limit": limit})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["error"], "limit must be an integer between 1 and 200")
+        response = self.client.get(self.path, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.json(), {"error": "Invalid cursor"})
+        self.assertEqual(self.client.get(self.path, {"limit": 1000}).status_code, 200)
+
+    def test_forged_cursors_are_a_400(self):
+        when = "2024-01-01T00:00:00+00:00"
+        forged = [[when, "abc"], [when, [1]], [when, True], [when, 1], [when, str(2**70)], [1, "1"], [when]]
+        for parts in forged:
+            token = forge_cursor(parts)
+            for path in (self.path, "/api/appointments/", f"/api/async/providers/{self.provider.id}/appointments/"):
+                with self.subTest(parts=parts, path=path):
+                    response = self.client.get(path, {"cursor": token})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+    def test_offset_cursors_reject_non_integers(self):
+        for parts in ([True], [-1], ["1"], [1.5]):
+            with self.subTest(parts=parts):
+                with self.assertRaises(InvalidCursor):
+                    decode_offset(forge_cursor(parts))
+        self.assertEqual(decode_offset(forge_cursor([3])), 3)
+
+
+# ======================================
+# STREAMED EXPORTS
+# ======================================
+def read_stream(response):
+    return b"".join(response.streaming_content).decode()
+
+
+class StreamingTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        make_appointments(self.provider, 5)
+        self.path = f"/api/providers/{self.provider.id}/appointments/"
+
+    def buffered(self):
+        return self.client.get(self.path).json()["appointments"]
+
+    def test_streamed_json_matches_the_buffered_body(self):
+        response = self.client.get(self.path, {"stream": "1"})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(read_stream(response)), {"status": "ok", "appointments": self.buffered()})
+
+    def test_ndjson_rows_match_the_buffered_body(self):
+        for params, headers in (({"stream": "ndjson"}, {}), ({}, {"accept": "application/x-ndjson"})):
+            with self.subTest(params=params, headers=headers):
+                response = self.client.get(self.path, params, headers=headers)
+                self.assertEqual(response["Content-Type"], "application/x-ndjson")
+                rows = [json.loads(line) for line in read_stream(response).splitlines()]
+                self.assertEqual(rows, self.buffered())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def streamed_queries():
+            with CaptureQueriesContext(connection) as queries:
+                read_stream(self.client.get(self.path, {"stream": "1"}))
+            return len(queries)
+
+        few = streamed_queries()
+        make_appointments(self.provider, 40, start=Appointment.objects.latest("end").end)
+        self.assertEqual(streamed_queries(), few)
+        self.assertLessEqual(few, 2)
+
+    async def test_async_stream_matches_the_buffered_body(self):
+        expected = await sync_to_async(self.buffered)()
+        response = await self.async_client.get(
+            f"/api/async/providers/{self.provider.id}/appointments/", {"stream": "ndjson"}
+        )
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual([json.loads(line) for line in body.splitlines()], expected)
+
+
+# ======================================
+# FEED ROW SHAPES
+# ======================================
+# The model-instance serializers the values_list() shapes replaced; each
+# feed must render the same keys, in the same order, with the same values.
+
+def schedule_item(a):
+    return {
+        "id": a.id, "patient": a.patient_id, "patient_name": a.patient_name, "service": a.service,
+        "start": a.start.isoformat(), "end": a.end.isoformat(), "status": a.status,
+    }
+
+
+def provider_feed_item(a):
+    return {
+        "id": a.id, "provider": a.provider_id, "provider_name": a.provider.user.get_full_name(),
+        "patient": a.patient_id, "patient_name": a.patient_name, "service": a.service,
+        "start": a.start.isoformat(), "end": a.end.isoformat(), "status": a.status,
+    }
+
+
+def patient_feed_item(a):
+    return {
+        "id": a.id, "provider": a.provider_id, "provider_name": a.provider.user.get_full_name(),
+        "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
+        "service": a.service, "start": a.start.isoformat(), "end": a.end.isoformat(), "status": a.status,
+    }
+
+
+def appointment_item(a):
+    return {
+        "id": a.id, "patient": a.patient_id, "patient_name": a.patient_name,
+        "provider": a.provider_id, "provider_name": a.provider.user.get_full_name(),
+        "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
+        "service": a.service, "start": a.start.isoformat(), "end": a.end.isoformat(), "status": a.status,
+    }
+
+
+def appointment_detail_item(a):
+    item = appointment_item(a)
+    del item["provider_photo"]
+    return item
+
+
+class RowShapeTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider(profile_photo="provider_photos/doe.jpg")
+        self.patient = User.objects.create(username="pat", first_name="Pat", last_name="Lee")
+        now = timezone.now().replace(second=0, microsecond=0)
+        self.upcoming = make_appointments(self.provider, 2, start=now + timedelta(days=1), patient=self.patient,
+                                          service="Checkup")
+        self.past = make_appointments(self.provider, 2, start=now - timedelta(days=2), patient=self.patient)
+
+    def rendered(self, path, key, serializer, expected):
+        items = self.client.get(path).json()[key]
+        instances = Appointment.objects.select_related("provider__user").in_bulk([a.id for a in expected])
+        # Compare items() lists so a reordered column shows up as a failure.
+        self.assertEqual(
+            [list(item.items()) for item in items],
+            [list(serializer(instances[a.id]).items()) for a in expected],
+        )
+
+    def test_provider_schedule(self):
+        self.rendered(
+            f"/api/providers/{self.provider.id}/appointments/", "appointments", schedule_item,
+            self.past + self.upcoming,
+        )
+
+    def test_provider_feeds(self):
+        path = f"/api/providers/{self.provider.id}/appointments"
+        self.rendered(f"{path}/upcoming/", "appointments", provider_feed_item, self.upcoming)
+        self.rendered(f"{path}/past/", "appointments", provider_feed_item, self.past[::-1])
+
+    def test_patient_feeds(self):
+        path = f"/api/patients/{self.patient.id}/appointments"
+        self.rendered(f"{path}/", "items", patient_feed_item, self.past + self.upcoming)
+        self.rendered(f"{path}/upcoming/", "items", patient_feed_item, self.upcoming)
+
+    def test_appointment_list(self):
+        self.rendered("/api/appointments/", "items", appointment_item, (self.past + self.upcoming)[::-1])
+
+    def test_appointment_detail(self):
+        appt = self.upcoming[0]
+        body = self.client.get(f"/api/appointments/{appt.id}/").json()
+        expected = appointment_detail_item(Appointment.objects.select_related("provider__user").get(id=appt.id))
+        self.assertEqual(list(body.items()), list(expected.items()))
+
+
+# ======================================
+# CONDITIONAL FEEDS
+# ======================================
+class ConditionalFeedTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        self.appts = make_appointments(self.provider, 3)
+        self.path = f"/api/providers/{self.provider.id}/appointments/upcoming/"
+
+    def get(self, **headers):
+        return self.client.get(self.path, headers=headers)
+
+    def test_matching_etag_is_a_304_without_reading_rows(self):
+        etag = self.get()["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(len(queries), 1)
+
+    def test_edits_and_deletes_change_the_etag(self):
+        etag = self.get()["ETag"]
+        self.appts[0].delete()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["appointments"]), 2)
+
+        etag = response["ETag"]
+        self.appts[1].notes = "moved"
+        self.appts[1].save()
+        self.assertEqual(self.get(if_none_match=etag).status_code, 200)
+
+    def test_a_swap_keeping_count_and_last_edit_changes_the_etag(self):
+        etag = self.get()["ETag"]
+        last = Appointment.objects.latest("updated_at").updated_at
+        self.appts[0].delete()
+        make_appointments(self.provider, 1, start=self.appts[-1].end)
+        Appointment.objects.filter(provider=self.provider).update(updated_at=last)
+        self.assertEqual(self.get(if_none_match=etag).status_code, 200)
+
+    def test_if_modified_since_alone_never_answers_304(self):
+        response = self.get()
+        self.appts[0].delete()
+        response = self.get(if_modified_since=response["Last-Modified"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["appointments"]), 2)
+
+
+# ======================================
+# RESPONSE CACHE
+# ======================================
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = make_provider()
+
+    def test_directory_is_cached_and_revalidated(self):
+        response = self.client.get("/api/providers/")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/api/providers/", headers={"if_none_match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_unread_query_strings_share_one_entry(self):
+        with mock.patch("appointments.cache.cache.set", wraps=cache.set) as stored:
+            for i in range(5):
+                self.client.get("/api/providers/", {"junk": i})
+        self.assertEqual(stored.call_count, 1)
+
+    def test_declared_params_are_part_of_the_key(self):
+        view = cached_response(params=("q",))(lambda request: JsonResponse({"q": request.GET.get("q")}))
+        factory = RequestFactory()
+        self.assertEqual(json.loads(view(factory.get("/x/", {"q": "a", "junk": 1})).content), {"q": "a"})
+        self.assertEqual(json.loads(view(factory.get("/x/", {"q": "b"})).content), {"q": "b"})
+        self.assertEqual(json.loads(view(factory.get("/x/", {"q": "a", "junk": 2})).content), {"q": "a"})
+
+
+# ======================================
+# MEDIA
+# ======================================
+class MediaTests(TestCase):
+    body = bytes(range(100))
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name, MEDIA_ACCEL_REDIRECT="")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with open(f"{media_root.name}/file.bin", "wb") as fh:
+            fh.write(self.body)
+
+    def get(self, **headers):
+        response = self.client.get("/media/file.bin", headers=headers)
+        return response, b"".join(response.streaming_content) if response.streaming else response.content
+
+    def test_ranges(self):
+        cases = {
+            "bytes=10-19": (206, self.body[10:20], "bytes 10-19/100"),
+            "bytes=90-": (206, self.body[90:], "bytes 90-99/100"),
+            "bytes=-5": (206, self.body[95:], "bytes 95-99/100"),
+            "bytes=95-500": (206, self.body[95:], "bytes 95-99/100"),
+        }
+        for header, (status, content, content_range) in cases.items():
+            with self.subTest(header):
+                response, body = self.get(range=header)
+                self.assertEqual((response.status_code, body), (status, content))
+                self.assertEqual(response["Content-Range"], content_range)
+
+    def test_malformed_ranges_get_the_whole_file(self):
+        for header in ("bytes=5-3", "bytes=-", "bytes=0-1,5-9", "items=0-1"):
+            with self.subTest(header):
+                response, body = self.get(range=header)
+                self.assertEqual((response.status_code, body), (200, self.body))
+
+    def test_range_past_the_end_is_a_416(self):
+        for header in ("bytes=100-", "bytes=200-300", "bytes=-0"):
+            with self.subTest(header):
+                response, _ = self.get(range=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        etag = self.get()[0]["ETag"]
+        self.assertEqual(self.get(range="bytes=0-9", if_range=etag)[0].status_code, 206)
+        response, body = self.get(range="bytes=0-9", if_range='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.body))
+
+
+# ======================================
+# FREE SLOTS
+# ======================================
+def hours(day, *pairs):
+    """(start, end) datetimes on ``day`` from (start_hour, end_hour) pairs; halves allowed."""
+    return [(day + timedelta(hours=start), day + timedelta(hours=end)) for start, end in pairs]
+
+
+class SlotMathTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localtime(timezone.now() + timedelta(days=2)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    def test_merge_collapses_overlapping_and_touching_intervals(self):
+        merged = scheduling.merge_intervals(hours(self.day, (9, 10), (9.5, 11), (11, 12), (13, 14)))
+        self.assertEqual(list(merged), hours(self.day, (9, 12), (13, 14)))
+
+    def test_subtract_handles_blockers_at_edges_and_spanning_windows(self):
+        windows = hours(self.day, (9, 12), (13, 17), (18, 19))
+        busy = hours(self.day, (8, 9.5), (10, 10.5), (11.5, 13.5), (16, 20))
+        free = scheduling.subtract_intervals(windows, busy)
+        self.assertEqual(list(free), hours(self.day, (9.5, 10), (10.5, 11.5), (13.5, 16)))
+
+    def test_split_drops_remainders_shorter_than_a_slot(self):
+        slots = scheduling.split_slots(hours(self.day, (9, 10.75)), timedelta(minutes=30))
+        self.assertEqual(list(slots), hours(self.day, (9, 9.5), (9.5, 10), (10, 10.5)))
+
+    def test_free_slots_skip_live_bookings_only(self):
+        provider = make_provider()
+        (start, end), = hours(self.day, (9, 11))
+        Availability.objects.create(provider=provider, start=start, end=end)
+        booked, cancelled = make_appointments(provider, 2, start=self.day + timedelta(hours=9))
+        cancelled.status = Appointment.Status.CANCELLED
+        cancelled.save()
+
+        slots = scheduling.free_slots(provider.id, self.day, self.day + timedelta(days=1))
+        self.assertEqual(list(slots), hours(self.day, (9.5, 10), (10, 10.5), (10.5, 11)))
+
+    def test_endpoint_clips_to_the_requested_range(self):
+        provider = make_provider()
+        (start, end), = hours(self.day, (9, 12))
+        Availability.objects.create(provider=provider, start=start, end=end)
+        response = self.client.get(f"/api/availability/provider/{provider.id}/slots/", {
+            "start": (self.day + timedelta(hours=10)).isoformat(),
+            "end": (self.day + timedelta(hours=11)).isoformat(),
+            "duration": 20,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["start"] for item in response.json()["items"]],
+            [(self.day + timedelta(minutes=m)).isoformat() for m in (600, 620, 640)],
+        )
+
+
+class SlotSearchTests(TestCase):
+    def setUp(self):
+        self.day = timezone.localtime(timezone.now() + timedelta(days=2)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        self.early = make_provider("early", is_approved=True, location="Boston")
+        self.late = make_provider("late", is_approved=True, location="Denver")
+        self.dentist = make_provider("dentist", specialty="Dentistry", is_approved=True)
+        for provider, pairs in (
+            (self.early, [(9, 10), (14, 15)]),
+            (self.late, [(9.5, 11)]),
+            (self.dentist, [(8, 9)]),
+        ):
+            for start, end in hours(self.day, *pairs):
+                Availability.objects.create(provider=provider, start=start, end=end)
+
+    def test_merged_stream_is_ordered_across_providers_and_stops_at_the_limit(self):
+        providers = [self.early.id, self.late.id, self.dentist.id]
+        slots = scheduling.earliest_slots(providers, self.day, self.day + timedelta(days=1), limit=5)
+        self.assertEqual(
+            [(start, pid) for start, _, pid in slots],
+            [
+                (self.day + timedelta(hours=8), self.dentist.id),
+                (self.day + timedelta(hours=8.5), self.dentist.id),
+                (self.day + timedelta(hours=9), self.early.id),
+                (self.day + timedelta(hours=9.5), self.early.id),
+                (self.day + timedelta(hours=9.5), self.late.id),
+            ],
+        )
+
+    def test_bookings_and_providers_without_windows(self):
+        make_appointments(self.dentist, 2, start=self.day + timedelta(hours=8))
+        idle = make_provider("idle", is_approved=True)
+        providers = [idle.id, self.dentist.id, self.early.id]
+        slots = scheduling.earliest_slots(providers, self.day, self.day + timedelta(days=1), limit=1)
+        self.assertEqual(slots, [(self.day + timedelta(hours=9), self.day + timedelta(hours=9.5), self.early.id)])
+        self.assertEqual(scheduling.earliest_slots([], self.day, self.day + timedelta(days=1)), [])
+
+    def test_endpoint_filters_providers(self):
+        Provider.objects.filter(id=self.dentist.id).update(is_approved=False)
+        params = {"start": self.day.isoformat(), "end": (self.day + timedelta(days=1)).isoformat(), "limit": 3}
+        items = self.client.get("/api/availability/search/", params).json()["items"]
+        self.assertEqual([item["provider_id"] for item in items], [self.early.id, self.early.id, self.late.id])
+
+        items = self.client.get("/api/availability/search/", {**params, "location": "denver"}).json()["items"]
+        self.assertEqual({item["provider_id"] for item in items}, {self.late.id})
+
+
+class RecurringAvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = make_provider()
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=7 - today.weekday())
+        self.rule = AvailabilityRule.objects.create(
+            provider=self.provider, day_of_week=AvailabilityRule.Weekday.MONDAY,
+            start_time=time(9), end_time=time(10), valid_from=today,
+        )
+
+    def at(self, day, hour):
+        return timezone.make_aware(datetime.combine(day, time(hour)))
+
+    def slots(self, weeks=3):
+        start = self.at(self.monday, 0)
+        return [s for s, _ in scheduling.free_slots(self.provider.id, start, start + timedelta(weeks=weeks))]
+
+    def test_rule_expands_once_per_week_in_range(self):
+        mondays = [self.monday + timedelta(weeks=w) for w in range(3)]
+        expected = [self.at(day, 9) + timedelta(minutes=m) for day in mondays for m in (0, 30)]
+        self.assertEqual(self.slots(), expected)
+
+    def test_exceptions_and_validity_end_are_honoured(self):
+        AvailabilityException.objects.create(rule=self.rule, date=self.monday)
+        self.rule.valid_until = self.monday + timedelta(weeks=1)
+        self.rule.save()
+        second = self.monday + timedelta(weeks=1)
+        self.assertEqual(self.slots(), [self.at(second, 9), self.at(second, 9) + timedelta(minutes=30)])
+
+    def test_cached_weeks_follow_rule_changes(self):
+        self.assertEqual(len(self.slots(weeks=1)), 2)
+        with CaptureQueriesContext(connection) as queries:
+            self.slots(weeks=1)
+        self.assertFalse(any("availabilityrule" in q["sql"] for q in queries.captured_queries))
+
+        self.rule.end_time = time(11)
+        self.rule.save()
+        self.assertEqual(len(self.slots(weeks=1)), 4)
+
+        path = f"/api/availability/rules/{self.rule.id}/exceptions/"
+        response = post_json(self.client, path, {"date": self.monday.isoformat()})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.slots(weeks=1), [])
+
+
+# ======================================
+# PLATFORM COUNTERS
+# ======================================
+class CounterTests(TestCase):
+    def setUp(self):
+        counters.reconcile()
+
+    def stats(self):
+        return self.client.get("/api/admin/stats/").json()["stats"]
+
+    def test_signals_keep_the_row_in_step_with_the_tables(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            provider = make_provider()
+            User.objects.create(username="patient")
+            User.objects.create(username="staff", is_staff=True)
+            appts = make_appointments(provider, 3)
+        self.assertEqual(self.stats(), counters.actual_counts())
+        self.assertEqual(self.stats(), {"total_providers": 1, "total_patients": 1, "total_appointments": 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appts[0].delete()
+            provider.delete()
+            User.objects.get(username="patient").delete()
+        self.assertEqual(self.stats(), counters.actual_counts())
+
+    def test_deltas_wait_for_the_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            make_provider()
+        self.assertEqual(self.stats()["total_providers"], 0)
+        self.assertTrue(callbacks)
+
+    def test_stats_read_one_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.stats()
+        self.assertEqual(len(queries), 1)
+
+    def test_reconcile_fixes_drift(self):
+        make_provider()  # on_commit never runs inside the test transaction
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("total_providers: 0 -> 1", out.getvalue())
+        self.assertEqual(self.stats(), counters.actual_counts())
+
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("Counters already match", out.getvalue())
+
+
+# ======================================
+# FULL-TEXT SEARCH
+# ======================================
+class SearchTests(TestCase):
+    def setUp(self):
+        self.appt = make_appointments(make_provider(), 1)[0]
+
+    def note(self, text, author="Dr Smith"):
+        return DoctorNote.objects.create(appointment=self.appt, note_text=text, author_name=author)
+
+    def search(self, q, kind="notes", **params):
+        return self.client.get("/api/search/", {"q": q, "type": kind, **params})
+
+    def ids(self, q, kind="notes"):
+        return [item["id"] for item in self.search(q, kind).json()["results"]]
+
+    def test_saves_and_deletes_keep_the_index_current(self):
+        note = self.note("mild asthma")
+        self.assertEqual(self.ids("asthma"), [str(note.id)])
+
+        note.note_text = "seasonal allergies"
+        note.save()
+        self.assertEqual(self.ids("asthma"), [])
+        self.assertEqual(self.ids("allergies"), [str(note.id)])
+
+        note.delete()
+        self.assertEqual(self.ids("allergies"), [])
+
+    def test_results_are_ranked_and_carry_context(self):
+        by_author = self.note("routine visit", author="Dr Migraine")
+        by_text = self.note("recurring migraine, migraine diary started")
+        body = self.search("migraine").json()
+        self.assertEqual([item["id"] for item in body["results"]], [str(by_text.id), str(by_author.id)])
+        self.assertIn("[migraine]", body["results"][0]["snippet"].lower())
+        self.assertEqual(body["results"][0]["appointment_id"], self.appt.id)
+
+    def test_chat_messages_are_searchable(self):
+        message = ChatHistory.objects.create(user_message="Can I move my booking?", bot_response="Yes, reschedule it.")
+        result = self.search("reschedule", kind="chat").json()["results"]
+        self.assertEqual([item["id"] for item in result], [str(message.id)])
+        self.assertEqual(result[0]["session_id"], str(message.session_id))
+
+    def test_query_syntax_is_treated_as_words(self):
+        note = self.note("knee pain OR swelling")
+        for q in ('pain OR', '"knee', "(knee)", "knee:pain", "knee*", "-pain"):
+            with self.subTest(q=q):
+                response = self.search(q)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([item["id"] for item in response.json()["results"]], [str(note.id)])
+        self.assertEqual(self.ids("***"), [])
+
+    def test_pages_with_an_offset_cursor(self):
+        notes = {str(self.note(f"fracture follow-up {i}").id) for i in range(5)}
+        seen, cursor = [], None
+        while True:
+            body = self.search("fracture", limit=2, **({"cursor": cursor} if cursor else {})).json()
+            seen += [item["id"] for item in body["results"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(set(seen), notes)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.search("").status_code, 400)
+        self.assertEqual(self.search("x", kind="emails").status_code, 400)
+        self.assertEqual(self.search("x", cursor="nope").json(), {"error": "Invalid cursor"})
+
+    def test_rebuild_indexes_bulk_loads(self):
+        notes = DoctorNote.objects.bulk_create(
+            [DoctorNote(appointment=self.appt, note_text="bulk imported rash") for _ in range(3)]
+        )
+        search.rebuild(["notes"])
+        self.assertEqual(sorted(self.ids("rash")), sorted(str(n.id) for n in notes))
+
+
+# ======================================
+# AVAILABILITY IMPORT
+# ======================================
+class AvailabilityImportTests(TestCase):
+    def setUp(self):
+        self.provider = make_provider()
+        self.day = timezone.localtime(timezone.now() + timedelta(days=2)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+
+    def windows(self):
+        return list(Availability.objects.filter(provider=self.provider).order_by("start").values_list("start", "end"))
+
+    def post(self, body, content_type="application/json", **params):
+        query = f"?provider_id={params['provider_id']}" if params else ""
+        return self.client.post(f"/api/availability/import/{query}", body, content_type=content_type)
+
+    def json_body(self, *pairs):
+        return json.dumps({
+            "provider_id": self.provider.id,
+            "windows": [{"start": s.isoformat(), "end": e.isoformat()} for s, e in hours(self.day, *pairs)],
+        })
+
+    def test_plan_merges_overlapping_and_touching_windows(self):
+        existing = [(pk, *window) for pk, window in enumerate(hours(self.day, (9, 10), (11, 12), (15, 16)), 1)]
+        delete, create = imports._plan(existing, hours(self.day, (9.5, 11), (13, 14)))
+        self.assertEqual(delete, [1, 2])
+        self.assertEqual(create, hours(self.day, (9, 12), (13, 14)))
+
+    def test_import_merges_with_stored_windows(self):
+        for start, end in hours(self.day, (9, 10), (11, 12), (15, 16)):
+            Availability.objects.create(provider=self.provider, start=start, end=end)
+        response = self.post(self.json_body((9.5, 11), (13, 14), (13.5, 14.5)))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["replaced"], 2)
+        self.assertEqual(self.windows(), hours(self.day, (9, 12), (13, 14.5), (15, 16)))
+
+    def test_csv_body_and_multipart_upload(self):
+        rows = "".join(f"{s.isoformat()},{e.isoformat()}\n" for s, e in hours(self.day, (9, 10), (10, 11)))
+        response = self.post("start,end\n" + rows, content_type="text/csv", provider_id=self.provider.id)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.windows(), hours(self.day, (9, 11)))
+
+        upload = SimpleUploadedFile("week.json", self.json_body((14, 15)).encode())
+        response = self.client.post("/api/availability/import/", {"file": upload})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.windows(), hours(self.day, (9, 11), (14, 15)))
+
+        csv_text = f"start,end,provider_id\n{rows.splitlines()[0]},{self.provider.id}\n"
+        upload = SimpleUploadedFile("week.csv", csv_text.encode())
+        self.assertEqual(self.client.post("/api/availability/import/", {"file": upload}).status_code, 201)
+
+    def test_malformed_rows_are_a_400(self):
+        start = self.day.isoformat()
+        for body in (
+            "not json",
+            json.dumps({"windows": "nope"}),
+            json.dumps([{"start": start, "end": start, "provider_id": self.provider.id}]),
+            json.dumps([{"start": "yesterday", "end": start, "provider_id": self.provider.id}]),
+            json.dumps([{"start": start, "end": start}]),
+            json.dumps([["a", "b"]]),
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+        self.assertEqual(self.windows(), [])
+
+    def test_unknown_provider_rolls_back_the_whole_import(self):
+        windows = json.loads(self.json_body((9, 10)))["windows"]
+        unknown = [{**window, "provider_id": 999999} for window in windows]
+        response = self.post(json.dumps(windows + unknown), provider_id=self.provider.id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("999999", response.json()["error"])
+        self.assertEqual(self.windows(), [])
+
+
+# ======================================
+# PROVIDER ANALYTICS
+# ======================================
+class AnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.provider = make_provider()
+        today = timezone.localdate() - timedelta(days=21)
+        self.base = timezone.make_aware(datetime.combine(today - timedelta(days=today.weekday()), time.min))
+
+    def book(self, offset, status):
+        start = self.base + offset + timedelta(hours=9)
+        end = start + timedelta(minutes=30)
+        return Appointment.objects.create(provider=self.provider, start=start, end=end, status=status)
+
+    def open_window(self, offset, hours):
+        start = self.base + offset + timedelta(hours=9)
+        Availability.objects.create(provider=self.provider, start=start, end=start + timedelta(hours=hours))
+
+    def stats(self, bucket, **params):
+        response = self.client.get(f"/api/providers/{self.provider.id}/analytics/", {"bucket": bucket, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_buckets_and_rates(self):
+        week = timedelta(days=7)
+        self.book(timedelta(0), Appointment.Status.COMPLETED)
+        self.book(timedelta(days=1), Appointment.Status.CANCELLED)
+        self.book(week, Appointment.Status.REQUESTED)  # in the past: a no-show
+        self.open_window(timedelta(0), 3)
+        self.open_window(week, 2)
+        span = {"start": self.base.isoformat(), "end": (self.base + 2 * week).isoformat()}
+
+        stats = self.stats("week", **span)
+        self.assertEqual(
+            [(b["period"], b["total"], b["booked_hours"], b["available_hours"]) for b in stats["buckets"]],
+            [(self.base.isoformat(), 2, 0.5, 3.0), ((self.base + week).isoformat(), 1, 0.5, 2.0)],
+        )
+        self.assertEqual(stats["total_appointments"], 3)
+        self.assertEqual(stats["by_status"]["cancelled"], 1)
+        self.assertEqual(stats["cancellation_rate"], 0.3333)
+        self.assertEqual(stats["no_show_rate"], 0.5)
+        self.assertEqual(stats["utilisation"], 0.2)
+
+        self.assertEqual(len(self.stats("day", **span)["buckets"]), 3)
+        months = {analytics.bucket_start(self.base + d, "month") for d in (timedelta(0), timedelta(days=1), week)}
+        periods = [b["period"] for b in self.stats("month", **span)["buckets"]]
+        self.assertEqual(periods, [m.isoformat() for m in sorted(months)])
+
+    def test_rules_only_provider_reports_available_hours(self):
+        AvailabilityRule.objects.create(
+            provider=self.provider, day_of_week=AvailabilityRule.Weekday.MONDAY,
+            start_time=time(9), end_time=time(17), valid_from=self.base.date() - timedelta(days=7),
+        )
+        stats = analytics.provider_stats(self.provider.id, "week")
+        self.assertEqual(stats["available_hours"], 8.0)
+        self.assertEqual(stats["buckets"][0]["period"], analytics.bucket_start(timezone.now(), "week").isoformat())
+
+        span = {"start": self.base.isoformat(), "end": (self.base + timedelta(days=14)).isoformat()}
+        stats = self.stats("week", **span)
+        self.assertEqual([b["available_hours"] for b in stats["buckets"]], [8.0, 8.0])
+        self.assertEqual(stats["utilisation"], 0.0)
+
+    def test_bucket_end_steps_one_bucket(self):
+        jan31 = timezone.make_aware(datetime(2026, 1, 31))
+        for kind, expected in (("day", 1), ("week", 2), ("month", 1)):
+            with self.subTest(kind=kind):
+                end = analytics.bucket_end(analytics.bucket_start(jan31, kind), kind)
+                self.assertEqual(timezone.localdate(end), datetime(2026, 2, expected).date())
+
+
+# ======================================
+# LIVE EVENTS
+# ======================================
+class EventTests(TestCase):
+    async def test_full_queue_is_replaced_by_one_resync(self):
+        sub = events.Subscription(maxsize=2)
+        for i in range(5):
+            sub.offer({"event": "appointment.created", "id": i})
+        self.assertEqual(sub.overflows, 2)  # RESYNC frees room, so the 4th fits and the 5th overflows again
+        self.assertEqual(await sub.get(timeout=0.1), events.RESYNC)
+        sub.offer({"event": "appointment.created", "id": 9})
+        self.assertEqual((await sub.get(timeout=0.1))["id"], 9)
+        self.assertIsNone(await sub.get(timeout=0.01))
+
+    async def test_local_broker_fans_out_per_channel(self):
+        broker = events.LocalBroker(queue_size=4)
+        async with broker.subscribe("provider:1") as first, broker.subscribe("provider:1") as second:
+            async with broker.subscribe("provider:2") as other:
+                self.assertEqual(broker.subscriber_count("provider:1"), 2)
+                broker.publish("provider:1", {"event": "appointment.created"})
+                for sub in (first, second):
+                    event = await sub.get(timeout=1)
+                    self.assertEqual(event["event"], "appointment.created")
+                    self.assertIn("id", event)
+                self.assertIsNone(await other.get(timeout=0.01))
+        self.assertEqual(broker.subscriber_count("provider:1"), 0)
+
+    def test_events_publish_on_commit_only(self):
+        appt = make_appointments(make_provider(), 1)[0]
+        with mock.patch("appointments.events._publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        events.appointment_changed("cancelled", appt)
+                        raise RuntimeError("rolled back")
+                except RuntimeError:
+                    pass
+            publish.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                events.appointment_changed("created", appt)
+                publish.assert_not_called()
+        publish.assert_called_once()
+        channel, event = publish.call_args.args
+        self.assertEqual(channel, events.provider_channel(appt.provider_id))
+        self.assertEqual(event["event"], "appointment.created")
+        self.assertEqual(event["appointment"]["id"], appt.id)
+
+    @override_settings(CORS_ALLOWED_ORIGINS=["https://dash.example"], CORS_ALLOWED_ORIGIN_REGEXES=[])
+    async def test_sse_connect_streams_events(self):
+        broker = events.LocalBroker(queue_size=4)
+        sent, gone = [], asyncio.Event()
+
+        async def receive():
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            body = message.get("body", b"")
+            if b"event: ready" in body:
+                broker.publish(events.provider_channel(7), {"event": "appointment.created"})
+            elif b"appointment.created" in body:
+                gone.set()
+
+        async def django_app(scope, receive, send):
+            raise AssertionError("event streams bypass Django")
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/api/events/providers/7/",
+            "headers": [(b"origin", b"https://dash.example")],
+        }
+        with mock.patch("appointments.sse.get_broker", return_value=broker):
+            await asyncio.wait_for(sse.events_router(django_app)(scope, receive, send), 5)
+
+        start = sent[0]
+        headers = dict(start["headers"])
+        self.assertEqual(start["status"], 200)
+        self.assertEqual(headers[b"content-type"], b"text/event-stream")
+        self.assertEqual(headers[b"cache-control"], b"no-cache")
+        self.assertEqual(headers[b"access-control-allow-origin"], b"https://dash.example")
+        self.assertIn(b"event: appointment.created", sent[-1]["body"])
+        self.assertEqual(broker.subscriber_count(events.provider_channel(7)), 0)
+
+    async def test_sse_rejects_other_methods_and_passes_other_paths_on(self):
+        sent, passed = [], []
+
+        async def send(message):
+            sent.append(message)
+
+        async def django_app(scope, receive, send):
+            passed.append(scope["path"])
+
+        app = sse.events_router(django_app)
+        await app({"type": "http", "method": "POST", "path": "/api/events/providers/7/"}, None, send)
+        self.assertEqual(sent[0]["status"], 405)
+        await app({"type": "http", "method": "GET", "path": "/api/providers/"}, None, send)
+        self.assertEqual(passed, ["/api/providers/"])
+
+
+# ======================================
+# PASSWORD HASHING
+# ======================================
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="alice", password=make_password("s3cret", hasher="pbkdf2_sha1"))
+
+    def login(self, path):
+        return post_json(self.client, path, {"username": "alice", "password": "s3cret"})
+
+    def test_login_rehashes_outdated_hashes_with_the_preferred_hasher(self):
+        preferred = get_hasher("default")
+        for path in ("/api/login/", "/api/async/login/"):
+            with self.subTest(path=path):
+                User.objects.filter(id=self.user.id).update(password=make_password("s3cret", hasher="pbkdf2_sha1"))
+                self.assertEqual(self.login(path).status_code, 200)
+                self.user.refresh_from_db()
+                self.assertTrue(self.user.password.startswith(f"{preferred.algorithm}$"))
+                self.assertFalse(preferred.must_update(self.user.password))
+                self.assertTrue(self.user.check_password("s3cret"))
+
+    def test_changed_cost_is_applied_on_the_next_login(self):
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=500):
+            User.objects.filter(id=self.user.id).update(password=make_password("s3cret", hasher="pbkdf2_sha256"))
+        self.assertEqual(self.login("/api/login/").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password.split("$")[1], "1000")
+
+    async def test_async_authenticate_hashes_on_the_pool(self):
+        threads = []
+        verify = hashers.verify_password
+
+        def spy(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return verify(*args, **kwargs)
+
+        with mock.patch("django.contrib.auth.hashers.verify_password", spy):
+            user = await aauthenticate("alice", "s3cret")
+            self.assertIsNone(await aauthenticate("alice", "wrong"))
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(len(threads), 2)
+        self.assertTrue(all(name.startswith("hashing") for name in threads))
+        self.assertIsNone(await aauthenticate("nobody", "s3cret"))
+
+    def test_settings_fall_back_to_pbkdf2_without_argon2(self):
+        path = settings.BASE_DIR / "config" / "settings.py"
+        environ = {k: v for k, v in os.environ.items() if k != "PASSWORD_HASHER"}
+        with mock.patch.dict(os.environ, environ, clear=True), mock.patch("dotenv.load_dotenv"):
+            with mock.patch("importlib.util.find_spec", return_value=None):
+                fallback = runpy.run_path(str(path))
+            with mock.patch("importlib.util.find_spec", return_value=object()):
+                preferred = runpy.run_path(str(path))
+        self.assertEqual(fallback["PASSWORD_HASHER"], "pbkdf2")
+        self.assertEqual(fallback["PASSWORD_HASHERS"][0], "appointments.hashers.PBKDF2PasswordHasher")
+        self.assertEqual(preferred["PASSWORD_HASHERS"][0], "appointments.hashers.Argon2PasswordHasher")
@@ -1,7 +1,7 @@
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from . import views
+from . import async_views, views
 from .views import provider_update   # <--- IMPORTANT
 
 urlpatterns = [
@@ -16,10 +16,21 @@ urlpatterns = [
     # APPOINTMENTS
     # ========================================================
     path("appointments/", views.appointment_list, name="appointment-list"),
+    path("appointments/book/", views.book, name="appointment-book"),
+    path("appointments/bulk-status/", views.bulk_status, name="appointment-bulk-status"),
     path("appointments/<int:apt_id>/", views.appointment_detail, name="appointment-detail"),
     path("appointments/<int:apt_id>/cancel/", views.cancel_appointment, name="appointment-cancel"),
     path("appointments/<int:apt_id>/complete/", views.complete_appointment, name="appointment-complete"),
     path("appointments/<int:apt_id>/reschedule/", views.reschedule_appointment, name="appointment-reschedule"),
+    path("appointments/<int:apt_id>/notes/", views.appointment_notes, name="appointment-notes"),
+
+    # ========================================================
+    # DOCTOR NOTES
+    # ========================================================
+    path("notes/batch/", views.note_batch, name="note-batch"),
+    path("notes/<uuid:note_id>/", views.note_detail, name="note-detail"),
+    path("notes/<uuid:note_id>/update/", views.note_update, name="note-update"),
+    path("notes/<uuid:note_id>/delete/", views.note_delete, name="note-delete"),
 
     # ========================================================
     # PROVIDERS
@@ -31,13 +42,13 @@ urlpatterns = [
     path("providers/<int:provider_id>/update/", provider_update, name="provider-update"),
 
     # Provider photo upload endpoint
-    path("providers/<int:provider_id>/upload-photo/", views.provider_upload_photo),
+    path("providers/<int:provider_id>/upload-photo/", views.provider_upload_photo, name="provider-upload-photo"),
 
     # Provider appointments
-    path("providers/<int:provider_id>/appointments/", views.provider_appointments),
-    path("providers/<int:provider_id>/appointments/upcoming/", views.provider_upcoming),
-    path("providers/<int:provider_id>/appointments/past/", views.provider_past),
-    path("providers/<int:provider_id>/appointments/today/", views.provider_today),
+    path("providers/<int:provider_id>/appointments/", views.provider_appointments, name="provider-appointments"),
+    path("providers/<int:provider_id>/appointments/upcoming/", views.provider_upcoming, name="provider-upcoming"),
+    path("providers/<int:provider_id>/appointments/past/", views.provider_past, name="provider-past"),
+    path("providers/<int:provider_id>/appointments/today/", views.provider_today, name="provider-today"),
 
     # Provider analytics
     path("providers/<int:provider_id>/analytics/", views.provider_analytics, name="provider-analytics"),
@@ -45,26 +56,32 @@ urlpatterns = [
     # ========================================================
     # PATIENT DASHBOARD
     # ========================================================
-    path("patients/<int:patient_id>/appointments/", views.patient_appointments),
-    path("patients/<int:patient_id>/appointments/upcoming/", views.patient_upcoming),
-    path("patients/<int:patient_id>/appointments/past/", views.patient_past),
+    path("patients/<int:patient_id>/appointments/", views.patient_appointments, name="patient-appointments"),
+    path("patients/<int:patient_id>/appointments/upcoming/", views.patient_upcoming, name="patient-upcoming"),
+    path("patients/<int:patient_id>/appointments/past/", views.patient_past, name="patient-past"),
 
     # ========================================================
     # SPECIALTIES CRUD (ADMIN)
     # ========================================================
-    path("admin/specialties/", views.specialty_list),
-    path("admin/specialties/create/", views.specialty_create),
-    path("admin/specialties/<int:spec_id>/update/", views.specialty_update),
-    path("admin/specialties/<int:spec_id>/delete/", views.specialty_delete),
+    path("admin/specialties/", views.specialty_list, name="specialty-list"),
+    path("admin/specialties/create/", views.specialty_create, name="specialty-create"),
+    path("admin/specialties/<int:spec_id>/update/", views.specialty_update, name="specialty-update"),
+    path("admin/specialties/<int:spec_id>/delete/", views.specialty_delete, name="specialty-delete"),
 
     # ========================================================
     # AVAILABILITY CRUD
     # ========================================================
-    path("availability/", views.availability_list),
-    path("availability/provider/<int:provider_id>/", views.provider_availability),
-    path("availability/create/", views.create_availability),
-    path("availability/<int:avail_id>/update/", views.update_availability),
-    path("availability/<int:avail_id>/delete/", views.delete_availability),
+    path("availability/", views.availability_list, name="availability-list"),
+    path("availability/provider/<int:provider_id>/", views.provider_availability, name="provider-availability"),
+    path("availability/provider/<int:provider_id>/slots/", views.provider_slots, name="provider-slots"),
+    path("availability/search/", views.slot_search, name="slot-search"),
+    path("availability/create/", views.create_availability, name="availability-create"),
+    path("availability/import/", views.import_availability, name="availability-import"),
+    path("availability/<int:avail_id>/update/", views.update_availability, name="availability-update"),
+    path("availability/<int:avail_id>/delete/", views.delete_availability, name="availability-delete"),
+    path("availability/rules/<int:rule_id>/update/", views.update_availability_rule, name="availability-rule-update"),
+    path("availability/rules/<int:rule_id>/delete/", views.delete_availability_rule, name="availability-rule-delete"),
+    path("availability/rules/<int:rule_id>/exceptions/", views.availability_rule_exception, name="availability-rule-exception"),
 
     # ========================================================
     # ADMIN PROVIDERS
@@ -72,6 +89,37 @@ urlpatterns = [
     path("admin/providers/", views.admin_provider_list, name="admin-provider-list"),
     path("admin/providers/<int:provider_id>/toggle/", views.admin_toggle_provider, name="admin-provider-toggle"),
     path("admin/stats/", views.admin_stats, name="admin-stats"),
+
+    # ========================================================
+    # CHAT SESSIONS
+    # ========================================================
+    path("chat/sessions/<uuid:session_id>/", views.chat_transcript, name="chat-transcript"),
+    path("chat/sessions/<uuid:session_id>/messages/", views.chat_append, name="chat-append"),
+
+    # ========================================================
+    # FULL-TEXT SEARCH
+    # ========================================================
+    path("search/", views.search_documents, name="search"),
+
+    # ========================================================
+    # METRICS (Prometheus text format)
+    # ========================================================
+    path("metrics/", views.metrics, name="metrics"),
+
+    # ========================================================
+    # ASYNC READS (same responses, async ORM; for ASGI deployments)
+    # ========================================================
+    path("async/register/", async_views.register, name="async-register"),
+    path("async/login/", async_views.login, name="async-login"),
+    path("async/providers/", async_views.provider_list, name="async-provider-list"),
+    path("async/providers/<int:provider_id>/", async_views.provider_detail, name="async-provider-detail"),
+    path("async/providers/<int:provider_id>/appointments/", async_views.provider_appointments, name="async-provider-appointments"),
+    path("async/providers/<int:provider_id>/appointments/upcoming/", async_views.provider_upcoming, name="async-provider-upcoming"),
+    path("async/providers/<int:provider_id>/appointments/past/", async_views.provider_past, name="async-provider-past"),
+    path("async/providers/<int:provider_id>/appointments/today/", async_views.provider_today, name="async-provider-today"),
+    path("async/patients/<int:patient_id>/appointments/", async_views.patient_appointments, name="async-patient-appointments"),
+    path("async/patients/<int:patient_id>/appointments/upcoming/", async_views.patient_upcoming, name="async-patient-upcoming"),
+    path("async/patients/<int:patient_id>/appointments/past/", async_views.patient_past, name="async-patient-past"),
 ]
 
 # --------------------------------------------------------------
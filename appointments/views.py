@@ -1,13 +1,36 @@
-from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+from django.http import HttpResponse, JsonResponse, HttpResponseBadRequest, HttpResponseNotAllowed
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, get_user_model
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
+from django.utils.crypto import constant_time_compare
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
 from django.contrib.auth.hashers import make_password
 from datetime import timedelta
+from functools import partial
 import json
-
-from .models import Appointment, Provider, Specialty, Availability
+import uuid
+
+from .models import (
+    Appointment, Provider, Specialty, Availability, AvailabilityException, AvailabilityRule, ChatHistory,
+    DoctorNote,
+)
+from . import chat, counters, metrics as request_metrics, photos, search
+from .analytics import BUCKETS, provider_stats
+from .booking import BookingError, book_appointment, bulk_transition, reschedule
+from .cache import DIRECTORY, cached_response, invalidate
+from .events import appointment_changed
+from .feeds import appointment_feed
+from .imports import ScheduleImportError, import_windows, parse_schedule
+from .pagination import (
+    InvalidPage, decode_offset, encode_offset, keyset_page, keyset_page_list, page_size,
+)
+from .rows import (
+    APPOINTMENT_DETAIL_ROW, APPOINTMENT_ROW, PATIENT_FEED_ROW, PROVIDER_FEED_ROW, SCHEDULE_ROW,
+    NOTE_COLUMNS, attach_notes, login_item, note_item, provider_detail_item, provider_item, wants_notes,
+)
+from .scheduling import earliest_slots, free_slots
 
 User = get_user_model()
 
@@ -57,80 +80,33 @@ def login(request):
     if user is None:
         return JsonResponse({"error": "Invalid credentials"}, status=401)
 
-    # Determine role
-    if hasattr(user, "provider_profile"):
-        role = "provider"
-        provider_id = user.provider_profile.id
-    elif user.is_staff:
-        role = "admin"
-        provider_id = None
-    else:
-        role = "patient"
-        provider_id = None
+    provider_id = Provider.objects.filter(user=user).values_list("id", flat=True).first()
 
-    return JsonResponse({
-        "status": "ok",
-        "user": {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": role,
-            "provider_id": provider_id,
-        }
-    })
+    return JsonResponse({"status": "ok", "user": login_item(user, provider_id)})
 
 # ======================================================
 # PROVIDERS — LIST
 # ======================================================
+@cached_response(DIRECTORY)
 def provider_list(request):
     providers = Provider.objects.select_related("user", "specialty")
 
     return JsonResponse({
         "status": "ok",
-        "items": [
-            {
-                "id": p.id,
-                "user_id": p.user_id,
-                "first_name": p.user.first_name,
-                "last_name": p.user.last_name,
-                "email": p.user.email,
-                "user_name": p.user.get_full_name() or p.user.username,
-                "specialty_name": p.specialty.name if p.specialty else None,
-                "specialty_id": p.specialty_id,
-                "location": p.location,
-                "bio": p.bio,
-                "profile_photo": p.profile_photo.url if p.profile_photo else None,
-            }
-            for p in providers
-        ]
+        "items": [provider_item(p) for p in providers],
     })
 
 # ======================================================
 # PROVIDER DETAIL
 # ======================================================
+@cached_response(DIRECTORY)
 def provider_detail(request, provider_id):
     try:
         p = Provider.objects.select_related("user", "specialty").get(id=provider_id)
     except Provider.DoesNotExist:
         return JsonResponse({"error": "Not found"}, status=404)
 
-    return JsonResponse({
-        "status": "ok",
-        "item": {
-            "id": p.id,
-            "first_name": p.user.first_name,
-            "last_name": p.user.last_name,
-            "email": p.user.email,
-            "user_name": p.user.get_full_name() or p.user.username,
-            "specialty_name": p.specialty.name if p.specialty else None,
-            "specialty_id": p.specialty_id,
-            "location": p.location,
-            "bio": p.bio,
-            "profile_photo": p.profile_photo.url if p.profile_photo else None,
-        }
-    })
+    return JsonResponse({"status": "ok", "item": provider_detail_item(p)})
 
 # ======================================================
 # PROVIDER UPDATE
@@ -168,6 +144,12 @@ def provider_update(request, provider_id):
             return JsonResponse({"error": "Invalid specialty"}, status=400)
 
     provider.save()
+
+    # Keep the denormalized name on appointments in step with the profile.
+    Appointment.objects.filter(provider=provider).update(
+        provider_name=user.get_full_name() or user.username,
+        updated_at=timezone.now(),
+    )
     return JsonResponse({"status": "updated"})
 
 # ======================================================
@@ -186,35 +168,32 @@ def provider_upload_photo(request, provider_id):
     if "photo" not in request.FILES:
         return JsonResponse({"error": "No photo uploaded"}, status=400)
 
-    provider.profile_photo = request.FILES["photo"]
-    provider.save()
-
-    return JsonResponse({
-        "status": "uploaded",
-        "photo_url": provider.profile_photo.url,
-    })
+    try:
+        data = photos.read_upload(request.FILES["photo"])
+    except photos.PhotoError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if photos.backlog_full():
+        response = JsonResponse({"error": "Photo processing is busy; try again shortly"}, status=503)
+        response["Retry-After"] = "5"
+        return response
+
+    # Renditions are rendered in the background; until then the provider's
+    # photo is pending and list/detail responses show none.
+    upload = photos.save_upload(data)
+    provider.profile_photo.name = upload
+    provider.photo_renditions = {}
+    provider.save(update_fields=["profile_photo", "photo_renditions"])
+    transaction.on_commit(partial(photos.schedule, provider.id, upload, data))
+
+    return JsonResponse({"status": "processing", "provider_id": provider.id}, status=202)
 
 # ======================================================
 # PROVIDER APPOINTMENTS
 # ======================================================
 def provider_appointments(request, provider_id):
-    qs = Appointment.objects.filter(provider_id=provider_id).order_by("start")
+    qs = Appointment.objects.filter(provider_id=provider_id)
 
-    return JsonResponse({
-        "status": "ok",
-        "appointments": [
-            {
-                "id": a.id,
-                "patient": a.patient_id,
-                "patient_name": a.patient_name,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "appointments", SCHEDULE_ROW)
 
 # ======================================================
 # PROVIDER TODAY
@@ -228,25 +207,9 @@ def provider_today(request, provider_id):
         provider_id=provider_id,
         start__gte=start,
         start__lt=end
-    ).select_related("provider__user").order_by("start")
+    )
 
-    return JsonResponse({
-        "status": "ok",
-        "appointments": [
-            {
-                "id": a.id,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name(),
-                "patient": a.patient_id,
-                "patient_name": a.patient_name,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "appointments", PROVIDER_FEED_ROW, conditional=True)
 
 # ======================================================
 # PROVIDER UPCOMING
@@ -255,25 +218,9 @@ def provider_upcoming(request, provider_id):
     qs = Appointment.objects.filter(
         provider_id=provider_id,
         start__gte=timezone.now()
-    ).select_related("provider__user").order_by("start")
+    )
 
-    return JsonResponse({
-        "status": "ok",
-        "appointments": [
-            {
-                "id": a.id,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name(),
-                "patient": a.patient_id,
-                "patient_name": a.patient_name,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "appointments", PROVIDER_FEED_ROW, conditional=True)
 
 # ======================================================
 # PROVIDER PAST
@@ -282,37 +229,26 @@ def provider_past(request, provider_id):
     qs = Appointment.objects.filter(
         provider_id=provider_id,
         end__lt=timezone.now()
-    ).select_related("provider__user").order_by("-start")
+    )
 
-    return JsonResponse({
-        "status": "ok",
-        "appointments": [
-            {
-                "id": a.id,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name(),
-                "patient": a.patient_id,
-                "patient_name": a.patient_name,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "appointments", PROVIDER_FEED_ROW, descending=True)
 
 # ======================================================
 # PROVIDER ANALYTICS
 # ======================================================
 def provider_analytics(request, provider_id):
-    total = Appointment.objects.filter(provider_id=provider_id).count()
-    upcoming = Appointment.objects.filter(provider_id=provider_id, start__gte=timezone.now()).count()
+    kind = request.GET.get("bucket", "week")
+    if kind not in BUCKETS:
+        return JsonResponse({"error": f"bucket must be one of {', '.join(BUCKETS)}"}, status=400)
+
+    range_start = _parse_aware(request.GET["start"]) if request.GET.get("start") else None
+    range_end = _parse_aware(request.GET["end"]) if request.GET.get("end") else None
+    if (request.GET.get("start") and range_start is None) or (request.GET.get("end") and range_end is None):
+        return JsonResponse({"error": "Invalid datetime"}, status=400)
 
     return JsonResponse({
         "status": "ok",
-        "total_appointments": total,
-        "upcoming": upcoming
+        **provider_stats(provider_id, kind, range_start, range_end),
     })
 
 # ======================================================
@@ -322,24 +258,9 @@ def patient_upcoming(request, patient_id):
     qs = Appointment.objects.filter(
         patient_id=patient_id,
         start__gte=timezone.now()
-    ).select_related("provider__user").order_by("start")
+    )
 
-    return JsonResponse({
-        "status": "ok",
-        "items": [
-            {
-                "id": a.id,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name() or a.provider.user.username,
-                "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "items", PATIENT_FEED_ROW)
 
 # ======================================================
 # PATIENT — ALL APPOINTMENTS
@@ -347,24 +268,9 @@ def patient_upcoming(request, patient_id):
 def patient_appointments(request, patient_id):
     qs = Appointment.objects.filter(
         patient_id=patient_id
-    ).select_related("provider__user").order_by("start")
+    )
 
-    return JsonResponse({
-        "status": "ok",
-        "items": [
-            {
-                "id": a.id,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name() or a.provider.user.username,
-                "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "items", PATIENT_FEED_ROW)
 
 # ======================================================
 # PATIENT — PAST APPOINTMENTS
@@ -374,74 +280,104 @@ def patient_past(request, patient_id):
     qs = Appointment.objects.filter(
         patient_id=patient_id,
         end__lt=now
-    ).select_related("provider__user").order_by("-start")
+    )
 
-    return JsonResponse({
-        "status": "ok",
-        "items": [
-            {
-                "id": a.id,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name(),
-                "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+    return appointment_feed(request, qs, "items", PATIENT_FEED_ROW, descending=True)
 
 # ======================================================
 # APPOINTMENTS — LIST ALL
 # ======================================================
 def appointment_list(request):
-    qs = Appointment.objects.select_related("provider__user").order_by("-start")
-    
+    qs = Appointment.objects.all()
+
     status = request.GET.get("status")
     if status:
         qs = qs.filter(status=status)
-    
-    return JsonResponse({
-        "status": "ok",
-        "items": [
-            {
-                "id": a.id,
-                "patient": a.patient_id,
-                "patient_name": a.patient_name,
-                "provider": a.provider_id,
-                "provider_name": a.provider.user.get_full_name() or a.provider.user.username,
-                "provider_photo": a.provider.profile_photo.url if a.provider.profile_photo else None,
-                "service": a.service,
-                "start": a.start.isoformat(),
-                "end": a.end.isoformat(),
-                "status": a.status,
-            }
-            for a in qs
-        ]
-    })
+
+    return appointment_feed(request, qs, "items", APPOINTMENT_ROW, descending=True)
+
+# ======================================================
+# APPOINTMENTS — BOOK
+# ======================================================
+def _parse_aware(value):
+    """Aware datetime from an ISO string; None for anything else, including impossible dates."""
+    try:
+        dt = parse_datetime(value) if isinstance(value, str) and value else None
+    except ValueError:
+        return None
+    if dt is not None and timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def _int_id(value):
+    if isinstance(value, bool):
+        raise TypeError("ids must be integers")
+    return int(value)
+
+
+@csrf_exempt
+def book(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    try:
+        provider_id = _int_id(data["provider_id"])
+        patient_id = _int_id(data["patient_id"]) if data.get("patient_id") else None
+    except (KeyError, TypeError, ValueError):
+        return JsonResponse({"error": "provider_id (and patient_id, if given) must be integers"}, status=400)
+    start = _parse_aware(data.get("start"))
+    if start is None:
+        return JsonResponse({"error": "A valid start is required"}, status=400)
+    if start < timezone.now():
+        return JsonResponse({"error": "Cannot book in the past"}, status=400)
+
+    if data.get("end"):
+        end = _parse_aware(data["end"])
+        if end is None:
+            return JsonResponse({"error": "Invalid end"}, status=400)
+    else:
+        try:
+            end = start + timedelta(minutes=int(data.get("duration", 30)))
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invalid duration"}, status=400)
+
+    patient = None
+    if patient_id is not None:
+        try:
+            patient = User.objects.get(id=patient_id)
+        except User.DoesNotExist:
+            return JsonResponse({"error": "Patient not found"}, status=404)
+
+    try:
+        appt = book_appointment(
+            provider_id, start, end,
+            patient=patient,
+            service=data.get("service", ""),
+            notes=data.get("notes", ""),
+        )
+    except BookingError as e:
+        return JsonResponse({"error": e.message}, status=e.status)
+
+    return JsonResponse({"status": "created", "item": APPOINTMENT_DETAIL_ROW.instance(appt)}, status=201)
 
 # ======================================================
 # APPOINTMENT DETAIL
 # ======================================================
 def appointment_detail(request, apt_id):
-    try:
-        apt = Appointment.objects.get(id=apt_id)
-    except Appointment.DoesNotExist:
+    row = APPOINTMENT_DETAIL_ROW.values(Appointment.objects.filter(id=apt_id)).first()
+    if row is None:
         return JsonResponse({"error": "Appointment not found"}, status=404)
 
-    return JsonResponse({
-        "id": apt.id,
-        "patient": apt.patient_id,
-        "patient_name": apt.patient_name,
-        "provider": apt.provider_id,
-        "provider_name": apt.provider_name,
-        "service": apt.service,
-        "start": apt.start.isoformat(),
-        "end": apt.end.isoformat(),
-        "status": apt.status,
-    })
+    item = APPOINTMENT_DETAIL_ROW(row)
+    if wants_notes(request):
+        attach_notes([item])
+    return JsonResponse(item)
 
 # ======================================================
 # CANCEL APPOINTMENT
@@ -455,6 +391,7 @@ def cancel_appointment(request, apt_id):
 
     appt.status = "cancelled"
     appt.save()
+    appointment_changed("cancelled", appt)
 
     return JsonResponse({"status": "cancelled"})
 
@@ -470,9 +407,40 @@ def complete_appointment(request, apt_id):
 
     appt.status = "completed"
     appt.save()
+    appointment_changed("completed", appt)
 
     return JsonResponse({"status": "completed"})
 
+# ======================================================
+# BULK STATUS TRANSITION
+# ======================================================
+@csrf_exempt
+def bulk_status(request):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    ids = data.get("ids")
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return JsonResponse({"error": "ids must be a list of integers"}, status=400)
+        ids = list(dict.fromkeys(ids))
+
+    filters = data.get("filter")
+    if filters is not None and not isinstance(filters, dict):
+        return JsonResponse({"error": "filter must be an object"}, status=400)
+
+    try:
+        updated, results = bulk_transition(data.get("status"), ids=ids, filters=filters)
+    except BookingError as e:
+        return JsonResponse({"error": e.message}, status=e.status)
+
+    return JsonResponse({"status": "ok", "updated": updated, "results": results})
+
 # ======================================================
 # RESCHEDULE APPOINTMENT
 # ======================================================
@@ -482,31 +450,31 @@ def reschedule_appointment(request, apt_id):
         return HttpResponseNotAllowed(["POST"])
 
     try:
-        appt = Appointment.objects.get(id=apt_id)
-    except Appointment.DoesNotExist:
-        return JsonResponse({"error": "Not found"}, status=404)
-
-    data = json.loads(request.body)
-    new_dt = data.get("datetime")
+        data = json.loads(request.body)
+    except:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
 
+    new_dt = data.get("datetime") or data.get("start")
     if not new_dt:
         return JsonResponse({"error": "Missing datetime"}, status=400)
 
-    new_start = parse_datetime(new_dt)
+    new_start = _parse_aware(new_dt)
     if not new_start:
         return JsonResponse({"error": "Invalid datetime"}, status=400)
+    if new_start < timezone.now():
+        return JsonResponse({"error": "Cannot reschedule into the past"}, status=400)
 
-    new_end = new_start + timedelta(minutes=30)
-
-    appt.start = new_start
-    appt.end = new_end
-    appt.save()
+    try:
+        appt = reschedule(apt_id, new_start)
+    except BookingError as e:
+        return JsonResponse({"error": e.message}, status=e.status)
 
-    return JsonResponse({"status": "rescheduled"})
+    return JsonResponse({"status": "rescheduled", "item": APPOINTMENT_DETAIL_ROW.instance(appt)})
 
 # ======================================================
 # SPECIALTIES — LIST
 # ======================================================
+@cached_response(DIRECTORY)
 def specialty_list(request):
     specialties = Specialty.objects.all()
     return JsonResponse({
@@ -592,90 +560,271 @@ def specialty_delete(request, spec_id):
     specialty.delete()
     return JsonResponse({"status": "deleted"})
 
+# ======================================================
+# AVAILABILITY — HELPERS
+# ======================================================
+WEEKDAYS = {label.lower(): value for value, label in AvailabilityRule.Weekday.choices}
+
+
+def _window_item(a):
+    return {
+        "id": a.id,
+        "provider_id": a.provider_id,
+        "start": a.start.isoformat(),
+        "end": a.end.isoformat(),
+    }
+
+
+def _rule_item(r, exceptions=()):
+    return {
+        "id": r.id,
+        "provider_id": r.provider_id,
+        "day_of_week": r.day_of_week,
+        "start_time": r.start_time.isoformat(),
+        "end_time": r.end_time.isoformat(),
+        "valid_from": r.valid_from.isoformat(),
+        "valid_until": r.valid_until.isoformat() if r.valid_until else None,
+        "exceptions": [d.isoformat() for d in exceptions],
+    }
+
+
+def _parse_weekday(value):
+    if isinstance(value, int) and 0 <= value <= 6:
+        return value
+    if isinstance(value, str):
+        if value.isdigit() and 0 <= int(value) <= 6:
+            return int(value)
+        return WEEKDAYS.get(value.strip().lower())
+    return None
+
+
+def _apply_rule_fields(rule, data):
+    """Copy rule fields from request data onto ``rule``; returns an error string or None."""
+    if "day_of_week" in data:
+        rule.day_of_week = _parse_weekday(data["day_of_week"])
+        if rule.day_of_week is None:
+            return "Invalid day_of_week"
+    for field, parser in (("start_time", parse_time), ("end_time", parse_time), ("valid_from", parse_date)):
+        if field in data:
+            value = parser(str(data[field]))
+            if value is None:
+                return f"Invalid {field}"
+            setattr(rule, field, value)
+    if "valid_until" in data:
+        rule.valid_until = parse_date(str(data["valid_until"])) if data["valid_until"] else None
+        if data["valid_until"] and rule.valid_until is None:
+            return "Invalid valid_until"
+
+    if rule.end_time <= rule.start_time:
+        return "end_time must be after start_time"
+    return None
+
 # ======================================================
 # AVAILABILITY — LIST ALL
 # ======================================================
 def availability_list(request):
-    availabilities = Availability.objects.select_related("provider__user").all()
-    
+    availabilities = Availability.objects.order_by("provider_id", "start")
+
     return JsonResponse({
         "status": "ok",
-        "items": [
-            {
-                "id": a.id,
-                "provider_id": a.provider_id,
-                "provider_name": a.provider.user.get_full_name() or a.provider.user.username,
-                "day_of_week": a.day_of_week,
-                "start_time": a.start_time.isoformat(),
-                "end_time": a.end_time.isoformat(),
-            }
-            for a in availabilities
-        ]
+        "items": [_window_item(a) for a in availabilities]
     })
 
 # ======================================================
 # AVAILABILITY — BY PROVIDER
 # ======================================================
 def provider_availability(request, provider_id):
-    availabilities = Availability.objects.filter(provider_id=provider_id)
-    
+    availabilities = Availability.objects.filter(provider_id=provider_id).order_by("start")
+    rules = (
+        AvailabilityRule.objects
+        .filter(provider_id=provider_id)
+        .prefetch_related("exceptions")
+        .order_by("day_of_week", "start_time")
+    )
+
+    return JsonResponse({
+        "status": "ok",
+        "items": [_window_item(a) for a in availabilities],
+        "rules": [_rule_item(r, sorted(e.date for e in r.exceptions.all())) for r in rules],
+    })
+
+# ======================================================
+# AVAILABILITY — FREE SLOTS
+# ======================================================
+MAX_SLOT_RANGE = timedelta(days=92)
+
+
+def _parse_slot_range(request):
+    """Read ?start=&end=&duration= (minutes); returns (start, end, duration) or an error string."""
+    now = timezone.now()
+
+    start = _parse_aware(request.GET["start"]) if request.GET.get("start") else now
+    if start is None:
+        return "Invalid datetime"
+    end = _parse_aware(request.GET["end"]) if request.GET.get("end") else start + timedelta(days=7)
+    if end is None:
+        return "Invalid datetime"
+
+    start = max(start, now)
+    if end <= start:
+        return "end must be after start"
+    if end - start > MAX_SLOT_RANGE:
+        return f"Range cannot exceed {MAX_SLOT_RANGE.days} days"
+
+    try:
+        minutes = int(request.GET.get("duration", 30))
+    except ValueError:
+        return "Invalid duration"
+    if not 5 <= minutes <= 480:
+        return "duration must be between 5 and 480 minutes"
+
+    return start, end, timedelta(minutes=minutes)
+
+
+def provider_slots(request, provider_id):
+    if not Provider.objects.filter(id=provider_id).exists():
+        return JsonResponse({"error": "Provider not found"}, status=404)
+
+    parsed = _parse_slot_range(request)
+    if isinstance(parsed, str):
+        return JsonResponse({"error": parsed}, status=400)
+    start, end, duration = parsed
+
     return JsonResponse({
         "status": "ok",
         "items": [
-            {
-                "id": a.id,
-                "provider_id": a.provider_id,
-                "day_of_week": a.day_of_week,
-                "start_time": a.start_time.isoformat(),
-                "end_time": a.end_time.isoformat(),
-            }
-            for a in availabilities
+            {"start": s.isoformat(), "end": e.isoformat()}
+            for s, e in free_slots(provider_id, start, end, duration)
         ]
     })
 
+# ======================================================
+# AVAILABILITY — SEARCH ACROSS PROVIDERS
+# ======================================================
+MAX_SEARCH_RESULTS = 100
+
+
+def slot_search(request):
+    parsed = _parse_slot_range(request)
+    if isinstance(parsed, str):
+        return JsonResponse({"error": parsed}, status=400)
+    start, end, duration = parsed
+
+    try:
+        limit = min(int(request.GET.get("limit", 10)), MAX_SEARCH_RESULTS)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+
+    providers = Provider.objects.filter(is_approved=True, user__is_active=True)
+
+    specialty = request.GET.get("specialty")
+    if specialty:
+        if specialty.isdigit():
+            providers = providers.filter(specialty_id=specialty)
+        else:
+            providers = providers.filter(specialty__name__iexact=specialty)
+
+    location = request.GET.get("location")
+    if location:
+        providers = providers.filter(location__icontains=location)
+
+    info = {
+        pid: (first, last, username, specialty_name, loc)
+        for pid, first, last, username, specialty_name, loc in providers.values_list(
+            "id", "user__first_name", "user__last_name", "user__username", "specialty__name", "location"
+        )
+    }
+    slots = earliest_slots(info.keys(), start, end, duration, max(limit, 0))
+
+    items = []
+    for s, e, pid in slots:
+        first, last, username, specialty_name, loc = info[pid]
+        items.append({
+            "provider_id": pid,
+            "provider_name": f"{first} {last}".strip() or username,
+            "specialty_name": specialty_name,
+            "location": loc,
+            "start": s.isoformat(),
+            "end": e.isoformat(),
+        })
+
+    return JsonResponse({"status": "ok", "items": items})
+
 # ======================================================
 # AVAILABILITY — CREATE
 # ======================================================
 @csrf_exempt
 def create_availability(request):
+    """
+    Either a one-off window ({"start", "end"}) or a weekly rule
+    ({"day_of_week", "start_time", "end_time", "valid_from"?, "valid_until"?}).
+    """
     if request.method != "POST":
         return HttpResponseNotAllowed(["POST"])
-    
+
     try:
         data = json.loads(request.body)
     except:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
-    
+
     provider_id = data.get("provider_id")
-    day_of_week = data.get("day_of_week")
-    start_time = data.get("start_time")
-    end_time = data.get("end_time")
-    
-    if not all([provider_id, day_of_week, start_time, end_time]):
+    if not provider_id:
         return JsonResponse({"error": "Missing required fields"}, status=400)
-    
+
     try:
         provider = Provider.objects.get(id=provider_id)
     except Provider.DoesNotExist:
         return JsonResponse({"error": "Provider not found"}, status=404)
-    
-    availability = Availability.objects.create(
-        provider=provider,
-        day_of_week=day_of_week,
-        start_time=start_time,
-        end_time=end_time
-    )
-    
-    return JsonResponse({
-        "status": "created",
-        "item": {
-            "id": availability.id,
-            "provider_id": availability.provider_id,
-            "day_of_week": availability.day_of_week,
-            "start_time": availability.start_time.isoformat(),
-            "end_time": availability.end_time.isoformat(),
-        }
-    }, status=201)
+
+    if "day_of_week" in data:
+        if not data.get("start_time") or not data.get("end_time"):
+            return JsonResponse({"error": "Missing required fields"}, status=400)
+        rule = AvailabilityRule(provider=provider, valid_from=timezone.localdate())
+        error = _apply_rule_fields(rule, data)
+        if error:
+            return JsonResponse({"error": error}, status=400)
+        rule.save()
+        return JsonResponse({"status": "created", "rule": _rule_item(rule)}, status=201)
+
+    start = _parse_aware(data.get("start"))
+    end = _parse_aware(data.get("end"))
+    if start is None or end is None:
+        return JsonResponse({"error": "Missing required fields"}, status=400)
+    if end <= start:
+        return JsonResponse({"error": "end must be after start"}, status=400)
+
+    availability = Availability.objects.create(provider=provider, start=start, end=end)
+
+    return JsonResponse({"status": "created", "item": _window_item(availability)}, status=201)
+
+# ======================================================
+# AVAILABILITY — BULK IMPORT
+# ======================================================
+@csrf_exempt
+def import_availability(request):
+    """
+    Load many windows in one call: a JSON body ({"provider_id", "windows": [...]}),
+    a text/csv body, or a multipart "file" upload. ?provider_id= applies to rows
+    without their own provider_id column.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    provider_id = request.GET.get("provider_id") or request.POST.get("provider_id")
+    upload = request.FILES.get("file")
+    if upload is not None:
+        text = upload.read().decode("utf-8-sig", errors="replace")
+        fmt = "json" if upload.name.lower().endswith(".json") else "csv"
+    else:
+        text = request.body.decode("utf-8-sig", errors="replace")
+        fmt = "csv" if "csv" in request.content_type else "json"
+
+    try:
+        summary = import_windows(parse_schedule(text, fmt, provider_id))
+    except ScheduleImportError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"status": "imported", **summary}, status=201)
 
 # ======================================================
 # AVAILABILITY — UPDATE
@@ -684,22 +833,28 @@ def create_availability(request):
 def update_availability(request, avail_id):
     if request.method != "PUT":
         return HttpResponseNotAllowed(["PUT"])
-    
+
     try:
         availability = Availability.objects.get(id=avail_id)
     except Availability.DoesNotExist:
         return JsonResponse({"error": "Availability not found"}, status=404)
-    
+
     try:
         data = json.loads(request.body)
     except:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
-    
-    availability.day_of_week = data.get("day_of_week", availability.day_of_week)
-    availability.start_time = data.get("start_time", availability.start_time)
-    availability.end_time = data.get("end_time", availability.end_time)
+
+    start = _parse_aware(data["start"]) if "start" in data else availability.start
+    end = _parse_aware(data["end"]) if "end" in data else availability.end
+    if start is None or end is None:
+        return JsonResponse({"error": "Invalid datetime"}, status=400)
+    if end <= start:
+        return JsonResponse({"error": "end must be after start"}, status=400)
+
+    availability.start = start
+    availability.end = end
     availability.save()
-    
+
     return JsonResponse({"status": "updated"})
 
 # ======================================================
@@ -709,15 +864,86 @@ def update_availability(request, avail_id):
 def delete_availability(request, avail_id):
     if request.method != "DELETE":
         return HttpResponseNotAllowed(["DELETE"])
-    
+
     try:
         availability = Availability.objects.get(id=avail_id)
     except Availability.DoesNotExist:
         return JsonResponse({"error": "Availability not found"}, status=404)
-    
+
     availability.delete()
     return JsonResponse({"status": "deleted"})
 
+# ======================================================
+# AVAILABILITY RULES — UPDATE
+# ======================================================
+@csrf_exempt
+def update_availability_rule(request, rule_id):
+    if request.method != "PUT":
+        return HttpResponseNotAllowed(["PUT"])
+
+    try:
+        rule = AvailabilityRule.objects.get(id=rule_id)
+    except AvailabilityRule.DoesNotExist:
+        return JsonResponse({"error": "Rule not found"}, status=404)
+
+    try:
+        data = json.loads(request.body)
+    except:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    error = _apply_rule_fields(rule, data)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+    rule.save()
+
+    return JsonResponse({"status": "updated", "rule": _rule_item(rule)})
+
+# ======================================================
+# AVAILABILITY RULES — DELETE
+# ======================================================
+@csrf_exempt
+def delete_availability_rule(request, rule_id):
+    if request.method != "DELETE":
+        return HttpResponseNotAllowed(["DELETE"])
+
+    try:
+        rule = AvailabilityRule.objects.get(id=rule_id)
+    except AvailabilityRule.DoesNotExist:
+        return JsonResponse({"error": "Rule not found"}, status=404)
+
+    rule.delete()
+    return JsonResponse({"status": "deleted"})
+
+# ======================================================
+# AVAILABILITY RULES — SKIP A DATE
+# ======================================================
+@csrf_exempt
+def availability_rule_exception(request, rule_id):
+    if request.method not in ("POST", "DELETE"):
+        return HttpResponseNotAllowed(["POST", "DELETE"])
+
+    try:
+        rule = AvailabilityRule.objects.get(id=rule_id)
+    except AvailabilityRule.DoesNotExist:
+        return JsonResponse({"error": "Rule not found"}, status=404)
+
+    try:
+        data = json.loads(request.body)
+    except:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    day = parse_date(str(data.get("date", "")))
+    if day is None:
+        return JsonResponse({"error": "Invalid date"}, status=400)
+
+    if request.method == "DELETE":
+        for exception in AvailabilityException.objects.filter(rule=rule, date=day):
+            exception.delete()
+        return JsonResponse({"status": "deleted"})
+
+    AvailabilityException.objects.get_or_create(rule=rule, date=day)
+    return JsonResponse({"status": "created"}, status=201)
+
 # ======================================================
 # ADMIN — PROVIDER LIST
 # ======================================================
@@ -756,6 +982,7 @@ def admin_toggle_provider(request, provider_id):
     
     provider.user.is_active = not provider.user.is_active
     provider.user.save()
+    invalidate(DIRECTORY)
     
     return JsonResponse({
         "status": "updated",
@@ -766,15 +993,291 @@ def admin_toggle_provider(request, provider_id):
 # ADMIN — STATISTICS
 # ======================================================
 def admin_stats(request):
-    total_providers = Provider.objects.count()
-    total_appointments = Appointment.objects.count()
-    total_patients = User.objects.filter(is_staff=False).exclude(provider_profile__isnull=False).count()
-    
     return JsonResponse({
         "status": "ok",
-        "stats": {
-            "total_providers": total_providers,
-            "total_appointments": total_appointments,
-            "total_patients": total_patients,
-        }
-    })
\ No newline at end of file
+        "stats": counters.read(),
+    })
+
+# ======================================================
+# DOCTOR NOTES — HELPERS
+# ======================================================
+MAX_NOTE_BATCH = 500
+
+
+def _note_json(note):
+    return note_item(tuple(getattr(note, column) for column in NOTE_COLUMNS))
+
+
+def _note_error(data, partial=False):
+    """The problem with a note body's note_text/author_name, or None. ``partial``: note_text may be absent."""
+    note_text, author_name = data.get("note_text"), data.get("author_name")
+    if not (partial and note_text is None) and (not isinstance(note_text, str) or not note_text.strip()):
+        return "note_text must be a non-empty string"
+    if author_name is not None and not isinstance(author_name, str):
+        return "author_name must be a string"
+    return None
+
+
+def _index_notes(notes):
+    # bulk_create skips post_save; backends with a separate index need telling.
+    backend = search.get_backend()
+    if not backend.maintained_by_database:
+        backend.index_many("notes", notes)
+
+# ======================================================
+# DOCTOR NOTES — LIST / CREATE FOR AN APPOINTMENT
+# ======================================================
+@csrf_exempt
+def appointment_notes(request, apt_id):
+    if request.method not in ("GET", "POST"):
+        return HttpResponseNotAllowed(["GET", "POST"])
+
+    appt = Appointment.objects.filter(id=apt_id).values("id", "provider_name").first()
+    if appt is None:
+        return JsonResponse({"error": "Appointment not found"}, status=404)
+
+    if request.method == "GET":
+        notes = DoctorNote.objects.filter(appointment_id=apt_id).order_by("created_at", "id")
+        return JsonResponse({
+            "status": "ok",
+            "items": [note_item(row) for row in notes.values_list(*NOTE_COLUMNS)],
+        })
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Expected a JSON object"}, status=400)
+    error = _note_error(data)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    note = DoctorNote.objects.create(
+        appointment_id=apt_id,
+        author_name=(data.get("author_name") or appt["provider_name"])[:120],
+        note_text=data["note_text"].strip(),
+    )
+
+    return JsonResponse({"status": "created", "item": _note_json(note)}, status=201)
+
+# ======================================================
+# DOCTOR NOTES — DETAIL / UPDATE / DELETE
+# ======================================================
+def note_detail(request, note_id):
+    row = DoctorNote.objects.filter(id=note_id).values_list(*NOTE_COLUMNS).first()
+    if row is None:
+        return JsonResponse({"error": "Note not found"}, status=404)
+
+    return JsonResponse({"status": "ok", "item": note_item(row)})
+
+
+@csrf_exempt
+def note_update(request, note_id):
+    if request.method != "PUT":
+        return HttpResponseNotAllowed(["PUT"])
+
+    try:
+        note = DoctorNote.objects.get(id=note_id)
+    except DoctorNote.DoesNotExist:
+        return JsonResponse({"error": "Note not found"}, status=404)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Expected a JSON object"}, status=400)
+    error = _note_error(data, partial=True)
+    if error:
+        return JsonResponse({"error": error}, status=400)
+
+    if data.get("note_text") is not None:
+        note.note_text = data["note_text"].strip()
+    if data.get("author_name"):
+        note.author_name = data["author_name"][:120]
+    note.save()
+
+    return JsonResponse({"status": "updated", "item": _note_json(note)})
+
+
+@csrf_exempt
+def note_delete(request, note_id):
+    if request.method != "DELETE":
+        return HttpResponseNotAllowed(["DELETE"])
+
+    try:
+        note = DoctorNote.objects.get(id=note_id)
+    except DoctorNote.DoesNotExist:
+        return JsonResponse({"error": "Note not found"}, status=404)
+
+    note.delete()
+    return JsonResponse({"status": "deleted"})
+
+# ======================================================
+# DOCTOR NOTES — BATCH CREATE
+# ======================================================
+@csrf_exempt
+def note_batch(request):
+    """
+    POST {"provider_id"?: int, "notes": [{"appointment_id", "note_text", "author_name"?}, ...]}.
+    All-or-nothing: one query validates every appointment (and that it
+    belongs to provider_id, when given), one bulk_create inserts the notes.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Expected a JSON object"}, status=400)
+
+    entries = data.get("notes")
+    if not isinstance(entries, list) or not entries:
+        return JsonResponse({"error": "notes must be a non-empty list"}, status=400)
+    if len(entries) > MAX_NOTE_BATCH:
+        return JsonResponse({"error": f"At most {MAX_NOTE_BATCH} notes per batch"}, status=400)
+
+    provider_id = data.get("provider_id")
+    if provider_id is not None and (not isinstance(provider_id, int) or isinstance(provider_id, bool)):
+        return JsonResponse({"error": "provider_id must be an integer"}, status=400)
+
+    errors = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({"index": index, "error": "Each note must be an object"})
+        elif not isinstance(entry.get("appointment_id"), int) or isinstance(entry["appointment_id"], bool):
+            errors.append({"index": index, "error": "appointment_id must be an integer"})
+        elif error := _note_error(entry):
+            errors.append({"index": index, "error": error})
+    if errors:
+        return JsonResponse({"error": "Invalid notes", "details": errors}, status=400)
+
+    appointments = Appointment.objects.filter(id__in={entry["appointment_id"] for entry in entries})
+    if provider_id is not None:
+        appointments = appointments.filter(provider_id=provider_id)
+    authors = dict(appointments.values_list("id", "provider_name"))
+
+    missing = sorted({entry["appointment_id"] for entry in entries} - authors.keys())
+    if missing:
+        return JsonResponse({"error": "Appointments not found", "appointment_ids": missing}, status=404)
+
+    # The index rows commit (or roll back) together with the notes.
+    with transaction.atomic():
+        notes = DoctorNote.objects.bulk_create([
+            DoctorNote(
+                appointment_id=entry["appointment_id"],
+                author_name=(entry.get("author_name") or authors[entry["appointment_id"]])[:120],
+                note_text=entry["note_text"].strip(),
+            )
+            for entry in entries
+        ])
+        _index_notes(notes)
+
+    return JsonResponse({"status": "created", "items": [_note_json(note) for note in notes]}, status=201)
+
+# ======================================================
+# CHAT — SESSION TRANSCRIPT
+# ======================================================
+def chat_transcript(request, session_id):
+    """
+    Messages in (created_at, id) order, keyset-paged with limit/cursor like
+    the appointment feeds. Compacted sessions are unpacked transparently.
+    """
+    try:
+        if chat.is_archived(session_id):
+            messages = chat.expand(chat.transcript_qs(session_id))
+            page = keyset_page_list(
+                messages, request.GET, field="created_at", cursor_key=chat.message_cursor, pk_type=uuid.UUID,
+            )
+        else:
+            page = keyset_page(
+                chat.transcript_qs(session_id), request.GET,
+                field="created_at", cursor_key=chat.message_cursor, pk_type=uuid.UUID,
+            )
+    except InvalidPage as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    body = {
+        "status": "ok",
+        "session_id": str(session_id),
+        "messages": [chat.message_item(row) for row in page.items],
+    }
+    if page.paginated:
+        body["next_cursor"] = page.next_cursor
+    return JsonResponse(body)
+
+# ======================================================
+# CHAT — APPEND MESSAGE
+# ======================================================
+@csrf_exempt
+def chat_append(request, session_id):
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest("Invalid JSON")
+
+    user_message = data.get("user_message", "")
+    if not isinstance(user_message, str) or not user_message.strip():
+        return JsonResponse({"error": "user_message is required"}, status=400)
+    meta = data.get("meta", {})
+    if not isinstance(meta, dict) or chat.is_archive(meta):
+        return JsonResponse({"error": "meta must be an object without an 'archive' key"}, status=400)
+
+    message = ChatHistory.objects.create(
+        session_id=session_id,
+        user_message=user_message,
+        bot_response=data.get("bot_response", "") or "",
+        model_name=(data.get("model_name", "") or "")[:80],
+        meta=meta,
+    )
+
+    return JsonResponse({
+        "status": "created",
+        "message": chat.message_item({f: getattr(message, f) for f in chat.MESSAGE_FIELDS}),
+    }, status=201)
+
+# ======================================================
+# FULL-TEXT SEARCH (chat history, doctor notes)
+# ======================================================
+def search_documents(request):
+    """
+    GET ?q=...&type=chat|notes, best match first. Pages with limit/cursor;
+    the cursor is opaque like the feeds' but wraps an offset.
+    """
+    query = request.GET.get("q", "").strip()
+    kind = request.GET.get("type", "chat")
+    if kind not in search.SPECS:
+        return JsonResponse({"error": f"type must be one of: {', '.join(search.SPECS)}"}, status=400)
+    if not query:
+        return JsonResponse({"error": "q is required"}, status=400)
+
+    try:
+        size = page_size(request.GET)
+        offset = decode_offset(request.GET["cursor"]) if request.GET.get("cursor") else 0
+    except InvalidPage as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    hits = search.get_backend().search(kind, query, size + 1, offset)
+
+    return JsonResponse({
+        "status": "ok",
+        "type": kind,
+        "results": search.results(kind, hits[:size]),
+        "next_cursor": encode_offset(offset + size) if len(hits) > size else None,
+    })
+
+# ======================================================
+# METRICS
+# ======================================================
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+
+    return HttpResponse(request_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -9,8 +9,18 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('DJANGO_ASGI', 'True')
 
-application = get_asgi_application()
+# WhiteNoise is dropped from MIDDLEWARE under ASGI (see settings), so the
+# admin's static files are served here.
+django_application = ASGIStaticFilesHandler(get_asgi_application())
+
+# Imported after setup: provider event streams are served outside the Django
+# request cycle (see appointments/sse.py).
+from appointments.sse import events_router  # noqa: E402
+
+application = events_router(django_application)
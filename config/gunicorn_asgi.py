@@ -0,0 +1,17 @@
+"""
+Gunicorn profile for serving config.asgi with uvicorn workers:
+
+    gunicorn config.asgi:application -c config/gunicorn_asgi.py
+
+Async views (/api/async/...) and the provider event streams only pay off
+under this profile; the default Procfile keeps the sync WSGI workers.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", "3"))
+# Open event streams never finish on their own, so restarts should not wait
+# the default 30s for them; EventSource clients reconnect by themselves.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "10"))
@@ -1,4 +1,5 @@
 # config/settings.py
+from importlib.util import find_spec
 from pathlib import Path
 import os
 
@@ -65,7 +66,11 @@ INSTALLED_APPS = [
     "appointments",
 ]
 
+# Set by config/asgi.py before settings load.
+RUNNING_ASGI = env_bool("DJANGO_ASGI", False)
+
 MIDDLEWARE = [
+    "appointments.metrics.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -76,6 +81,10 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+if RUNNING_ASGI:
+    # WhiteNoise is sync-only and would run every request, async views
+    # included, on a thread; config/asgi.py serves static files instead.
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
 
 ROOT_URLCONF = "config.urls"
 
@@ -101,21 +110,123 @@ if db_url:
     DATABASES = {
         "default": dj_database_url.config(
             default=db_url,
-            conn_max_age=600,
+            # Persistent connections are per thread; under ASGI every request
+            # gets its own thread for ORM calls, so they would never be reused.
+            conn_max_age=0 if RUNNING_ASGI else 600,
             ssl_require=True,
         )
     }
+    # Transaction-mode poolers (pgbouncer, Supabase :6543) cannot hold the
+    # server-side cursors that QuerySet.iterator() uses for streamed exports.
+    DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = env_bool("DB_DISABLE_SERVER_SIDE_CURSORS", False)
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # IMMEDIATE takes the write lock at BEGIN, so booking checks
+            # inside transaction.atomic() run one at a time.
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+            # A file, not shared-cache :memory:, so the concurrent booking tests'
+            # threads wait on the write lock instead of failing "table is locked".
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 
+# ---------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------
+# "locmem" is per-process, so version bumps in one gunicorn worker are not
+# seen by the others; production defaults to the file backend, which all
+# workers on a host share. Any Django cache backend path also works.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem" if DEBUG else "file")
+CACHE_BACKENDS = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+}
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache") if CACHE_BACKEND == "file" else ""),
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# ---------------------------------------------------------
+# METRICS (appointments.metrics, exposed at /api/metrics/)
+# ---------------------------------------------------------
+# Every request is counted and timed; only a METRICS_SAMPLE_RATE share also
+# gets per-query instrumentation (query count, DB vs app time, body size).
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1" if DEBUG else "0.1"))
+METRICS_SERVER_TIMING = env_bool("METRICS_SERVER_TIMING", DEBUG)
+# When set, /api/metrics/ requires "Authorization: Bearer <token>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# ---------------------------------------------------------
+# EVENTS (server-sent events, served by config/asgi.py)
+# ---------------------------------------------------------
+# EVENTS_BROKER is a key of EVENTS_BROKERS or a dotted path to a Broker.
+# "local" only reaches dashboards connected to the worker that made the
+# change; "postgres" shares events across workers with LISTEN/NOTIFY.
+EVENTS_BROKERS = {
+    "local": "appointments.events.LocalBroker",
+    "postgres": "appointments.events.PostgresBroker",
+}
+EVENTS_BROKER = os.getenv("EVENTS_BROKER", "local")
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_KEEPALIVE = int(os.getenv("EVENTS_KEEPALIVE", "15"))
+
 USE_X_FORWARDED_HOST = True
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
+# ---------------------------------------------------------
+# SEARCH (appointments.search; storage created by migration 0013)
+# ---------------------------------------------------------
+# Empty SEARCH_BACKEND picks the backend for the database vendor.
+SEARCH_BACKENDS = {
+    "postgresql": "appointments.search.PostgresSearchBackend",
+    "sqlite": "appointments.search.SQLiteSearchBackend",
+}
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "")
+
+# ---------------------------------------------------------
+# CHAT RETENTION (python manage.py compact_chat)
+# ---------------------------------------------------------
+# Sessions idle for longer than this are compacted into one archive row each.
+CHAT_RETENTION_DAYS = int(os.getenv("CHAT_RETENTION_DAYS", "90"))
+
+# ---------------------------------------------------------
+# PASSWORD HASHING (appointments.hashers)
+# ---------------------------------------------------------
+# New hashes use PASSWORD_HASHER; hashes made with another algorithm or other
+# cost parameters keep verifying and are rehashed on the next login. Argon2id
+# at these OWASP-minimum settings costs a fraction of PBKDF2's 1M iterations;
+# it needs argon2-cffi, so without it the default falls back to PBKDF2.
+# Measure a change with `python manage.py bench_hashers` before deploying it.
+_PASSWORD_HASHERS = {
+    "argon2": "appointments.hashers.Argon2PasswordHasher",
+    "scrypt": "appointments.hashers.ScryptPasswordHasher",
+    "pbkdf2": "appointments.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHER = os.getenv("PASSWORD_HASHER") or ("argon2" if find_spec("argon2") else "pbkdf2")
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ValueError(f"PASSWORD_HASHER must be one of {', '.join(_PASSWORD_HASHERS)}")
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv("PASSWORD_ARGON2_MEMORY_COST", "19456"))  # KiB
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv("PASSWORD_ARGON2_PARALLELISM", "1"))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.getenv("PASSWORD_SCRYPT_WORK_FACTOR", str(2**14)))
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.getenv("PASSWORD_SCRYPT_BLOCK_SIZE", "8"))
+PASSWORD_SCRYPT_PARALLELISM = int(os.getenv("PASSWORD_SCRYPT_PARALLELISM", "5"))
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "1000000"))
+# Threads per worker process for async login/register hashing.
+PASSWORD_HASHING_THREADS = int(os.getenv("PASSWORD_HASHING_THREADS", str(os.cpu_count() or 1)))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -136,6 +247,25 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # ---------------------------------------------------------
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Served by appointments.media in every environment. Content-addressed photo
+# renditions are cached for a year; other files for MEDIA_CACHE_MAX_AGE
+# seconds, then revalidated by ETag. Behind nginx, set MEDIA_ACCEL_REDIRECT to
+# an `internal` location aliased to MEDIA_ROOT (e.g. /protected-media/) and
+# nginx sends the bytes instead of a worker.
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", "3600"))
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+
+# Uploaded photos are validated, then re-encoded into these renditions
+# (label: longest edge in px) in the background on a per-process pool of
+# PHOTO_WORKERS threads (0: inline, at commit); see appointments.photos.
+# Uploads get a 503 while PHOTO_QUEUE_LIMIT jobs are waiting.
+PHOTO_RENDITIONS = {"thumb": 96, "small": 320, "large": 1280}
+PHOTO_FORMAT = os.getenv("PHOTO_FORMAT", "WEBP")  # WEBP, JPEG or PNG
+PHOTO_QUALITY = int(os.getenv("PHOTO_QUALITY", "82"))
+PHOTO_MAX_UPLOAD_BYTES = int(os.getenv("PHOTO_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+PHOTO_MAX_PIXELS = int(os.getenv("PHOTO_MAX_PIXELS", str(40_000_000)))
+PHOTO_WORKERS = int(os.getenv("PHOTO_WORKERS", "2"))
+PHOTO_QUEUE_LIMIT = int(os.getenv("PHOTO_QUEUE_LIMIT", "32"))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
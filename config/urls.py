@@ -1,15 +1,15 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from appointments import media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
     # All backend API endpoints
     path('api/', include('appointments.urls')),
-]
 
-# Serve media files (provider photos) ONLY in DEBUG mode
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    # Uploaded media (provider photos), in production too; see appointments/media.py
+    re_path(rf"^{settings.MEDIA_URL.strip('/')}/(?P<path>.+)$", media.serve, name="media"),
+]